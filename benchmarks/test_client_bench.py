@@ -0,0 +1,36 @@
+"""benchmarks of request preparation in XhsClient, no request is sent"""
+import pytest
+
+from xhs import XhsClient, fastjson
+from xhs.core import build_uri
+
+from .test_help_bench import COOKIE, DATA
+
+pytest.importorskip("pytest_benchmark")
+
+PARAMS = {"note_id": "64b2b1c5000000001f00fa0a", "cursor": "", "image_formats": "jpg,webp,avif",
+          "xsec_token": "ABtQWY3xPGyDY4HNqVx6BQZ0zQGpB0pSdm4PfTZ8yvz5A="}
+
+
+@pytest.fixture
+def client():
+    return XhsClient(COOKIE)
+
+
+def test_build_uri(benchmark):
+    benchmark(build_uri, "/api/sns/web/v2/comment/page", PARAMS)
+
+
+def test_pre_headers_get(benchmark, client):
+    # quick_sign signs locally like creator and customer apis
+    uri = build_uri("/api/sns/web/v2/comment/page", PARAMS)
+    benchmark(client._pre_headers, uri, quick_sign=True)
+
+
+def test_pre_headers_post(benchmark, client):
+    body = fastjson.dumps(DATA)
+    benchmark(client._pre_headers, "/api/sns/web/v1/feed", DATA, quick_sign=True, body=body)
+
+
+def test_cookie(benchmark, client):
+    benchmark(lambda: client.cookie)
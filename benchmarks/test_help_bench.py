@@ -0,0 +1,77 @@
+"""benchmarks of hot paths in xhs.help, inputs are fixed so results are comparable
+
+run `make bench` to compare with the stored baseline, `make bench-save` to update it
+"""
+import json
+
+import pytest
+
+from xhs import Signer, help
+
+pytest.importorskip("pytest_benchmark")
+
+URI = "/api/sns/web/v1/user/otherinfo?target_user_id=5ff0e6410000000001008400"
+A1 = "18b9f9a6e2f3qz4k0aaa0w2ed6e9c8c2b0e5a0cb1f0000045678"
+B1 = ("I38rHdgsjopgIvesdVwgIC+oIELmBZ5e3VwXLgFTIxS3bqwErFeexd0ekncAzMFYnqthIhJeSfMDKutRI3Ks"
+      "YorWHPtGrbV0I")
+DATA = {
+    "source_note_id": "64b2b1c5000000001f00fa0a",
+    "image_formats": ["jpg", "webp", "avif"],
+    "extra": {"need_body_topic": 1},
+    "xsec_source": "pc_feed",
+    "xsec_token": "ABtQWY3xPGyDY4HNqVx6BQZ0zQGpB0pSdm4PfTZ8yvz5A=",
+}
+COOKIE = ("abRequestId=5bd2ff1c-3d77-5b1d-8c9b-1d3c2c9b4d6e; a1=" + A1 + "; webId=0b9ab8b9b5b0d6b2a5f3d7b4c3a2e1f0; "
+          "gid=yYjKjyK0J9yJyYjKjyK0JW0h8d8F3vkhMU8kJ8M0ySD9yJ28vA6K4W888yKJ4YK8qDj0jfKf; "
+          "web_session=040069b5f1b2c8a1e8a2c4e7b7364b9a3c1e2f; xsecappid=xhs-pc-web; websectiga=2a3d3ea002e7d92b")
+
+
+def test_sign_get(benchmark):
+    benchmark(help.sign, URI, ctime=1700000000000, a1=A1, b1=B1)
+
+
+def test_sign_post(benchmark):
+    benchmark(help.sign, "/api/sns/web/v1/feed", DATA, ctime=1700000000000, a1=A1, b1=B1)
+
+
+def test_sign_post_long_b1(benchmark):
+    # b1 of a real browser is over 1kb
+    benchmark(help.sign, "/api/sns/web/v1/feed", DATA, ctime=1700000000000, a1=A1, b1=B1 * 12)
+
+
+def test_signer_sign_post_long_b1(benchmark):
+    benchmark(Signer(b1=B1 * 12), "/api/sns/web/v1/feed", DATA, ctime=1700000000000, a1=A1)
+
+
+def test_mrc(benchmark):
+    benchmark(help.mrc, "1700000000000" + "sBTCOiFLZgTWOgciOYsp0jFb1l5+sisbslMCZBFW0YM3")
+
+
+def test_b64_encode(benchmark):
+    benchmark(help.b64Encode, help.encodeUtf8(json.dumps({"x5": A1, "x8": B1}, separators=(",", ":"))))
+
+
+def test_encode_utf8(benchmark):
+    benchmark(help.encodeUtf8, json.dumps({"x5": A1, "x8": B1, "keyword": "小红书"}, separators=(",", ":")))
+
+
+def test_get_search_id(benchmark):
+    benchmark(help.get_search_id)
+
+
+def test_cookie_str_to_cookie_dict(benchmark):
+    benchmark(help.cookie_str_to_cookie_dict, COOKIE)
+
+
+def test_transform_json_keys(benchmark):
+    note = {
+        "noteId": "64b2b1c5000000001f00fa0a", "type": "normal", "title": "title", "desc": "desc " * 50,
+        "user": {"userId": "5ff0e6410000000001008400", "nickname": "nickname", "avatar": "https://sns-avatar"},
+        "interactInfo": {"liked": False, "likedCount": "10", "collectedCount": "2", "commentCount": "3"},
+        "imageList": [{"urlDefault": "https://sns-webpic", "width": 1080, "height": 1440,
+                       "infoList": [{"imageScene": "WB_PRV", "url": "https://sns-webpic"}] * 2}] * 9,
+        "tagList": [{"id": "5be94ea3b4e57f000178af7a", "name": "tag", "type": "topic"}] * 5,
+        "atUserList": [], "time": 1700000000000, "lastUpdateTime": 1700000000000, "ipLocation": "上海",
+    }
+    state = json.dumps({"note": {"noteDetailMap": {note["noteId"]: {"note": note, "comments": {}}}}})
+    benchmark(help.transform_json_keys, state)
@@ -46,6 +46,18 @@ def sign(uri, data, a1, web_session):
     }
 
 
+def sign_batch(items, a1, web_session):
+    # 一次 evaluate 签名多个请求，减少与浏览器的往返
+    encrypt_params_list = context_page.evaluate(
+        "(items) => items.map(([url, data]) => window._webmsxyw(url, data))",
+        [[item["uri"], item.get("data")] for item in items]
+    )
+    return [
+        {"x-s": encrypt_params["X-s"], "x-t": str(encrypt_params["X-t"])}
+        for encrypt_params in encrypt_params_list
+    ]
+
+
 @app.route("/sign", methods=["POST"])
 def hello_world():
     json = request.json
@@ -56,6 +68,12 @@ def hello_world():
     return sign(uri, data, a1, web_session)
 
 
+@app.route("/sign/batch", methods=["POST"])
+def batch():
+    json = request.json
+    return {"signs": sign_batch(json["items"], json.get("a1", ""), json.get("web_session", ""))}
+
+
 @app.route("/a1", methods=["GET"])
 def get_a1():
     return {'a1': A1}
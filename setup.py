@@ -24,6 +24,12 @@ setup(
     license=about["__license__"],
     packages=["xhs"],
     install_requires=["requests", "lxml"],
+    extras_require={
+        "async": ["httpx"],
+        "http2": ["httpx[http2]"],
+        "speedups": ["orjson"],
+        "models": ["msgspec"],
+    },
     keywords="xhs crawl",
     include_package_data=True,
     zip_safe=False,
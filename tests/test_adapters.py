@@ -0,0 +1,70 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from xhs import XhsClient
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"success": true, "data": {}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_stats(server_url):
+    client = XhsClient()
+    for _ in range(5):
+        client.request("GET", server_url)
+    stats = client.stats()
+    assert (stats["hits"], stats["misses"], stats["new_connections"]) == (4, 1, 1)
+    assert stats["hosts"]["127.0.0.1"]["hits"] == 4
+
+
+def test_keepalive_timeout(server_url):
+    client = XhsClient(keepalive_timeout=0.05)
+    client.request("GET", server_url)
+    time.sleep(0.1)
+    client.request("GET", server_url)
+    client.request("GET", server_url)
+    stats = client.stats()
+    assert (stats["hits"], stats["misses"], stats["new_connections"]) == (1, 2, 1)
+
+
+def test_pool_maxsize(server_url):
+    client = XhsClient(pool_maxsize=8)
+    barrier = threading.Barrier(8)
+
+    def fetch():
+        barrier.wait()
+        for _ in range(5):
+            client.request("GET", server_url)
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = client.stats()
+    assert stats["hits"] + stats["misses"] == 40
+    assert stats["new_connections"] <= 8
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from xhs import AsyncXhsClient, DataFetchError, IPBlockError, NeedVerifyError
+from xhs.exception import ErrorEnum
+
+from . import test_cookie
+
+
+def make_client(handler, sign=None):
+    def default_sign(uri, data=None, a1="", web_session=""):
+        return {"x-s": f"sign:{uri}", "x-t": "1"}
+
+    return AsyncXhsClient(cookie=test_cookie, sign=sign or default_sign,
+                          transport=httpx.MockTransport(handler))
+
+
+def test_get_note_by_id():
+    def handler(request: httpx.Request):
+        body = json.loads(request.content)
+        assert request.url.path == "/api/sns/web/v1/feed"
+        assert request.headers["x-s"] == "sign:/api/sns/web/v1/feed"
+        assert body["source_note_id"] == "123"
+        return httpx.Response(200, json={"success": True, "data": {
+            "items": [{"note_card": {"note_id": body["source_note_id"]}}]}})
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.get_note_by_id("123", "token")
+
+    assert asyncio.run(main()) == {"note_id": "123"}
+
+
+def test_async_sign():
+    async def sign(uri, data=None, a1="", web_session=""):
+        await asyncio.sleep(0)
+        return {"x-s": a1, "x-t": "1"}
+
+    def handler(request: httpx.Request):
+        assert request.url.params["target_user_id"] == "u1"
+        return httpx.Response(200, json={"success": True, "data": {"x-s": request.headers["x-s"]}})
+
+    async def main():
+        async with make_client(handler, sign=sign) as client:
+            return client.cookie_dict["a1"], await client.get_user_info("u1")
+
+    a1, data = asyncio.run(main())
+    assert data == {"x-s": a1}
+
+
+def test_concurrent_requests_keep_own_signature():
+    def handler(request: httpx.Request):
+        return httpx.Response(200, json={"success": True, "data": {
+            "cursor": request.url.params["cursor"], "x-s": request.headers["x-s"]}})
+
+    async def main():
+        async with make_client(handler) as client:
+            return await asyncio.gather(*[client.get_user_notes("u1", str(i)) for i in range(50)])
+
+    for i, res in enumerate(asyncio.run(main())):
+        assert res["cursor"] == str(i)
+        assert f"cursor={i}&" in res["x-s"]
+
+
+@pytest.mark.parametrize("response, error", [
+    (httpx.Response(200, json={"success": False, "code": ErrorEnum.IP_BLOCK.value.code}), IPBlockError),
+    (httpx.Response(200, json={"success": False, "code": -1}), DataFetchError),
+    (httpx.Response(461, json={}, headers={"Verifytype": "1", "Verifyuuid": "2"}), NeedVerifyError),
+])
+def test_error_mapping(response, error):
+    async def main():
+        async with make_client(lambda request: response) as client:
+            await client.get_self_info()
+
+    with pytest.raises(error):
+        asyncio.run(main())
+
+
+def test_get_note_all_comments_concurrently():
+    from .test_core import EXPECTED_COMMENT_IDS, FakeCommentsApi
+
+    api = FakeCommentsApi()
+
+    def handler(request: httpx.Request):
+        status_code, body = api(request)
+        return httpx.Response(status_code, json=body)
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.get_note_all_comments("n1", max_workers=4)
+
+    assert [comment["id"] for comment in asyncio.run(main())] == EXPECTED_COMMENT_IDS
+
+
+def test_download_file(tmp_path):
+    video = os.urandom(3 * 1024 * 1024 + 5)
+
+    def handler(request: httpx.Request):
+        return httpx.Response(200, content=video)
+
+    async def main():
+        async with make_client(handler) as client:
+            await client.download_file("https://sns-video-bd.xhscdn.com/v1", str(tmp_path / "0.mp4"))
+
+    asyncio.run(main())
+    with open(tmp_path / "0.mp4", "rb") as f:
+        assert f.read() == video
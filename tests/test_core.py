@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from xhs import XhsClient
+from xhs.exception import DataFetchError, ErrorEnum
+
+from . import test_cookie
+from .utils import mock_xhs_client
+
+
+def fake_sign(uri, data=None, a1="", web_session=""):
+    return {"x-s": f"sign:{uri}:{json.dumps(data)}", "x-t": "1"}
+
+
+def make_note_card(note_id):
+    return {
+        "note_id": note_id, "title": note_id, "desc": "", "type": "normal", "user": {},
+        "image_list": [], "tag_list": [], "at_user_list": [], "time": 0, "last_update_time": 0,
+        "interact_info": {"collected_count": "0", "comment_count": "0", "liked_count": "0", "share_count": "0"},
+    }
+
+
+class FakeUserNotesApi:
+    """two pages of user notes, note 3 is abnormal"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def __call__(self, request):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            url = urlparse(request.url)
+            if url.path == "/api/sns/web/v1/user_posted":
+                cursor = parse_qs(url.query).get("cursor", [""])[0]
+                ids = ["1", "2", "3"] if not cursor else ["4", "5"]
+                return 200, {"success": True, "data": {
+                    "cursor": "c1", "has_more": not cursor,
+                    "notes": [{"note_id": i, "xsec_token": "t"} for i in ids]}}
+            body = json.loads(request.body)
+            assert request.headers["x-s"] == f"sign:{url.path}:{json.dumps(body)}"
+            note_id = body["source_note_id"]
+            if note_id == "3":
+                return 200, {"success": False, "code": ErrorEnum.NOTE_ABNORMAL.value.code,
+                             "msg": ErrorEnum.NOTE_ABNORMAL.value.msg}
+            return 200, {"success": True, "data": {"items": [{"note_card": make_note_card(note_id)}]}}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_get_user_all_notes():
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), FakeUserNotesApi())
+    notes = client.get_user_all_notes("u1", crawl_interval=0)
+    assert [note.note_id for note in notes] == ["1", "2", "4", "5"]
+
+
+def test_get_user_all_notes_concurrently():
+    api = FakeUserNotesApi(delay=0.05)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), api)
+    notes = client.get_user_all_notes("u1", max_workers=4)
+    assert [note.note_id for note in notes] == ["1", "2", "4", "5"]
+    assert api.max_active > 1
+
+
+def test_get_user_all_notes_concurrently_raise():
+    def handler(request):
+        if "user_posted" in request.url:
+            return 200, {"success": True, "data": {
+                "cursor": "", "has_more": False, "notes": [{"note_id": "1", "xsec_token": "t"}]}}
+        return 200, {"success": False, "code": -1, "msg": "error"}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), handler)
+    with pytest.raises(DataFetchError):
+        client.get_user_all_notes("u1", max_workers=4)
+
+
+class FakeCommentsApi:
+    """two comment pages, root comment 1 has 65 sub comments, root comment 3 has 2"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    @staticmethod
+    def root(comment_id, sub_count):
+        return {"id": comment_id, "sub_comment_count": str(sub_count), "sub_comment_cursor": f"{comment_id}-1",
+                "sub_comment_has_more": sub_count > 1, "sub_comments": [{"id": f"{comment_id}-0"}][:sub_count]}
+
+    def __call__(self, request):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            url = urlparse(str(request.url))
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/api/sns/web/v2/comment/page":
+                if not params.get("cursor"):
+                    page = {"cursor": "c1", "has_more": True,
+                            "comments": [self.root("1", 65), self.root("2", 0)]}
+                else:
+                    page = {"cursor": "", "has_more": False, "comments": [self.root("3", 2)]}
+                return 200, {"success": True, "data": page}
+            root_id = params["root_comment_id"]
+            start = int(params["cursor"].split("-")[1])
+            total = {"1": 65, "3": 2}[root_id]
+            end = min(start + int(params["num"]), total)
+            return 200, {"success": True, "data": {
+                "cursor": f"{root_id}-{end}", "has_more": end < total,
+                "comments": [{"id": f"{root_id}-{i}"} for i in range(start, end)]}}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+EXPECTED_COMMENT_IDS = ["1", *[f"1-{i}" for i in range(65)], "2", "3", "3-0", "3-1"]
+
+
+def test_get_note_all_comments():
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), FakeCommentsApi())
+    comments = client.get_note_all_comments("n1", crawl_interval=0)
+    assert [comment["id"] for comment in comments] == EXPECTED_COMMENT_IDS
+
+
+def test_get_note_all_comments_concurrently():
+    api = FakeCommentsApi(delay=0.05)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), api)
+    comments = client.get_note_all_comments("n1", max_workers=4, rate=100)
+    assert [comment["id"] for comment in comments] == EXPECTED_COMMENT_IDS
+    assert api.max_active > 1
+
+
+def test_get_note_all_comments_as_tree():
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), FakeCommentsApi())
+    tree = client.get_note_all_comments("n1", max_workers=2, as_tree=True)
+    assert [comment["id"] for comment in tree] == ["1", "2", "3"]
+    assert len(tree[0]["sub_comments"]) == 65
+    assert [comment["id"] for comment in tree[2]["sub_comments"]] == ["3-0", "3-1"]
+
+
+def test_share_client_between_threads():
+    def handler(request):
+        uri = request.url[len("https://edith.xiaohongshu.com"):]
+        return 200, {"success": True, "data": {"x-s": request.headers["x-s"], "uri": uri}}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), handler)
+    stop = threading.Event()
+
+    def set_cookies():
+        # like websectiga set by responses of other threads
+        i = 0
+        while not stop.is_set():
+            client.session.cookies.set(f"cookie{i % 50}", str(i))
+            i += 1
+
+    writer = threading.Thread(target=set_cookies)
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(client.get_user_info, [str(i) for i in range(200)]))
+    finally:
+        stop.set()
+        writer.join()
+    for i, res in enumerate(results):
+        assert res["uri"].endswith(f"target_user_id={i}")
+        assert res["x-s"] == f"sign:{res['uri']}:null"
+    assert "x-s" not in client.session.headers
+
+
+def test_stats_timings():
+    def slow_sign(uri, data=None, a1="", web_session=""):
+        time.sleep(0.05)
+        return fake_sign(uri, data, a1, web_session)
+
+    def handler(request):
+        time.sleep(0.01)
+        return 200, {"success": True, "data": {}}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=slow_sign), handler)
+    client.get_user_info("u1")
+    client.get_user_info("u2")
+    timings = client.stats()["timings"]
+    assert timings["sign"]["count"] == timings["http"]["count"] == 2
+    assert timings["sign"]["seconds"] >= 0.1 and timings["sign"]["max"] >= 0.05
+    assert timings["http"]["seconds"] >= 0.02
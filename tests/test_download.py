@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from xhs import DownloadError
+from xhs.download import CdnLatency, MediaDownloader
+
+from .utils import CdnServer
+
+IMAGE = os.urandom(300 * 1024)
+
+
+@pytest.fixture
+def cdn():
+    servers = []
+
+    def start(files=None, **kwargs):
+        server = CdnServer({"/img": IMAGE} if files is None else files, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def downloader():
+    with MediaDownloader(max_workers=4, hedge_after=0.05, chunk_size=16 * 1024) as downloader:
+        yield downloader
+
+
+def read(filename):
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def test_races_slow_mirror_and_learns_latency(cdn, downloader, tmp_path):
+    slow, fast = cdn(delay=1), cdn()
+    urls = [slow.url + "/img", fast.url + "/img"]
+    started = time.monotonic()
+    downloader.download(urls, str(tmp_path / "0.png"))
+    assert time.monotonic() - started < 0.8
+    assert read(tmp_path / "0.png") == IMAGE
+    assert downloader.latency.rank(urls) == urls[::-1]
+    # the fast mirror is asked first and answers before the next one is raced
+    downloader.download(urls, str(tmp_path / "1.png"))
+    assert len(slow.requests) == 1 and len(fast.requests) == 2
+
+
+def test_fails_over_broken_and_truncated_mirrors(cdn, downloader, tmp_path):
+    broken, truncated, healthy = cdn(status=503), cdn(truncate=1024), cdn(delay=0.2)
+    downloader.download([broken.url + "/img", truncated.url + "/img", healthy.url + "/img"],
+                        str(tmp_path / "0.png"))
+    assert read(tmp_path / "0.png") == IMAGE
+    assert len(healthy.requests) == 1
+
+
+def fail_partially(server, downloader, url, filename) -> list:
+    """segments [start, end, written] of the part left by a download truncated by server"""
+    with pytest.raises(requests.RequestException):
+        downloader.download(url, filename)
+    assert not os.path.exists(filename)
+    with open(filename + ".part.json") as f:
+        segments = json.load(f)["segments"]
+    assert all(0 < written < end - start for start, end, written in segments)
+    server.truncate = None
+    return segments
+
+
+def test_failed_download_is_resumed(cdn, downloader, tmp_path):
+    server = cdn(truncate=100 * 1024, ranges=True)
+    filename = str(tmp_path / "0.mp4")
+    [(_, _, written)] = fail_partially(server, downloader, server.url + "/img", filename)
+    downloader.download(server.url + "/img", filename)
+    assert read(filename) == IMAGE
+    assert not os.path.exists(filename + ".part") and not os.path.exists(filename + ".part.json")
+    _, headers = server.requests[-1]
+    assert headers["Range"] == f"bytes={written}-{len(IMAGE) - 1}"
+    assert headers["If-Range"] == f'"{hashlib.md5(IMAGE).hexdigest()}"'
+
+
+def test_changed_file_is_downloaded_again(cdn, downloader, tmp_path):
+    server = cdn(truncate=100 * 1024, ranges=True)
+    filename = str(tmp_path / "0.mp4")
+    fail_partially(server, downloader, server.url + "/img", filename)
+    changed = os.urandom(200 * 1024)
+    server.files["/img"] = changed
+    downloader.download(server.url + "/img", filename)
+    assert read(filename) == changed
+    assert len(server.requests) == 2
+
+
+def test_file_without_validator_is_downloaded_again(cdn, downloader, tmp_path):
+    server = cdn(truncate=100 * 1024, ranges=True, etag="")
+    filename = str(tmp_path / "0.mp4")
+    fail_partially(server, downloader, server.url + "/img", filename)
+    changed = os.urandom(len(IMAGE))
+    server.files["/img"] = changed
+    downloader.download(server.url + "/img", filename)
+    assert read(filename) == changed
+    _, headers = server.requests[-1]
+    assert "Range" not in headers
+
+
+def test_resume_by_last_modified(cdn, downloader, tmp_path):
+    server = cdn(truncate=100 * 1024, ranges=True, etag='W/"1"', last_modified="Wed, 21 Oct 2026 07:28:00 GMT")
+    filename = str(tmp_path / "0.mp4")
+    [(_, _, written)] = fail_partially(server, downloader, server.url + "/img", filename)
+    downloader.download(server.url + "/img", filename)
+    assert read(filename) == IMAGE
+    _, headers = server.requests[-1]
+    assert headers["Range"] == f"bytes={written}-{len(IMAGE) - 1}"
+    assert headers["If-Range"] == server.last_modified
+
+
+def test_md5_etag_is_checked(cdn, downloader, tmp_path):
+    server = cdn(etag=f'"{hashlib.md5(b"another file").hexdigest()}"')
+    filename = str(tmp_path / "0.png")
+    with pytest.raises(DownloadError):
+        downloader.download(server.url + "/img", filename)
+    assert not os.path.exists(filename) and not os.path.exists(filename + ".part")
+
+
+def test_resume_without_range_support_starts_again(cdn, downloader, tmp_path):
+    server = cdn(truncate=100 * 1024)
+    filename = str(tmp_path / "0.mp4")
+    with pytest.raises(requests.RequestException):
+        downloader.download(server.url + "/img", filename)
+    server.truncate = None
+    downloader.download(server.url + "/img", filename)
+    assert read(filename) == IMAGE
+
+
+def test_parallel_segments(cdn, tmp_path):
+    video = os.urandom(4 * 1024 * 1024 + 7)
+    server = cdn({"/video": video}, ranges=True)
+    filename = str(tmp_path / "0.mp4")
+    with MediaDownloader(segments=4, min_segment_size=1024 * 1024) as downloader:
+        downloader.download(server.url + "/video", filename)
+    assert read(filename) == video
+    assert sorted(headers.get("Range") or "" for _, headers in server.requests) == [
+        "", "bytes=1048578-2097155", "bytes=2097156-3145733", "bytes=3145734-4194310"]
+
+
+def test_segment_failure_resumes_only_missing_bytes(cdn, tmp_path):
+    video = os.urandom(2 * 1024 * 1024)
+    server = cdn({"/video": video}, ranges=True, truncate=512 * 1024)
+    filename = str(tmp_path / "0.mp4")
+    with MediaDownloader(segments=2, min_segment_size=1024 * 1024, chunk_size=64 * 1024) as downloader:
+        segments = fail_partially(server, downloader, server.url + "/video", filename)
+        downloader.download(server.url + "/video", filename)
+    assert read(filename) == video
+    assert sorted(headers["Range"] for _, headers in server.requests[2:]) == sorted(
+        f"bytes={start + written}-{end - 1}" for start, end, written in segments)
+
+
+
+def test_resume_keeps_later_segments_when_first_has_no_bytes(cdn, tmp_path):
+    video = os.urandom(2 * 1024 * 1024)
+    server = cdn({"/video": video}, ranges=True, truncate=512 * 1024)
+    filename = str(tmp_path / "0.mp4")
+    with MediaDownloader(segments=2, min_segment_size=1024 * 1024, chunk_size=64 * 1024) as downloader:
+        segments = fail_partially(server, downloader, server.url + "/video", filename)
+        segments[0][2] = 0
+        with open(filename + ".part.json", "r+") as f:
+            state = json.load(f)
+            state["segments"] = segments
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+        downloader.download(server.url + "/video", filename)
+    assert read(filename) == video
+    (start, end, _), (start1, end1, written1) = segments
+    assert sorted(headers.get("Range") for _, headers in server.requests[2:]) == sorted(
+        [f"bytes={start}-{end - 1}", f"bytes={start1 + written1}-{end1 - 1}"])
+
+
+def test_download_all_is_concurrent_and_ordered(cdn, downloader, tmp_path):
+    files = {f"/{i}": os.urandom(1024 * (i + 1)) for i in range(4)}
+    server = cdn(files, delay=0.3)
+    items = [([server.url + path], str(tmp_path / f"{i}.png")) for i, path in enumerate(files)]
+    started = time.monotonic()
+    assert downloader.download_all(items) == [filename for _, filename in items]
+    assert time.monotonic() - started < 1
+    for (_, filename), body in zip(items, files.values()):
+        assert read(filename) == body
+
+
+def test_latency_ranks_unknown_hosts_first():
+    latency = CdnLatency(alpha=0.5, penalty=10)
+    latency.add("https://a/1", 0.2)
+    latency.fail("https://b/1")
+    assert latency.rank(["https://b/2", "https://a/2", "https://c/2"]) == \
+        ["https://c/2", "https://a/2", "https://b/2"]
+    latency.add("https://a/1", 0.4)
+    assert latency.snapshot() == {"a": pytest.approx(0.3), "b": 10}
+    threads = [threading.Thread(target=latency.add, args=("https://d/1", 1)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert latency.snapshot()["d"] == 1
+
+
+class RecordingDownloader:
+    def __init__(self):
+        self.items = []
+
+    def download(self, urls, filename):
+        self.items.append((urls, filename))
+        return filename
+
+    def download_all(self, items):
+        return [self.download(urls, filename) for urls, filename in items]
+
+
+def test_save_files_from_note_id_downloads_every_mirror(tmp_path):
+    from xhs import XhsClient
+
+    from . import test_cookie
+    from .test_core import fake_sign
+    from .utils import mock_xhs_client
+
+    note = {"note_id": "n1", "title": "title", "type": "normal", "image_list": [
+        {"info_list": [{"url": f"http://sns-webpic-qc.xhscdn.com/202401/abc/spectrum/trace{i}!nd_dft_wlteh_webp_3"}]}
+        for i in range(2)
+    ]}
+    downloader = RecordingDownloader()
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign, downloader=downloader),
+                             lambda request: (200, {"success": True, "data": {"items": [{"note_card": note}]}}))
+    client.save_files_from_note_id("n1", str(tmp_path), "token")
+    urls, filename = downloader.items[1]
+    assert filename == os.path.join(str(tmp_path), "title", "title1.png")
+    assert len(urls) == 4 and all(url.split("?")[0].endswith("/spectrum/trace1") for url in urls)
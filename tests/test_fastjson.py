@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from xhs import XhsClient, fastjson
+
+from . import test_cookie
+from .utils import mock_xhs_client
+
+
+def test_dumps_is_canonical():
+    data = {"keyword": "小红书", "page": 1, "extra": {"a": [1, 2]}}
+    assert fastjson.dumps(data) == json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def test_loads():
+    assert fastjson.loads(b'{"a": "\xe5\xb0\x8f"}') == {"a": "小"}
+    with pytest.raises(fastjson.DecodeError):
+        fastjson.loads(b"<html></html>")
+
+
+def test_post_body_is_serialized_once():
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.body)
+        return 200, {"success": True, "data": {"x-s": request.headers["x-s"]}}
+
+    client = mock_xhs_client(XhsClient(test_cookie), handler)
+    data = {"ticket": "小红书"}
+    res = client.post("/sso/customer_login", data, is_creator=True)
+    assert bodies == [fastjson.dumps(data)]
+    assert res["x-s"]
+
+
+def test_not_json_response_is_returned():
+    client = mock_xhs_client(XhsClient(test_cookie), lambda request: (200, b"<xml></xml>"))
+    assert client.request("GET", "https://ros-upload.xiaohongshu.com/id?uploads").text == "<xml></xml>"
@@ -1,4 +1,6 @@
+import hashlib
 import json
+import os
 
 import pytest
 import requests
@@ -7,6 +9,12 @@ from xhs import help
 
 from . import test_cookie
 
+# "sign" vectors are outputs of the original sign implementation, the rewrite must match them
+# bit for bit, "sign_serialized" vectors sign an already serialized str body, which the original
+# implementation serialized again, they record the behaviour of signing the body as it is sent
+with open(os.path.join(os.path.dirname(__file__), "data", "sign_vectors.json"), encoding="utf-8") as f:
+    SIGN_VECTORS = json.load(f)
+
 
 @pytest.fixture
 def header():
@@ -108,3 +116,46 @@ def test_cookie_to_dict():
     cookie = "a1=1875ee347c84l911yfccaewmv2ntixkksu1c6vyu550000205660;"
     cookie_dict = help.cookie_str_to_cookie_dict(cookie)
     assert cookie_dict.get("a1")
+
+
+def test_sign_serialized_data():
+    uri = "/api/sns/web/v1/feed"
+    data = {"source_note_id": "63db8819000000001a01ead1", "keyword": "小红书"}
+    body = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+    expected = help.sign(uri, data, ctime=1700000000000, a1="a1")
+    assert help.sign(uri, body, ctime=1700000000000, a1="a1") == expected
+    assert help.sign(uri, body.encode(), ctime=1700000000000, a1="a1") == expected
+
+
+@pytest.mark.parametrize("vector", SIGN_VECTORS["sign"] + SIGN_VECTORS["sign_serialized"])
+def test_sign_golden_vectors(vector):
+    assert help.sign(vector["uri"], vector["data"], ctime=vector["ctime"],
+                     a1=vector["a1"], b1=vector["b1"]) == vector["result"]
+
+
+def test_mrc_golden_vectors():
+    for e, expected in SIGN_VECTORS["mrc"]:
+        assert help.mrc(e) == expected
+
+
+def test_encode_utf8_golden_vectors():
+    for e, expected in SIGN_VECTORS["encodeUtf8"]:
+        assert list(help.encodeUtf8(e)) == expected
+
+
+def test_b64_encode_golden_vectors():
+    for e, expected in SIGN_VECTORS["b64Encode"]:
+        assert help.b64Encode(bytes.fromhex(e)) == expected
+        assert help.b64Encode(list(bytes.fromhex(e))) == expected
+    for n, expected in SIGN_VECTORS["b64EncodeLarge"]:
+        e = bytes((i * 31 + 7) % 256 for i in range(n))
+        assert hashlib.sha256(help.b64Encode(e).encode()).hexdigest() == expected
+
+
+def test_triplet_and_chunk_helpers():
+    e = bytes.fromhex("00ff10a5c3e7")
+    n = (e[0] << 16) + (e[1] << 8) + e[2]
+    assert help.tripletToBase64(n) == "".join(help.lookup[(n >> shift) & 63] for shift in (18, 12, 6, 0))
+    assert help.encodeChunk(e, 0, 6) == help.tripletToBase64(n) + help.tripletToBase64(
+        (e[3] << 16) + (e[4] << 8) + e[5])
+    assert help.encodeChunk(list(e), 3, 5) == help.b64Encode(e[3:6])
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from xhs import AsyncXhsClient, IPBlockError, NeedVerifyError, XhsClient
+from xhs.core import create_http2_client
+from xhs.exception import ErrorEnum
+
+from . import test_cookie
+from .test_core import fake_sign
+from .utils import H2Server
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+
+def api_handler(headers, body):
+    path = headers[":path"]
+    if path.startswith("/api/sns/web/v1/user/otherinfo"):
+        return 200, {"success": True, "data": {"x-s": headers["x-s"], "cookie": headers["cookie"]}}
+    if path == "/api/sns/web/v1/feed":
+        return 200, {"success": True, "data": {"items": [{"note_card": json.loads(body)}]}}
+    if path.startswith("/api/sns/web/v1/user_posted"):
+        return None
+    if path == "/api/sns/web/v1/homefeed/category":
+        time.sleep(0.5)
+        return 200, {"success": True, "data": {}}
+    if path == "/api/sns/web/v1/user/selfinfo":
+        return 200, {"success": False, "code": ErrorEnum.IP_BLOCK.value.code}
+    return 461, {}, {"verifytype": "1", "verifyuuid": "2"}
+
+
+@pytest.fixture
+def server():
+    server = H2Server(api_handler)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(server):
+    with XhsClient(test_cookie, sign=fake_sign, http2=True) as client:
+        # prior knowledge, the stand-in server speaks cleartext HTTP/2
+        client.http2_client.close()
+        client.http2_client = create_http2_client(http1=False)
+        client._host = server.url
+        yield client
+
+
+def test_http2_get_and_post(client: XhsClient):
+    res = client.get_user_info("u1")
+    assert res["x-s"] == "sign:/api/sns/web/v1/user/otherinfo?target_user_id=u1:null"
+    assert "a1=" in res["cookie"]
+    assert client.get_note_by_id("n1", "t")["source_note_id"] == "n1"
+
+
+def test_http2_error_mapping(client: XhsClient):
+    with pytest.raises(IPBlockError):
+        client.get_self_info()
+    with pytest.raises(NeedVerifyError):
+        client.get_self_info2()
+
+
+def test_http2_transport_errors_are_requests_errors(server, client: XhsClient):
+    with pytest.raises(requests.ConnectionError) as e:
+        client.get_user_notes("u1")
+    assert isinstance(e.value.__cause__, httpx.TransportError)
+    client.http2_client.close()
+    client.http2_client = create_http2_client(timeout=0.1, http1=False)
+    with pytest.raises(requests.Timeout):
+        client.get_home_feed_category()
+
+
+def test_http2_multiplex(server, client: XhsClient):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(client.get_user_info, [str(i) for i in range(40)]))
+    assert len(results) == 40
+    assert server.streams == 40
+    assert server.connections == 1
+
+
+def test_async_http2(server):
+    async def main():
+        async with AsyncXhsClient(test_cookie, sign=fake_sign, http2=True,
+                                  transport=httpx.AsyncHTTPTransport(http1=False, http2=True)) as client:
+            client._host = server.url
+            res = await asyncio.gather(*[client.get_user_info(str(i)) for i in range(20)])
+            with pytest.raises(IPBlockError):
+                await client.get_self_info()
+            return res
+
+    assert len(asyncio.run(main())) == 20
+    assert server.connections == 1
+
+
+def test_close_stops_http2_loop():
+    client = XhsClient(test_cookie, sign=fake_sign, http2=True)
+    thread = client.http2_client._thread
+    with client:
+        assert thread.is_alive()
+    assert not thread.is_alive()
+    assert client.http2_client is None
+    client.close()
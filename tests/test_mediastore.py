@@ -0,0 +1,139 @@
+import os
+import threading
+
+import pytest
+import requests
+
+from xhs import MediaStore, XhsClient
+from xhs.download import MediaDownloader
+from xhs.mediastore import note_media
+
+from . import test_cookie
+from .test_core import fake_sign
+from .utils import CdnServer, mock_xhs_client
+
+FILES = {f"/trace{i}": os.urandom(1024 * (i + 1)) for i in range(3)}
+
+
+@pytest.fixture
+def cdn():
+    server = CdnServer(dict(FILES))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    with MediaDownloader(max_workers=4) as downloader, MediaStore(str(tmp_path / "media"), downloader) as store:
+        yield store
+
+
+def read(filename):
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def items_of(cdn, paths):
+    return [(path[1:], [cdn.url + path], ".png") for path in paths]
+
+
+def test_assets_are_fetched_once(cdn, store, tmp_path):
+    items = items_of(cdn, ["/trace0", "/trace1", "/trace0"])
+    paths = store.fetch_all(items)
+    assert paths[0] == paths[2]
+    assert [read(path) for path in paths] == [FILES["/trace0"], FILES["/trace1"], FILES["/trace0"]]
+    assert os.path.relpath(paths[0], store.root) == MediaStore.relpath_of("trace0", ".png")
+    assert len(MediaStore.relpath_of("trace0").split(os.sep)) == 3
+    assert len(cdn.requests) == 2
+
+    assert store.fetch_all(items_of(cdn, ["/trace1", "/trace2"]))[0] == paths[1]
+    assert len(cdn.requests) == 3
+    # the index survives the process
+    with MediaStore(store.root, store.downloader) as reopened:
+        assert reopened.fetch_all(items_of(cdn, ["/trace0", "/trace1", "/trace2"]))[:2] == paths[:2]
+        assert reopened.get("trace2") and reopened.get("trace3") is None
+    assert len(cdn.requests) == 3
+
+
+def test_deleted_file_is_fetched_again(cdn, store):
+    [path] = store.fetch_all(items_of(cdn, ["/trace0"]))
+    os.remove(path)
+    assert store.get("trace0") is None
+    assert read(store.fetch_all(items_of(cdn, ["/trace0"]))[0]) == FILES["/trace0"]
+    assert len(cdn.requests) == 2
+
+
+def test_failed_asset_does_not_block_others(cdn, store):
+    with pytest.raises(requests.RequestException):
+        store.fetch_all(items_of(cdn, ["/trace0", "/missing"]))
+    assert store.get("trace0") and store.get("missing") is None
+    store.fetch_all(items_of(cdn, ["/trace0"]))
+    assert len(cdn.requests) == 2
+
+
+def test_failed_shard_directory_releases_key(cdn, store):
+    # a file where the shard directory belongs makes makedirs fail
+    shard = os.path.join(store.root, MediaStore.relpath_of("trace0").split(os.sep)[0])
+    with open(shard, "wb"):
+        pass
+    for _ in range(2):
+        with pytest.raises(OSError):
+            store.fetch_all(items_of(cdn, ["/trace0"]))
+    assert not store._fetching
+    os.remove(shard)
+    assert read(store.fetch_all(items_of(cdn, ["/trace0"]))[0]) == FILES["/trace0"]
+
+
+def test_concurrent_fetches_share_downloads(cdn, store):
+    cdn.delay = 0.2
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.fetch_all(items_of(cdn, ["/trace1"]))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4 and len({tuple(paths) for paths in results}) == 1
+    assert len(cdn.requests) == 1
+
+
+class WritingDownloader:
+    """downloader writing the first url into the file"""
+
+    def __init__(self):
+        self.urls = []
+
+    def download_all(self, items, return_exceptions=False):
+        for urls, filename in items:
+            self.urls.append(urls[0])
+            with open(filename, "w") as f:
+                f.write(urls[0])
+        return [filename for _, filename in items]
+
+
+NOTE = {"note_id": "n1", "title": "title", "type": "normal", "image_list": [
+    {"info_list": [{"url": "http://sns-webpic-qc.xhscdn.com/202401/abc/spectrum/trace0!nd_dft_wlteh_webp_3"}]},
+    {"info_list": [{"url": "http://sns-webpic-qc.xhscdn.com/202401/abc/trace1!nd_dft_wlteh_webp_3"}]},
+]}
+
+
+def test_note_media():
+    assert [(key, len(urls), ext) for key, urls, ext in note_media(NOTE)] == [
+        ("spectrum/trace0", 4, ".png"), ("trace1", 4, ".png")]
+    video = {"type": "video", "video": {"consumer": {"origin_video_key": "pre_post/video0"}}}
+    assert [(key, urls[0].split("/", 3)[-1], ext) for key, urls, ext in note_media(video)] == [
+        ("pre_post/video0", "pre_post/video0", ".mp4")]
+
+
+def test_fetch_note_and_client(tmp_path):
+    downloader = WritingDownloader()
+    store = MediaStore(str(tmp_path / "media"), downloader)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign),
+                             lambda request: (200, {"success": True, "data": {"items": [{"note_card": NOTE}]}}))
+    for run in range(2):
+        client.save_files_from_note_id("n1", str(tmp_path), "token", store=store)
+    assert len(downloader.urls) == 2
+    assert store.note_paths("n1") == [store.get("spectrum/trace0"), store.get("trace1")]
+    saved = tmp_path / "title" / "title1.png"
+    assert "/trace1?" in saved.read_text() and os.path.samefile(saved, store.get("trace1"))
+    store.close()
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from xhs import XhsClient, models
+from xhs.exception import DataFetchError, ErrorEnum
+
+from . import test_cookie
+from .utils import mock_xhs_client
+
+COMMENT_PAGE = {
+    "cursor": "c1",
+    "has_more": True,
+    "xsec_token": "unused",
+    "comments": [{
+        "id": "1", "note_id": "n", "content": "root", "create_time": 1700000000000, "like_count": "3",
+        "user_info": {"user_id": "u1", "nickname": "a", "image": "unused"},
+        "sub_comment_count": "1", "sub_comment_cursor": "s1", "sub_comment_has_more": False,
+        "sub_comments": [{"id": "2", "content": "sub", "target_comment": {"id": "1", "user_info": {"user_id": "u1"}}}],
+        "status": 0,
+    }],
+}
+
+
+def fake_sign(uri, data=None, a1="", web_session=""):
+    return {"x-s": "s", "x-t": "1"}
+
+
+def test_decode_response():
+    content = json.dumps({"success": True, "code": 0, "msg": "", "data": COMMENT_PAGE}).encode()
+    success, page = models.decode_response(content, models.CommentPage)
+    assert success
+    assert isinstance(page, models.CommentPage)
+    assert page.cursor == "c1" and page.has_more
+    comment = page.comments[0]
+    assert comment.like_count == "3"
+    assert comment.user_info.nickname == "a"
+    assert comment.sub_comments[0].target_comment.user_info.user_id == "u1"
+    assert comment.sub_comments[0].ip_location == ""
+
+
+def test_decode_response_fallback(monkeypatch):
+    content = json.dumps({"success": True, "data": COMMENT_PAGE}).encode()
+    expected = models.decode_response(content, models.CommentPage)
+    monkeypatch.setattr(models, "msgspec", None)
+    assert models.decode_response(content, models.CommentPage) == expected
+
+
+def test_decode_response_unexpected_type():
+    # has_more is a string here, msgspec rejects it and the lenient converter keeps it
+    content = json.dumps({"success": True, "data": {"has_more": "yes", "comments": []}}).encode()
+    success, page = models.decode_response(content, models.CommentPage)
+    assert success and page.has_more == "yes"
+
+
+def test_typed_endpoints():
+    def handler(request):
+        if request.path_url.startswith("/api/sns/web/v1/feed"):
+            note_card = {"note_id": "n", "title": "t", "interact_info": {"liked_count": "10"}, "image_list": [{}]}
+            return 200, {"success": True, "data": {"items": [{"id": "n", "note_card": note_card}]}}
+        return 200, {"success": True, "data": COMMENT_PAGE}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), handler)
+    note = client.get_note_by_id("n", "token", typed=True)
+    assert isinstance(note, models.NoteCard)
+    assert note.title == "t" and note.interact_info.liked_count == "10"
+    assert note.image_list == [models.Image()]
+    assert client.get_note_comments("n", typed=True).comments[0].id == "1"
+    assert client.get_note_comments("n")["comments"][0]["status"] == 0
+
+
+def test_typed_endpoint_error():
+    def handler(request):
+        return 200, {"success": False, "code": ErrorEnum.NOTE_ABNORMAL.value.code,
+                     "msg": ErrorEnum.NOTE_ABNORMAL.value.msg}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), handler)
+    with pytest.raises(DataFetchError):
+        client.get_note_by_id("n", "token", typed=True)
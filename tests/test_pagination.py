@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from xhs import XhsClient
+from xhs.pagination import AsyncCursorIterator, CursorIterator
+
+from . import test_cookie
+from .test_core import fake_sign
+from .utils import mock_xhs_client
+
+PAGES = {
+    "": {"cursor": "c1", "has_more": True, "comments": [
+        {"id": "1", "create_time": 1700000003000}, {"id": "2", "create_time": 1700000002000}]},
+    "c1": {"cursor": "c2", "has_more": False, "comments": [
+        {"id": "3", "create_time": 1700000001000}]},
+}
+
+
+class FakeApi:
+    def __init__(self):
+        self.cursors = []
+
+    def __call__(self, cursor):
+        self.cursors.append(cursor)
+        return PAGES[cursor]
+
+
+def make_iterator(api, **kwargs):
+    return CursorIterator(api, "comments", id_key="id", time_key="create_time", **kwargs)
+
+
+def test_iterate_all_pages():
+    api = FakeApi()
+    assert [item["id"] for item in make_iterator(api)] == ["1", "2", "3"]
+    assert api.cursors == ["", "c1"]
+
+
+def test_limit_fetch_no_more_page():
+    api = FakeApi()
+    assert [item["id"] for item in make_iterator(api, limit=2)] == ["1", "2"]
+    assert api.cursors == [""]
+
+
+@pytest.mark.parametrize("until", ["2", 1700000002500, 1700000002.5])
+def test_until(until):
+    api = FakeApi()
+    assert [item["id"] for item in make_iterator(api, until=until)] == ["1"]
+    assert api.cursors == [""]
+
+
+def test_cursor_checkpoint():
+    api = FakeApi()
+    iterator = make_iterator(api)
+    next(iterator)
+    assert (iterator.cursor, iterator.next_cursor) == ("", "c1")
+    resumed = make_iterator(api, cursor=iterator.next_cursor)
+    assert [item["id"] for item in resumed] == ["3"]
+
+
+def test_until_timestamp_without_time_key():
+    with pytest.raises(ValueError):
+        CursorIterator(FakeApi(), "notes", until=1700000000)
+
+
+def test_async_cursor_iterator():
+    api = FakeApi()
+
+    async def fetch_page(cursor):
+        return api(cursor)
+
+    async def main():
+        iterator = AsyncCursorIterator(fetch_page, "comments", limit=3)
+        return [item["id"] async for item in iterator]
+
+    assert asyncio.run(main()) == ["1", "2", "3"]
+
+
+def test_client_iter_note_comments():
+    def handler(request):
+        cursor = "c1" if "cursor=c1" in request.url else ""
+        return 200, {"success": True, "data": PAGES[cursor]}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign), handler)
+    iterator = client.iter_note_comments("n1", until=1700000001500)
+    assert [item["id"] for item in iterator] == ["1", "2"]
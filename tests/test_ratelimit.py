@@ -0,0 +1,113 @@
+import io
+import time
+
+import pytest
+
+from xhs import AdaptiveRateLimiter, IPBlockError, NeedVerifyError, XhsClient
+from xhs.exception import ErrorEnum
+from xhs.ratelimit import TokenBucket
+
+from . import test_cookie
+from .test_core import fake_sign
+from .utils import mock_xhs_client
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_token_bucket_try_acquire():
+    bucket = TokenBucket(rate=1)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_adaptive_rate_limiter_backoff_and_recover():
+    limiter = AdaptiveRateLimiter(rate=4, rates={"creator.xiaohongshu.com": 1}, recover_after=2,
+                                  recover_factor=2, base_delay=1)
+    assert limiter.current_rate("creator.xiaohongshu.com") == 1
+    delay = limiter.on_blocked("edith.xiaohongshu.com", attempt=1)
+    assert 1 <= delay <= 2
+    assert limiter.current_rate("edith.xiaohongshu.com") == 2
+    limiter.on_success("edith.xiaohongshu.com")
+    assert limiter.current_rate("edith.xiaohongshu.com") == 2
+    for _ in range(4):
+        limiter.on_success("edith.xiaohongshu.com")
+    assert limiter.current_rate("edith.xiaohongshu.com") == 4
+
+
+def test_client_retry_when_ip_blocked():
+    responses = [
+        (200, {"success": False, "code": ErrorEnum.IP_BLOCK.value.code}),
+        (200, {"success": True, "data": {"ok": 1}}),
+    ]
+    limiter = AdaptiveRateLimiter(rate=100, base_delay=0.01)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign, rate_limiter=limiter),
+                             lambda request: responses.pop(0))
+    assert client.get_self_info() == {"ok": 1}
+    assert limiter.current_rate("edith.xiaohongshu.com") == 50
+
+
+def test_client_retry_signs_again():
+    calls = []
+
+    def counting_sign(uri, data=None, a1="", web_session=""):
+        return {"x-s": "sign", "x-t": str(len(calls))}
+
+    def handler(request):
+        calls.append(request.headers["x-t"])
+        if len(calls) == 1:
+            return 200, {"success": False, "code": ErrorEnum.IP_BLOCK.value.code}
+        return 200, {"success": True, "data": {"ok": 1}}
+
+    limiter = AdaptiveRateLimiter(rate=100, base_delay=0.01)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=counting_sign, rate_limiter=limiter), handler)
+    assert client.post("/api/sns/web/v1/feed", {"source_note_id": "n1"}) == {"ok": 1}
+    assert calls == ["0", "1"]
+
+
+def test_client_does_not_retry_stream_body():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return 200, {"success": False, "code": ErrorEnum.IP_BLOCK.value.code}
+
+    limiter = AdaptiveRateLimiter(rate=100, base_delay=0.01)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign, rate_limiter=limiter), handler)
+    with pytest.raises(IPBlockError):
+        client.request("PUT", "https://ros-upload.xiaohongshu.com/f1", data=io.BytesIO(b"image"))
+    assert len(calls) == 1
+
+
+def test_client_raise_when_retries_exhausted():
+    limiter = AdaptiveRateLimiter(rate=100, base_delay=0.01, max_retries=1)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign, rate_limiter=limiter),
+                             lambda request: (200, {"success": False, "code": ErrorEnum.IP_BLOCK.value.code}))
+    with pytest.raises(IPBlockError):
+        client.get_self_info()
+
+
+def test_client_raise_need_verify_at_once():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return 461, {}, {"Verifytype": "1", "Verifyuuid": "2"}
+
+    limiter = AdaptiveRateLimiter(rate=100)
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign, rate_limiter=limiter), handler)
+    with pytest.raises(NeedVerifyError):
+        client.get_self_info()
+    assert len(calls) == 1
+    assert limiter.current_rate("edith.xiaohongshu.com") == 50
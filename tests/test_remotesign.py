@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from xhs import RemoteSigner, SignError
+from xhs.help import sign as local_sign
+
+
+def start_sign_server(name, delay=0.0, status=200):
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append((payload, self.client_address))
+            time.sleep(delay)
+            body = json.dumps({"x-s": name, "x-t": 1700000000000}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass  # hedged and timed out clients hang up before slow replicas answer
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.calls = calls
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    return server
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(*args, **kwargs):
+        server = start_sign_server(*args, **kwargs)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def test_keep_alive_and_round_robin(servers):
+    first, second = servers("first"), servers("second")
+    signer = RemoteSigner([first.url, second.url])
+    try:
+        signs = [signer("/api/sns/web/v1/feed", {"source_note_id": "n1"}, a1="a1")["x-s"] for _ in range(4)]
+    finally:
+        signer.close()
+    assert signs == ["first", "second", "first", "second"]
+    assert first.calls[0][0] == {"uri": "/api/sns/web/v1/feed", "data": {"source_note_id": "n1"},
+                                 "a1": "a1", "web_session": ""}
+    # the second call of a replica reuses the connection of the first one
+    assert first.calls[0][1] == first.calls[1][1]
+
+
+def test_hedges_slow_replica(servers):
+    slow, fast = servers("slow", delay=1), servers("fast")
+    signer = RemoteSigner([slow.url, fast.url], hedge_after=0.05)
+    try:
+        started = time.monotonic()
+        signs = signer("/api/sns/web/v1/feed")
+        elapsed = time.monotonic() - started
+    finally:
+        signer.close()
+    assert signs == {"x-s": "fast", "x-t": "1700000000000"}
+    assert elapsed < 0.5
+    assert len(slow.calls) == len(fast.calls) == 1
+
+
+def test_failed_replica_is_skipped_at_once(servers):
+    broken, healthy = servers("broken", status=500), servers("healthy")
+    signer = RemoteSigner([broken.url, healthy.url], hedge_after=10)
+    try:
+        assert signer("/api/sns/web/v1/feed")["x-s"] == "healthy"
+    finally:
+        signer.close()
+
+
+def test_timeout_and_local_fallback(servers):
+    slow = servers("slow", delay=1)
+    signer = RemoteSigner([slow.url], timeout=0.1)
+    try:
+        with pytest.raises(SignError):
+            signer("/api/sns/web/v1/feed")
+        signs = signer("/api/galaxy/creator/data/note_detail", a1="a1")
+    finally:
+        signer.close()
+    expected = local_sign("/api/galaxy/creator/data/note_detail", ctime=int(signs["x-t"]), a1="a1")
+    assert signs == expected
+
+
+def test_async_hedges_and_falls_back():
+    httpx = pytest.importorskip("httpx")
+    from xhs import AsyncRemoteSigner
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "slow":
+            await asyncio.sleep(1)
+        if request.url.host == "down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"x-s": request.url.host, "x-t": 1700000000000})
+
+    async def main():
+        transport = httpx.MockTransport(handler)
+        signer = AsyncRemoteSigner(["http://slow", "http://fast"], hedge_after=0.05, transport=transport)
+        started = time.monotonic()
+        assert (await signer("/api/sns/web/v1/feed"))["x-s"] == "fast"
+        assert time.monotonic() - started < 0.5
+        await signer.aclose()
+
+        signer = AsyncRemoteSigner(["http://down"], transport=transport)
+        with pytest.raises(SignError):
+            await signer("/api/sns/web/v1/feed")
+        signs = await signer("/api/cas/customer/web/service-ticket", a1="a1")
+        assert signs["x-s-common"]
+        await signer.aclose()
+
+    asyncio.run(main())
+    assert calls == ["slow", "fast", "down", "down"]
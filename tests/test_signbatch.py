@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from xhs import BatchSigner, XhsClient
+
+from . import test_cookie
+from .utils import mock_xhs_client
+
+
+class FakeBatchSigner:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, items, a1="", web_session=""):
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append((len(items), a1))
+        return [{"x-s": f"{a1}:{uri}", "x-t": "1"} for uri, data in items]
+
+
+def test_concurrent_calls_are_batched():
+    sign_batch = FakeBatchSigner()
+    signer = BatchSigner(sign_batch, window=0.2, max_batch=8)
+    uris = [f"/api/{i}" for i in range(16)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        signs = list(executor.map(lambda uri: signer(uri, a1="a"), uris))
+    assert [s["x-s"] for s in signs] == [f"a:{uri}" for uri in uris]
+    assert sum(size for size, _ in sign_batch.batches) == 16
+    assert len(sign_batch.batches) < 16
+
+
+def test_batches_never_mix_a1():
+    sign_batch = FakeBatchSigner()
+    signer = BatchSigner(sign_batch, window=0.1)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        signs = list(executor.map(lambda i: signer(f"/api/{i}", a1=str(i % 2)), range(8)))
+    assert [s["x-s"] for s in signs] == [f"{i % 2}:/api/{i}" for i in range(8)]
+    assert {a1 for _, a1 in sign_batch.batches} == {"0", "1"}
+
+
+def test_single_call_waits_window_only():
+    signer = BatchSigner(FakeBatchSigner(), window=0.05)
+    start = time.monotonic()
+    assert signer("/api/1")["x-s"] == ":/api/1"
+    assert time.monotonic() - start < 1
+
+
+def test_errors_reach_every_caller():
+    def sign_batch(items, a1="", web_session=""):
+        raise ConnectionError("signer is down")
+
+    signer = BatchSigner(sign_batch, window=0.1)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(signer, f"/api/{i}") for i in range(4)]
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result()
+
+
+def test_client_with_batch_signer():
+    def handler(request):
+        return 200, {"success": True, "data": {"x-s": request.headers["x-s"]}}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=BatchSigner(FakeBatchSigner())), handler)
+    assert client.get_user_info("u1")["x-s"].endswith("/api/sns/web/v1/user/otherinfo?target_user_id=u1")
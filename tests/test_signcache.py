@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from xhs import SignCache, XhsClient
+
+from . import test_cookie
+from .utils import mock_xhs_client
+
+
+class CountingSign:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, uri, data=None, a1="", web_session=""):
+        self.calls += 1
+        return {"x-s": f"s{self.calls}", "x-t": str(int(time.time() * 1000))}
+
+
+def test_key_is_canonical():
+    data = {"keyword": "小红书", "page": 1}
+    key = SignCache.key("/api/sns/web/v1/search/notes", data, "a1")
+    assert SignCache.key("/api/sns/web/v1/search/notes", '{"keyword":"小红书","page":1}', "a1") == key
+    assert SignCache.key("/api/sns/web/v1/search/notes", data, "other") != key
+    assert SignCache.key("/api/sns/web/v1/feed", None, None) == ("/api/sns/web/v1/feed", b"", "")
+
+
+def test_ttl_follows_x_t():
+    cache = SignCache(ttl=60)
+    cache.put("fresh", {"x-s": "1", "x-t": str(int(time.time() * 1000))})
+    cache.put("stale", {"x-s": "2", "x-t": str(int((time.time() - 61) * 1000))})
+    cache.put("seconds", {"x-s": "3", "x-t": str(int(time.time()))})
+    assert cache.get("fresh") == {"x-s": "1", "x-t": cache.get("fresh")["x-t"]}
+    assert cache.get("stale") is None
+    assert cache.get("seconds")["x-s"] == "3"
+    assert len(cache) == 2
+
+
+def test_lru_eviction():
+    cache = SignCache(maxsize=2)
+    x_t = str(int(time.time() * 1000))
+    cache.put("a", {"x-t": x_t})
+    cache.put("b", {"x-t": x_t})
+    assert cache.get("a")
+    cache.put("c", {"x-t": x_t})
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_client_reuses_signature():
+    counting_sign = CountingSign()
+    signatures = []
+
+    def handler(request):
+        signatures.append(request.headers["x-s"])
+        return 200, {"success": True, "data": {}}
+
+    cache = SignCache()
+    client = mock_xhs_client(XhsClient(test_cookie, sign=counting_sign, sign_cache=cache), handler)
+    client.get_note_comments("n1", "")
+    client.get_note_comments("n1", "")
+    client.get_note_comments("n1", "c1")
+    client.post("/api/sns/web/v1/feed", {"source_note_id": "n1"})
+    client.post("/api/sns/web/v1/feed", {"source_note_id": "n1"})
+    assert counting_sign.calls == 3
+    assert signatures == ["s1", "s1", "s2", "s3", "s3"]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_async_client_reuses_signature():
+    httpx = pytest.importorskip("httpx")
+    from xhs import AsyncXhsClient
+
+    counting_sign = CountingSign()
+
+    async def async_sign(uri, data=None, a1="", web_session=""):
+        return counting_sign(uri, data, a1, web_session)
+
+    async def main():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"success": True, "data": {}}))
+        async with AsyncXhsClient(test_cookie, sign=async_sign, transport=transport,
+                                  sign_cache=SignCache()) as client:
+            for _ in range(3):
+                await client.get_user_info("u1")
+            await client.get_user_info("u2")
+
+    asyncio.run(main())
+    assert counting_sign.calls == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from xhs import Signer, XhsClient
+from xhs.help import sign
+
+from . import test_cookie
+from .test_help import SIGN_VECTORS
+from .utils import mock_xhs_client
+
+
+@pytest.fixture(scope="module")
+def signer():
+    return Signer(maxsize=4)
+
+
+@pytest.mark.parametrize("vector", SIGN_VECTORS["sign"] + SIGN_VECTORS["sign_serialized"])
+def test_sign_golden_vectors(signer, vector):
+    assert signer(vector["uri"], vector["data"], ctime=vector["ctime"],
+                  a1=vector["a1"], b1=vector["b1"]) == vector["result"]
+
+
+@pytest.mark.parametrize("ctime", [7, 1700000000000, 17000000000001])
+def test_every_alignment_matches_sign(signer, ctime):
+    # lengths of a1, b1 and x-t move the static segments over every base64 alignment
+    for a1 in ["", "a", "ab", None]:
+        for n in range(7):
+            b1 = "I38rHdg\"中文"[:n] * 3
+            assert signer("/api/sns/web/v1/feed", {"note_id": "n1"}, ctime, a1=a1, b1=b1) == \
+                sign("/api/sns/web/v1/feed", {"note_id": "n1"}, ctime, a1=a1, b1=b1)
+    assert len(signer._templates) <= 4
+
+
+def test_client_sign_function():
+    signer = Signer(b1="b1")
+    headers = []
+
+    def handler(request):
+        headers.append(request.headers)
+        return 200, {"success": True, "data": {}}
+
+    client = mock_xhs_client(XhsClient(test_cookie, sign=signer), handler)
+    client.get_user_info("u1")
+    a1 = client.cookie_dict["a1"]
+    expected = sign("/api/sns/web/v1/user/otherinfo?target_user_id=u1", ctime=int(headers[0]["x-t"]), a1=a1, b1="b1")
+    assert headers[0]["x-s"] == expected["x-s"]
+    assert headers[0]["x-s-common"] == expected["x-s-common"]
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from xhs import XhsClient
+from xhs.help import parse_xml
+from xhs.upload import UploadManifest, part_ranges
+
+from . import test_cookie
+from .test_core import fake_sign
+from .utils import mock_xhs_client
+
+PART_SIZE = 1000
+
+
+class RosUpload:
+    """stand-in of ros-upload multipart apis, failures: {part_number: times it fails}"""
+
+    def __init__(self, failures=None, delay=0):
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.parts = {}
+        self.initiated = 0
+        self.completed = None
+        self.lock = threading.Lock()
+
+    def __call__(self, method, url, body):
+        query = parse_qs(urlparse(url).query, keep_blank_values=True)
+        if method == "POST" and "uploads" in query:
+            self.initiated += 1
+            return 200, b"<InitiateMultipartUploadResult><UploadId>u1</UploadId></InitiateMultipartUploadResult>"
+        if method == "POST":
+            assert query["uploadId"] == ["u1"]
+            self.completed = parse_xml(body)["Part"]
+            return 200, b"", {"X-Ros-Video-Id": "v1"}
+        time.sleep(self.delay)
+        part_number = int(query["partNumber"][0])
+        with self.lock:
+            if self.failures.get(part_number):
+                self.failures[part_number] -= 1
+                return 500, b"<Error><Code>InternalError</Code></Error>"
+            self.parts[part_number] = bytes(body)
+        return 200, b"", {"ETag": f'"etag-{part_number}"'}
+
+    def data(self) -> bytes:
+        return b"".join(self.parts[number] for number in sorted(self.parts))
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(os.urandom(3 * PART_SIZE + 123))
+    return str(path)
+
+
+def make_client(ros):
+    return mock_xhs_client(XhsClient(test_cookie, sign=fake_sign),
+                           lambda request: ros(request.method, request.url, request.body))
+
+
+def test_part_ranges():
+    assert part_ranges(2500, 1000) == [(1, 0, 1000), (2, 1000, 2000), (3, 2000, 2500)]
+    assert part_ranges(2000, 1000) == [(1, 0, 1000), (2, 1000, 2000)]
+    assert part_ranges(0, 1000) == []
+
+
+def test_parts_are_uploaded_in_parallel_and_retried_alone(video, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    ros = RosUpload(failures={2: 2})
+    progress = []
+    res = make_client(ros).upload_file_with_slice("f1", "token", video, part_size=PART_SIZE,
+                                                  progress=lambda *args: progress.append(args))
+    assert res.headers["X-Ros-Video-Id"] == "v1"
+    with open(video, "rb") as f:
+        assert ros.data() == f.read()
+    assert ros.completed == [{"PartNumber": str(n), "ETag": f'"etag-{n}"'} for n in range(1, 5)]
+    total = os.path.getsize(video)
+    assert [uploaded for uploaded, _ in progress] == sorted(uploaded for uploaded, _ in progress)
+    assert progress[-1] == (total, total) and len(progress) == 4
+
+
+def test_parts_are_concurrent(video):
+    ros = RosUpload(delay=0.2)
+    started = time.monotonic()
+    make_client(ros).upload_file_with_slice("f1", "token", video, part_size=PART_SIZE, max_workers=4)
+    assert time.monotonic() - started < 0.6
+
+
+def test_interrupted_upload_resumes_from_manifest(video, tmp_path, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    manifest_path = str(tmp_path / "video.upload.json")
+    ros = RosUpload(failures={3: 2})
+    client = make_client(ros)
+    with pytest.raises(requests.RequestException):
+        client.upload_file_with_slice("f1", "token", video, part_size=PART_SIZE, retries=1,
+                                      manifest_path=manifest_path)
+    manifest = UploadManifest(manifest_path, "f1", os.path.getsize(video), PART_SIZE)
+    assert manifest.upload_id == "u1" and sorted(manifest.parts) == [1, 2, 4]
+    uploaded = dict(ros.parts)
+    ros.parts.clear()
+
+    progress = []
+    client.upload_file_with_slice("f1", "token", video, part_size=PART_SIZE, manifest_path=manifest_path,
+                                  progress=lambda *args: progress.append(args))
+    assert sorted(ros.parts) == [3] and ros.initiated == 1
+    ros.parts.update(uploaded)
+    with open(video, "rb") as f:
+        assert ros.data() == f.read()
+    assert len(ros.completed) == 4
+    assert progress == [(os.path.getsize(video), os.path.getsize(video))]
+    assert not os.path.exists(manifest_path)
+
+
+def test_manifest_of_another_upload_is_ignored(tmp_path):
+    manifest_path = str(tmp_path / "upload.json")
+    manifest = UploadManifest(manifest_path, "f1", 2500, 1000)
+    manifest.upload_id = "u1"
+    manifest.add(1, '"etag-1"')
+    assert UploadManifest(manifest_path, "f1", 2500, 1000).parts == {1: '"etag-1"'}
+    assert UploadManifest(manifest_path, "f2", 2500, 1000).upload_id is None
+    assert UploadManifest(manifest_path, "f1", 2600, 1000).parts == {}
+
+
+def test_async_parts_are_uploaded_in_parallel(video):
+    httpx = pytest.importorskip("httpx")
+    from xhs import AsyncXhsClient
+
+    async def async_sign(uri, data=None, a1="", web_session=""):
+        return fake_sign(uri, data, a1, web_session)
+
+    ros = RosUpload(failures={4: 1}, delay=0.1)
+
+    async def handler(request):
+        status, body, *headers = await asyncio.to_thread(ros, request.method, str(request.url), request.content)
+        return httpx.Response(status, content=body, headers=headers[0] if headers else {})
+
+    async def main():
+        async with AsyncXhsClient(test_cookie, sign=async_sign, transport=httpx.MockTransport(handler)) as client:
+            return await client.upload_file_with_slice("f1", "token", video, part_size=PART_SIZE,
+                                                       progress=lambda *args: progress.append(args))
+
+    progress = []
+    started = time.monotonic()
+    res = asyncio.run(main())
+    assert time.monotonic() - started < 1.2
+    assert res.headers["X-Ros-Video-Id"] == "v1"
+    with open(video, "rb") as f:
+        assert ros.data() == f.read()
+    assert progress[-1] == (os.path.getsize(video), os.path.getsize(video))
+
+
+class CreatorApi:
+    """stand-in of the permit, ros-upload and note apis of create_image_note"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.permit_requests = []
+        self.uploads = {}
+        self.note = None
+
+    def __call__(self, method, url, body):
+        parsed = urlparse(url)
+        if parsed.path == "/api/media/v1/upload/web/permit":
+            count = int(parse_qs(parsed.query)["file_count"][0])
+            self.permit_requests.append(count)
+            return 200, {"success": True, "data": {"uploadTempPermits": [
+                {"fileIds": [f"spectrum/img{i}" for i in range(count)], "token": "token"}]}}
+        if parsed.hostname == "ros-upload.xiaohongshu.com":
+            time.sleep(self.delay)
+            self.uploads[parsed.path[1:]] = bytes(body.read() if hasattr(body, "read") else body)
+            return 200, b""
+        self.note = json.loads(body)
+        return 200, {"success": True, "data": {"id": "n1"}}
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i in range(9):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(f"image {i}".encode())
+        paths.append(str(path))
+    return paths
+
+
+def uploaded_images(api, images):
+    file_ids = [image["file_id"] for image in api.note["image_info"]["images"]]
+    assert file_ids == [f"spectrum/img{i}" for i in range(9)]
+    for file_id, path in zip(file_ids, images):
+        with open(path, "rb") as f:
+            assert api.uploads[file_id] == f.read()
+
+
+def test_create_image_note_uploads_concurrently(images):
+    api = CreatorApi()
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign),
+                             lambda request: api(request.method, request.url, request.body))
+    started = time.monotonic()
+    assert client.create_image_note("title", "desc", images) == {"id": "n1"}
+    assert time.monotonic() - started < 9 * api.delay / 2
+    assert api.permit_requests == [9]
+    uploaded_images(api, images)
+
+
+def test_async_create_image_note_uploads_concurrently(images):
+    httpx = pytest.importorskip("httpx")
+    from xhs import AsyncXhsClient
+
+    async def async_sign(uri, data=None, a1="", web_session=""):
+        return fake_sign(uri, data, a1, web_session)
+
+    api = CreatorApi()
+
+    async def handler(request):
+        if request.method == "PUT":
+            # image files are streamed with their size announced instead of chunked encoding
+            assert "Transfer-Encoding" not in request.headers
+            assert int(request.headers["Content-Length"]) == len(await request.aread())
+        status, body, *headers = await asyncio.to_thread(api, request.method, str(request.url),
+                                                         await request.aread())
+        return httpx.Response(status, json=body) if isinstance(body, dict) else httpx.Response(status, content=body)
+
+    async def main():
+        async with AsyncXhsClient(test_cookie, sign=async_sign, transport=httpx.MockTransport(handler)) as client:
+            return await client.create_image_note("title", "desc", images)
+
+    started = time.monotonic()
+    assert asyncio.run(main()) == {"id": "n1"}
+    assert time.monotonic() - started < 9 * api.delay / 2
+    assert api.permit_requests == [9]
+    uploaded_images(api, images)
+
+
+def test_create_image_note_without_images():
+    api = CreatorApi()
+    client = mock_xhs_client(XhsClient(test_cookie, sign=fake_sign),
+                             lambda request: api(request.method, request.url, request.body))
+    with pytest.raises(ValueError):
+        client.create_image_note("title", "desc", [])
+    assert api.permit_requests == []
+    assert client.get_upload_files_permit("image", 2) == ("spectrum/img0", "token")
+    assert api.permit_requests == [2]
@@ -1,5 +1,189 @@
+import contextlib
+import hashlib
 import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import BaseAdapter
 
 
 def beauty_print(data: dict):
     print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+class MockAdapter(BaseAdapter):
+    """requests adapter which answers every request with handler(request) -> (status_code, body[, headers])"""
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+
+    def send(self, request, **kwargs):
+        status_code, body, *headers = self.handler(request)
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers[0] if headers else {})
+        response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def mock_xhs_client(client, handler):
+    client.session.mount("https://", MockAdapter(handler))
+    return client
+
+
+class H2Server:
+    """minimal cleartext HTTP/2 (prior knowledge) server answering every stream with
+    handler(headers: dict, body: bytes) -> (status_code, body[, headers]), the connection
+    is dropped when handler returns None
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.connections = 0
+        self.streams = 0
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self._sock.getsockname()[1]}"
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        h2_conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        h2_conn.initiate_connection()
+        conn.sendall(h2_conn.data_to_send())
+        requests = {}
+        # clients which timed out hang up before slow streams are answered
+        with conn, contextlib.suppress(OSError):
+            while True:
+                data = conn.recv(65535)
+                if not data:
+                    return
+                for event in h2_conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        headers = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                                   for k, v in event.headers}
+                        requests[event.stream_id] = (headers, b"")
+                    elif isinstance(event, h2.events.DataReceived):
+                        headers, body = requests[event.stream_id]
+                        requests[event.stream_id] = (headers, body + event.data)
+                        h2_conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        self.streams += 1
+                        headers, body = requests.pop(event.stream_id)
+                        result = self.handler(headers, body)
+                        if result is None:
+                            return
+                        status_code, res_body, *res_headers = result
+                        if not isinstance(res_body, bytes):
+                            res_body = json.dumps(res_body).encode()
+                        h2_conn.send_headers(event.stream_id, [
+                            (":status", str(status_code)),
+                            ("content-type", "application/json"),
+                            ("content-length", str(len(res_body))),
+                            *(res_headers[0].items() if res_headers else []),
+                        ])
+                        h2_conn.send_data(event.stream_id, res_body, end_stream=True)
+                conn.sendall(h2_conn.data_to_send())
+
+    def close(self):
+        self._sock.close()
+
+
+class CdnServer:
+    """local stand-in of a cdn mirror serving files: {path: bytes}, options may be changed between requests
+
+    :param delay: seconds to wait before answering
+    :param status: status code of every response, files are only served when it is 200
+    :param truncate: bytes of a body sent before the connection is dropped
+    :param ranges: answer Range requests with 206, If-Range is compared with the etag or last_modified
+    :param etag: etag of every file, defaults to the md5 of the file, "" sends no etag
+    :param last_modified: Last-Modified of every file, None sends none
+    """
+
+    def __init__(self, files: dict, delay: float = 0, status: int = 200, truncate: int = None,
+                 ranges: bool = False, etag: str = None, last_modified: str = None):
+        server = self
+        self.files = files
+        self.delay = delay
+        self.status = status
+        self.truncate = truncate
+        self.ranges = ranges
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                time.sleep(server.delay)
+                body = server.files.get(self.path)
+                if body is None or server.status != 200:
+                    self.send_response(404 if body is None else server.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = f'"{hashlib.md5(body).hexdigest()}"' if server.etag is None else server.etag
+                match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+                if_range = self.headers.get("If-Range")
+                if server.ranges and match and (if_range is None or if_range in (etag, server.last_modified)):
+                    start = int(match.group(1))
+                    end = int(match.group(2)) + 1 if match.group(2) else len(body)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(body)}")
+                    body = body[start:end]
+                else:
+                    self.send_response(200)
+                if server.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                if etag:
+                    self.send_header("ETag", etag)
+                if server.last_modified:
+                    self.send_header("Last-Modified", server.last_modified)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.truncate is None:
+                    self.wfile.write(body)
+                else:
+                    self.wfile.write(body[:server.truncate])
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                pass  # raced clients hang up before slow mirrors answer
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
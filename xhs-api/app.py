@@ -1,58 +1,419 @@
+import asyncio
+import os
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 
-from flask import Flask, request
-from gevent import monkey
-from playwright.sync_api import sync_playwright
-
-monkey.patch_all()
+from flask import Flask, Response, abort, request
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright
 
 app = Flask(__name__)
 
+# 签名页面数量，每个页面是独立的浏览器 context，可以并行签名
+POOL_SIZE = int(os.getenv("SIGN_POOL_SIZE", os.cpu_count() or 1))
+# 页面签名多少次后重建
+RECYCLE_AFTER = int(os.getenv("SIGN_RECYCLE_AFTER", 1000))
+# 空闲页面健康检查间隔（秒）
+HEALTH_CHECK_INTERVAL = float(os.getenv("SIGN_HEALTH_CHECK_INTERVAL", 30))
+# 缓存多少个 a1 的浏览器 context，最久未使用的先关闭
+MAX_ACCOUNTS = int(os.getenv("SIGN_MAX_ACCOUNTS", 8))
+# 每个其他 a1 的签名页面数量
+ACCOUNT_POOL_SIZE = int(os.getenv("SIGN_ACCOUNT_POOL_SIZE", 1))
+# a1 空闲多少秒后关闭其浏览器 context
+ACCOUNT_IDLE_TIMEOUT = float(os.getenv("SIGN_ACCOUNT_IDLE_TIMEOUT", 600))
+HEADLESS = os.getenv("SIGN_HEADLESS", "1") != "0"
+# 浏览器 storage state 文件，存在时启动跳过首页等待，不存在时首次预热后写入
+STORAGE_STATE = os.getenv("SIGN_STORAGE_STATE", "")
+# 服务启动后，签名请求等待浏览器预热的最长时间（秒）
+READY_TIMEOUT = float(os.getenv("SIGN_READY_TIMEOUT", 30))
+stealth_js_path = os.getenv("STEALTH_JS_PATH", "stealth.min.js")
+
 global_a1 = ""
 
 
-def get_context_page(instance, stealth_js_path):
-    chromium = instance.chromium
-    browser = chromium.launch(headless=True)
-    context = browser.new_context()
-    context.add_init_script(path=stealth_js_path)
-    page = context.new_page()
-    return context, page
-
-
-stealth_js_path = "stealth.min.js"
-print("正在启动 playwright")
-playwright = sync_playwright().start()
-browser_context, context_page = get_context_page(playwright, stealth_js_path)
-context_page.goto("https://www.xiaohongshu.com")
-print("正在跳转至小红书首页")
-time.sleep(5)
-context_page.reload()
-time.sleep(1)
-cookies = browser_context.cookies()
-for cookie in cookies:
-    if cookie["name"] == "a1":
-        global_a1 = cookie["value"]
-        print("当前浏览器中 a1 值为：" + global_a1 + "，请将您的 cookie 中的 a1 也设置成一样，方可签名成功")
-print("跳转小红书首页成功，等待调用")
+class Counter:
+    type = "counter"
 
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self.lock = threading.Lock()
 
-def sign(uri, data, a1, web_session):
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, "", self.value)]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Histogram:
+    type = "histogram"
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, label):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self.lock:
+            series = self.series.setdefault(label_value, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bucket in enumerate(self.buckets):
+                if seconds <= bucket:
+                    series["buckets"][i] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for label_value, series in self.series.items():
+                labels = f'{self.label}="{label_value}"'
+                for bucket, count in zip(self.buckets, series["buckets"]):
+                    samples.append((self.name + "_bucket", f'{{{labels},le="{bucket}"}}', count))
+                samples.append((self.name + "_bucket", f'{{{labels},le="+Inf"}}', series["count"]))
+                samples.append((self.name + "_sum", f"{{{labels}}}", series["sum"]))
+                samples.append((self.name + "_count", f"{{{labels}}}", series["count"]))
+        return samples
+
+
+sign_latency = Histogram("xhs_sign_latency_seconds", "Latency of sign requests", "endpoint")
+sign_in_flight = Gauge("xhs_sign_in_flight", "Sign requests being processed")
+signatures = Counter("xhs_sign_signatures_total", "Signatures generated")
+page_reloads = Counter("xhs_sign_page_reloads_total", "Navigations and reloads of signing pages")
+page_recycles = Counter("xhs_sign_page_recycles_total", "Signing pages rebuilt")
+a1_switches = Counter("xhs_sign_a1_switches_total", "Sign requests whose a1 differs from the previous one")
+js_errors = Counter("xhs_sign_js_errors_total", "Errors evaluating sign js in pages")
+metrics = [sign_latency, sign_in_flight, signatures, page_reloads, page_recycles, a1_switches, js_errors]
+
+
+def render_metrics():
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+class SignPage:
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.signs = 0
+        self.broken = False
+
+
+class PagePool:
+    """pool of signing pages of one a1, a page is checked out by one request at a time,
+    pages are recycled after RECYCLE_AFTER signatures, on js errors, or when the
+    health check finds window._webmsxyw missing
+
+    pages after the first one start from the storage state of a warmed page, so they
+    only navigate once instead of waiting for the site to set its cookies again
+    """
+
+    def __init__(self, browser, size, recycle_after, a1="", storage_state=None):
+        self.browser = browser
+        self.size = size
+        self.recycle_after = recycle_after
+        self.a1 = a1
+        self.storage_state = storage_state
+        self.closed = False
+        self.idle = asyncio.Queue()
+        self.last_used = time.monotonic()
+        self.warming = None
+
+    async def start(self, warm_in_background=False):
+        """the pool can sign once its first page is ready, the other pages are
+        warmed in background when warm_in_background is True
+        """
+        sign_page = await self.new_page(save_storage_state=not self.a1)
+        if not self.a1:
+            # the other pages share the a1 generated by the first page
+            self.a1 = await context_a1(sign_page.context)
+        self.idle.put_nowait(sign_page)
+        self.warming = asyncio.gather(*[self.add_page() for _ in range(self.size - 1)])
+        if not warm_in_background:
+            await self.warming
+
+    async def add_page(self):
+        try:
+            sign_page = await self.new_page()
+            if self.closed:
+                # the pool was evicted while this page was warming
+                await sign_page.context.close()
+                return
+            self.idle.put_nowait(sign_page)
+        except PlaywrightError as e:
+            self.size -= 1
+            print(f"创建签名页面失败：{e}")
+
+    async def new_page(self, save_storage_state=False):
+        storage_state = self.storage_state
+        if storage_state is None and STORAGE_STATE and os.path.exists(STORAGE_STATE):
+            storage_state = STORAGE_STATE
+        context = await self.browser.new_context(storage_state=storage_state)
+        await context.add_init_script(path=stealth_js_path)
+        if self.a1:
+            # set a1 before the first navigation, so the page never reloads for it
+            await context.add_cookies([
+                {'name': 'a1', 'value': self.a1, 'domain': ".xiaohongshu.com", 'path': "/"}
+            ])
+        page = await context.new_page()
+        await page.goto("https://www.xiaohongshu.com")
+        page_reloads.inc()
+        if storage_state:
+            try:
+                # cookies and local storage are restored, only wait for the sign function
+                await page.wait_for_function("typeof window._webmsxyw === 'function'", timeout=10000)
+                return SignPage(context, page)
+            except PlaywrightError:
+                print("storage state 已失效，重新预热")
+        await asyncio.sleep(5)
+        await page.reload()
+        await asyncio.sleep(1)
+        page_reloads.inc()
+        if save_storage_state and STORAGE_STATE:
+            await context.storage_state(path=STORAGE_STATE)
+            print(f"浏览器 storage state 已保存至 {STORAGE_STATE}")
+        # the next pages of this pool start from the warmed state
+        self.storage_state = await context.storage_state()
+        return SignPage(context, page)
+
+    def in_use(self):
+        return self.idle.qsize() < self.size
+
+    async def close(self):
+        self.closed = True
+        while not self.idle.empty():
+            try:
+                await self.idle.get_nowait().context.close()
+            except PlaywrightError:
+                pass
+
+    async def recycle(self, sign_page):
+        page_recycles.inc()
+        try:
+            await sign_page.context.close()
+        except PlaywrightError:
+            pass
+        return await self.new_page()
+
+    async def replace(self, sign_page):
+        """recycle page in background and return it to pool, the request does not wait for it"""
+        try:
+            sign_page = await self.recycle(sign_page)
+        except PlaywrightError as e:
+            # keep the broken page, it is recycled again when it is checked out
+            print(f"重建签名页面失败：{e}")
+        self.idle.put_nowait(sign_page)
+
+    async def evaluate(self, expression, arg):
+        self.last_used = time.monotonic()
+        sign_page = await self.idle.get()
+        try:
+            result = await sign_page.page.evaluate(expression, arg)
+            sign_page.signs += 1
+            return result
+        except PlaywrightError:
+            js_errors.inc()
+            sign_page.broken = True
+            raise
+        finally:
+            if sign_page.broken or sign_page.signs >= self.recycle_after:
+                asyncio.get_running_loop().create_task(self.replace(sign_page))
+            else:
+                self.idle.put_nowait(sign_page)
+
+    async def check_health(self):
+        """check idle pages, pages in use are checked when they fail"""
+        for _ in range(self.idle.qsize()):
+            sign_page = self.idle.get_nowait()
+            try:
+                healthy = await sign_page.page.evaluate("typeof window._webmsxyw === 'function'")
+            except PlaywrightError:
+                healthy = False
+            if healthy:
+                self.idle.put_nowait(sign_page)
+            else:
+                print("签名页面异常，正在重建")
+                await self.replace(sign_page)
+
+
+class AccountPools:
+    """LRU of page pools keyed by a1, signing for a cached a1 never reloads a page,
+    pools idle longer than idle_timeout or beyond max_accounts are closed, the pool
+    of the browser's own a1 is kept forever
+    """
+
+    def __init__(self, browser, default_pool, max_accounts, idle_timeout):
+        self.browser = browser
+        self.default_pool = default_pool
+        self.max_accounts = max_accounts
+        self.idle_timeout = idle_timeout
+        self.pools = OrderedDict()
+        self.starting = {}
+        self.last_a1 = ""
+
+    async def get(self, a1):
+        if a1 != self.last_a1:
+            a1_switches.inc()
+            self.last_a1 = a1
+        if not a1 or a1 == self.default_pool.a1:
+            return self.default_pool
+        if a1 in self.pools:
+            self.pools.move_to_end(a1)
+            return self.pools[a1]
+        if a1 not in self.starting:
+            # concurrent requests of a new a1 wait for the same pool
+            self.starting[a1] = asyncio.get_running_loop().create_task(self.start_pool(a1))
+        return await asyncio.shield(self.starting[a1])
+
+    async def start_pool(self, a1):
+        print(f"正在为 a1 {a1} 创建浏览器 context")
+        try:
+            # a new a1 starts from the warmed state of the browser's own pool, like switching
+            # a1 of a page, and the request only waits for the first page
+            pool = PagePool(self.browser, ACCOUNT_POOL_SIZE, RECYCLE_AFTER, a1, self.default_pool.storage_state)
+            await pool.start(warm_in_background=True)
+            self.pools[a1] = pool
+        finally:
+            del self.starting[a1]
+        await self.evict(keep=a1)
+        return pool
+
+    async def evict(self, idle_timeout=None, keep=None):
+        now = time.monotonic()
+        for a1, pool in list(self.pools.items()):
+            if pool.in_use() or a1 == keep:
+                continue
+            if len(self.pools) > self.max_accounts or \
+                    (idle_timeout is not None and now - pool.last_used > idle_timeout):
+                del self.pools[a1]
+                print(f"关闭 a1 {a1} 的浏览器 context")
+                await pool.close()
+
+    async def evaluate(self, a1, expression, arg):
+        pool = await self.get(a1)
+        return await pool.evaluate(expression, arg)
+
+    async def health_check_forever(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict(self.idle_timeout)
+            for pool in [self.default_pool, *self.pools.values()]:
+                await pool.check_health()
+
+
+async def context_a1(context):
+    for cookie in await context.cookies():
+        if cookie["name"] == "a1":
+            return cookie["value"]
+    return ""
+
+
+async def start_pool():
     global global_a1
-    if a1 != global_a1:
-        browser_context.add_cookies([
-            {'name': 'a1', 'value': a1, 'domain': ".xiaohongshu.com", 'path': "/"}
-        ])
-        context_page.reload()
-        time.sleep(1)
-        global_a1 = a1
-    encrypt_params = context_page.evaluate("([url, data]) => window._webmsxyw(url, data)", [uri, data])
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=HEADLESS)
+    default_pool = PagePool(browser, POOL_SIZE, RECYCLE_AFTER)
+    await default_pool.start(warm_in_background=True)
+    global_a1 = default_pool.a1
+    pools = AccountPools(browser, default_pool, MAX_ACCOUNTS, ACCOUNT_IDLE_TIMEOUT)
+    asyncio.get_running_loop().create_task(pools.health_check_forever(HEALTH_CHECK_INTERVAL))
+    return pools
+
+
+# playwright 运行在单独线程的事件循环中，flask 的请求线程把签名任务提交给它，多个页面并行签名
+loop = asyncio.new_event_loop()
+threading.Thread(target=loop.run_forever, name="playwright", daemon=True).start()
+
+
+def run(coro):
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+# 浏览器在后台预热，服务立即监听端口，预热完成前 /ready 返回 503
+pools = None
+ready = threading.Event()
+startup_error = None
+started_at = time.time()
+
+
+def on_started(future):
+    global pools, startup_error
+    try:
+        pools = future.result()
+    except Exception as e:
+        startup_error = e
+        print(f"启动 playwright 失败：{e!r}")
+        return
+    ready.set()
+    print("当前浏览器中 a1 值为：" + global_a1 + "，请将您的 cookie 中的 a1 也设置成一样，方可签名成功")
+    print(f"跳转小红书首页成功，耗时 {time.time() - started_at:.1f}s，等待调用")
+
+
+print(f"正在启动 playwright，签名页面数量：{POOL_SIZE}")
+asyncio.run_coroutine_threadsafe(start_pool(), loop).add_done_callback(on_started)
+
+
+def ready_pools():
+    """wait for the browser warming up, requests arriving early are not failed at once"""
+    if not ready.wait(READY_TIMEOUT):
+        abort(503, description=f"signer is not ready: {startup_error!r}" if startup_error else "signer is warming up")
+    return pools
+
+
+@contextmanager
+def observe_sign(endpoint):
+    sign_in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sign_in_flight.dec()
+        sign_latency.observe(endpoint, time.perf_counter() - start)
+
+
+def sign(uri, data, a1, web_session):
+    with observe_sign("sign"):
+        encrypt_params = run(ready_pools().evaluate(a1, "([url, data]) => window._webmsxyw(url, data)", [uri, data]))
+    signatures.inc()
     return {
         "x-s": encrypt_params["X-s"],
         "x-t": str(encrypt_params["X-t"])
     }
 
 
+def sign_batch(items, a1, web_session):
+    # 一次 evaluate 签名多个请求，减少与浏览器的往返
+    with observe_sign("batch"):
+        encrypt_params_list = run(ready_pools().evaluate(
+            a1,
+            "(items) => items.map(([url, data]) => window._webmsxyw(url, data))",
+            [[item["uri"], item.get("data")] for item in items]
+        ))
+    signatures.inc(len(encrypt_params_list))
+    return [
+        {"x-s": encrypt_params["X-s"], "x-t": str(encrypt_params["X-t"])}
+        for encrypt_params in encrypt_params_list
+    ]
+
+
 @app.route("/sign", methods=["POST"])
 def hello_world():
     json = request.json
@@ -63,10 +424,42 @@ def hello_world():
     return sign(uri, data, a1, web_session)
 
 
+@app.route("/sign/batch", methods=["POST"])
+def batch():
+    json = request.json
+    return {"signs": sign_batch(json["items"], json["a1"], json.get("web_session", ""))}
+
+
 @app.route("/a1", methods=["GET"])
 def get_a1():
     return {'a1': global_a1}
 
 
+@app.route("/ready", methods=["GET"])
+def get_ready():
+    if ready.is_set():
+        return {"ready": True}
+    return {"ready": False, "error": repr(startup_error) if startup_error else None}, 503
+
+
+@app.route("/health", methods=["GET"])
+def get_health():
+    if startup_error is not None:
+        return {"status": "error", "error": repr(startup_error)}, 500
+    if not ready.is_set():
+        return {"status": "starting", "uptime": time.time() - started_at}
+    return {
+        "status": "ok",
+        "uptime": time.time() - started_at,
+        "idle_pages": pools.default_pool.idle.qsize(),
+        "accounts": len(pools.pools),
+    }
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5005)
+    app.run(host="0.0.0.0", port=5005, threaded=True)
@@ -3,8 +3,17 @@ import logging
 from logging import NullHandler
 
 from .__version__ import __author__, __copyright__, __title__, __version__
+from .async_core import AsyncXhsClient
 from .core import (FeedType, Note, NoteType, SearchNoteType, SearchSortType,
                    XhsClient)
-from .exception import DataFetchError, ErrorEnum, IPBlockError, SignError
+from .download import CdnLatency, MediaDownloader
+from .exception import (DataFetchError, DownloadError, ErrorEnum, IPBlockError,
+                        NeedVerifyError, SignError)
+from .mediastore import MediaStore
+from .ratelimit import AdaptiveRateLimiter
+from .remotesign import AsyncRemoteSigner, RemoteSigner
+from .signbatch import BatchSigner
+from .signcache import SignCache
+from .signer import Signer
 
 logging.getLogger(__name__).addHandler(NullHandler())
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class PoolStats:
+    """thread safe connection pool counters of every host
+
+    hits: requests sent on an open keep-alive connection
+    misses: requests which had to open a tcp (and tls) connection
+    new_connections: connection objects created by pools
+    """
+
+    fields = ("hits", "misses", "new_connections")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def incr(self, host: str, field: str):
+        with self._lock:
+            counters = self._hosts.setdefault(host, dict.fromkeys(self.fields, 0))
+            counters[field] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hosts = {host: dict(counters) for host, counters in self._hosts.items()}
+        total = {field: sum(counters[field] for counters in hosts.values()) for field in self.fields}
+        return {**total, "hosts": hosts}
+
+
+class _TrackedPoolMixin:
+    stats: PoolStats = None
+    keepalive_timeout: float = None
+
+    def _new_conn(self):
+        self.stats.incr(self.host, "new_connections")
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        idle_since = getattr(conn, "_xhs_idle_since", None)
+        if self.keepalive_timeout is not None and idle_since is not None \
+                and time.monotonic() - idle_since > self.keepalive_timeout:
+            # server may have closed it already, reconnect instead of risking a reset
+            conn.close()
+        self.stats.incr(self.host, "misses" if getattr(conn, "sock", None) is None else "hits")
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._xhs_idle_since = time.monotonic()
+        super()._put_conn(conn)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """requests adapter with tunable keep-alive pools and pool statistics
+
+    tcp and tls handshakes are only paid when a pool has no open connection,
+    so pool_maxsize should be at least the number of threads sharing the session
+
+    :param pool_connections: number of host pools to cache
+    :param pool_maxsize: max connections kept alive per host
+    :param max_retries: retry times when connecting failed, requests are never resent after they are sent
+    :param keepalive_timeout: close connections idle longer than this many seconds instead of reusing them
+    :param pool_block: wait for a free connection instead of opening a temporary one when the pool is full
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0,
+                 keepalive_timeout: float = None, pool_block: bool = False):
+        self.stats = PoolStats()
+        self.keepalive_timeout = keepalive_timeout
+        attrs = {"stats": self.stats, "keepalive_timeout": keepalive_timeout}
+        self._pool_classes_by_scheme = {
+            "http": type("TrackedHTTPConnectionPool", (_TrackedPoolMixin, HTTPConnectionPool), attrs),
+            "https": type("TrackedHTTPSConnectionPool", (_TrackedPoolMixin, HTTPSConnectionPool), attrs),
+        }
+        retries = Retry(total=max_retries, read=False, redirect=False, status=0, backoff_factor=0.1)
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                         max_retries=retries, pool_block=pool_block)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes_by_scheme
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = self._pool_classes_by_scheme
+        return manager
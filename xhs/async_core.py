@@ -0,0 +1,1119 @@
+import asyncio
+import inspect
+import json
+import os
+import re
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from lxml import etree
+from requests import RequestException
+
+from xhs.exception import (DataFetchError, ErrorEnum, IPBlockError,
+                           NeedVerifyError)
+
+from . import fastjson
+from .core import (FeedType, NoteType, SearchNoteType, SearchSortType,
+                   build_uri, comment_threads_to_result, decode_typed_response,
+                   handle_response_data, is_note_unavailable, is_replayable,
+                   note_from_card)
+from .help import (get_imgs_url_from_note, get_search_id,
+                   get_session_cookie_dict, get_valid_path_name,
+                   get_video_url_from_note, parse_xml, sign,
+                   transform_json_keys)
+from .metrics import TimingStats
+from .models import (CommentPage, FeedPage, FeedResponse, UserInfo,
+                     UserNotesPage)
+from .pagination import AsyncCursorIterator
+from .ratelimit import TokenBucket, throttle_async
+from .upload import (CHUNK_SIZE, DEFAULT_PART_SIZE, PartReader, UploadManifest,
+                     aiter_file)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncXhsClient:
+    """asyncio version of XhsClient, every XhsClient api is available as a coroutine
+
+    all requests share one httpx.AsyncClient connection pool, sign function can be
+    a normal function or a coroutine function, for example:
+
+        async def sign(uri, data=None, a1="", web_session=""):
+            ...
+
+        async with AsyncXhsClient(cookie, sign=sign) as client:
+            notes = await asyncio.gather(*[client.get_note_by_id(i, t) for i, t in ids])
+    """
+
+    def __init__(
+            self, cookie=None, user_agent=None, timeout=10, proxies=None, sign=None,
+            max_connections=100, max_keepalive_connections=20, transport=None, rate_limiter=None,
+            http2=False, sign_cache=None
+    ):
+        """constructor
+
+        :param proxies: requests style proxies, for example {"https": "http://127.0.0.1:7890"}
+        :param max_connections: max connections of the shared pool
+        :param max_keepalive_connections: max idle keep-alive connections of the shared pool
+        :param transport: custom httpx.AsyncBaseTransport, mostly used for testing
+        :param rate_limiter: xhs.ratelimit.AdaptiveRateLimiter shared by all requests, defaults to None
+        :param http2: negotiate HTTP/2 so many requests are multiplexed over one connection,
+            requires `pip install xhs[http2]`, defaults to False
+        :param sign_cache: xhs.signcache.SignCache shared by all requests, defaults to None
+        """
+        if httpx is None:
+            raise ImportError("AsyncXhsClient requires httpx, please run `pip install xhs[async]`")
+        self.proxies = proxies
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.external_sign = sign
+        self.sign_cache = sign_cache
+        self.timings = TimingStats()
+        self._host = "https://edith.xiaohongshu.com"
+        self._creator_host = "https://creator.xiaohongshu.com"
+        self._customer_host = "https://customer.xiaohongshu.com"
+        self.home = "https://www.xiaohongshu.com"
+        self.user_agent = user_agent or (
+            "Mozilla/5.0 "
+            "(Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 "
+            "(KHTML, like Gecko) "
+            "Chrome/111.0.0.0 Safari/537.36"
+        )
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_keepalive_connections)
+        mounts = None
+        if proxies:
+            mounts = {f"{scheme}://": httpx.AsyncHTTPTransport(proxy=proxy, limits=limits, http2=http2)
+                      for scheme, proxy in proxies.items()}
+        self.__client: httpx.AsyncClient = httpx.AsyncClient(
+            headers={
+                "user-agent": self.user_agent,
+                "Content-Type": "application/json",
+            },
+            timeout=timeout,
+            limits=limits,
+            mounts=mounts,
+            transport=transport,
+            http2=http2,
+        )
+        self.cookie = cookie
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """close the shared connection pool"""
+        await self.__client.aclose()
+
+    @property
+    def cookie(self):
+        return ";".join([f"{key}={value}" for key, value in self.cookie_dict.items()])
+
+    @cookie.setter
+    def cookie(self, cookie: str):
+        self.__client.cookies = httpx.Cookies(get_session_cookie_dict(cookie))
+
+    @property
+    def cookie_dict(self):
+        return {cookie.name: cookie.value for cookie in self.__client.cookies.jar}
+
+    @property
+    def client(self):
+        return self.__client
+
+    def _endpoint(self, is_creator: bool = False, is_customer: bool = False):
+        if is_customer:
+            return self._customer_host
+        elif is_creator:
+            return self._creator_host
+        return self._host
+
+    def stats(self) -> dict:
+        """timings of signing and http requests, see XhsClient.stats"""
+        return {"timings": self.timings.snapshot()}
+
+    async def _pre_headers(self, url: str, data=None, quick_sign: bool = False, body: bytes = None) -> dict:
+        with self.timings.time("sign"):
+            return await self._sign_headers(url, data, quick_sign, body)
+
+    async def _sign_headers(self, url: str, data=None, quick_sign: bool = False, body: bytes = None) -> dict:
+        cookie_dict = self.cookie_dict
+        if quick_sign:
+            # sign the body which will be sent instead of serializing data again
+            signs = sign(url, data if body is None else body, a1=cookie_dict.get("a1"))
+            return {
+                "x-s": signs["x-s"],
+                "x-t": signs["x-t"],
+                "x-s-common": signs["x-s-common"],
+            }
+        if self.sign_cache is not None:
+            key = self.sign_cache.key(url, data if body is None else body, cookie_dict.get("a1"))
+            signs = self.sign_cache.get(key)
+            if signs is not None:
+                return signs
+        signs = self.external_sign(
+            url,
+            data,
+            a1=cookie_dict.get("a1"),
+            web_session=cookie_dict.get("web_session", ""),
+        )
+        if inspect.isawaitable(signs):
+            signs = await signs
+        signs = dict(signs)
+        if self.sign_cache is not None:
+            self.sign_cache.put(key, signs)
+        return signs
+
+    async def request(self, method, url, build_headers=None, **kwargs):
+        """same as XhsClient.request, build_headers is a coroutine function"""
+        if not self.rate_limiter:
+            if build_headers is not None:
+                kwargs["headers"] = await build_headers()
+            return await self._request(method, url, **kwargs)
+        host = urlparse(url).hostname
+        # a stream or file body is consumed by the first attempt
+        retries = self.rate_limiter.max_retries if is_replayable(kwargs.get("content")) else 0
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async(host)
+            if build_headers is not None:
+                kwargs["headers"] = await build_headers()
+            try:
+                res = await self._request(method, url, **kwargs)
+            except IPBlockError:
+                delay = self.rate_limiter.on_blocked(host, attempt)
+                if attempt >= retries:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except NeedVerifyError:
+                self.rate_limiter.on_blocked(host, attempt)
+                raise
+            self.rate_limiter.on_success(host)
+            return res
+
+    async def _request(self, method, url, model=None, **kwargs):
+        with self.timings.time("http"):
+            response = await self.__client.request(method, url, **kwargs)
+        content = response.content
+        if not content:
+            return response
+        if model is not None:
+            try:
+                success, data = decode_typed_response(response, content, model)
+            except ValueError:
+                return response
+            if success:
+                return data
+        try:
+            data = fastjson.loads(content)
+        except fastjson.DecodeError:
+            return response
+        return handle_response_data(response, data)
+
+    async def get(self, uri: str, params=None, is_creator: bool = False, is_customer: bool = False, **kwargs):
+        final_uri = build_uri(uri, params)
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        async def build_headers():
+            return {**await self._pre_headers(final_uri, quick_sign=is_creator or is_customer), **extra_headers}
+
+        endpoint = self._endpoint(is_creator, is_customer)
+        return await self.request(method="GET", url=f"{endpoint}{final_uri}",
+                                  build_headers=build_headers, **kwargs)
+
+    async def post(self, uri: str, data: dict | None, is_creator: bool = False, is_customer: bool = False,
+                   **kwargs):
+        body = fastjson.dumps(data) if isinstance(data, dict) else None
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        async def build_headers():
+            signs = await self._pre_headers(uri, data, quick_sign=is_creator or is_customer, body=body)
+            return {**signs, **extra_headers}
+
+        endpoint = self._endpoint(is_creator, is_customer)
+        if data:
+            return await self.request(
+                method="POST", url=f"{endpoint}{uri}", content=body,
+                build_headers=build_headers, **kwargs
+            )
+        else:
+            return await self.request(method="POST", url=f"{endpoint}{uri}", build_headers=build_headers, **kwargs)
+
+    async def get_note_by_id(self, note_id: str, xsec_token: str, xsec_source: str = "pc_feed", typed: bool = False):
+        """same as XhsClient.get_note_by_id"""
+        data = {
+            "source_note_id": note_id,
+            "image_formats": ["jpg", "webp", "avif"],
+            "extra": {"need_body_topic": 1},
+            "xsec_source": xsec_source,
+            "xsec_token": xsec_token
+        }
+        uri = "/api/sns/web/v1/feed"
+        res = await self.post(uri, data, model=FeedResponse if typed else None)
+        if typed:
+            return res.items[0].note_card
+        return res["items"][0]["note_card"]
+
+    async def get_note_by_id_from_html(self, note_id: str, xsec_token: str, xsec_source: str = "pc_feed"):
+        """same as XhsClient.get_note_by_id_from_html"""
+        url = f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source={xsec_source}"
+        res = await self.__client.get(url, headers={"user-agent": self.user_agent,
+                                                    "referer": "https://www.xiaohongshu.com/"})
+        html = res.text
+        state = re.findall(r"window.__INITIAL_STATE__=({.*})</script>", html)[0].replace("undefined", '""')
+        if state != "{}":
+            note_dict = transform_json_keys(state)
+            return note_dict["note"]["note_detail_map"][note_id]["note"]
+        elif ErrorEnum.IP_BLOCK.value.msg in html:
+            raise IPBlockError(ErrorEnum.IP_BLOCK.value.msg)
+        raise DataFetchError(html)
+
+    async def report_note_metrics(
+            self,
+            note_id: str,
+            note_type: int,
+            note_user_id: str,
+            viewer_user_id: str,
+            followed_author=0,
+            report_type=1,
+            stay_seconds=0,
+    ):
+        """same as XhsClient.report_note_metrics"""
+        uri = "/api/sns/web/v1/note/metrics_report"
+        data = {
+            "note_id": note_id,
+            "note_type": note_type,
+            "report_type": report_type,
+            "stress_test": False,
+            "viewer": {"user_id": viewer_user_id, "followed_author": followed_author},
+            "author": {"user_id": note_user_id},
+            "interaction": {"like": 0, "collect": 0, "comment": 0, "comment_read": 0},
+            "note": {"stay_seconds": stay_seconds},
+            "other": {"platform": "web"},
+        }
+        return await self.post(uri, data)
+
+    async def download_file(self, url: str, filename: str):
+        """stream url to filename through the shared connection pool, the file is written
+        by worker threads in chunks of CHUNK_SIZE
+        """
+        async with self.__client.stream("GET", url) as r:
+            r.raise_for_status()
+            f = await asyncio.to_thread(open, filename, "wb")
+            try:
+                buffer = bytearray()
+                async for chunk in r.aiter_bytes():
+                    buffer += chunk
+                    if len(buffer) >= CHUNK_SIZE:
+                        data, buffer = buffer, bytearray()
+                        await asyncio.to_thread(f.write, data)
+                if buffer:
+                    await asyncio.to_thread(f.write, buffer)
+            finally:
+                await asyncio.to_thread(f.close)
+
+    async def save_files_from_note_id(self, note_id: str, dir_path: str, xsec_token: str = ""):
+        """same as XhsClient.save_files_from_note_id, images are downloaded concurrently"""
+        note = await self.get_note_by_id(note_id, xsec_token)
+
+        title = get_valid_path_name(note["title"])
+
+        if not title:
+            title = note_id
+
+        new_dir_path = os.path.join(dir_path, title)
+        await asyncio.to_thread(os.makedirs, new_dir_path, exist_ok=True)
+
+        if note["type"] == NoteType.VIDEO.value:
+            video_url = get_video_url_from_note(note)
+            video_filename = os.path.join(new_dir_path, f"{title}.mp4")
+            await self.download_file(video_url, video_filename)
+        else:
+            img_urls = get_imgs_url_from_note(note)
+            await asyncio.gather(*[
+                self.download_file(img_url, os.path.join(new_dir_path, f"{title}{index}.png"))
+                for index, img_url in enumerate(img_urls)
+            ])
+
+    async def get_self_info(self):
+        uri = "/api/sns/web/v1/user/selfinfo"
+        return await self.get(uri)
+
+    async def get_self_info2(self):
+        uri = "/api/sns/web/v2/user/me"
+        return await self.get(uri)
+
+    async def get_self_info_from_creator(self):
+        uri = "/api/galaxy/creator/home/personal_info"
+        headers = {
+            "referer": "https://creator.xiaohongshu.com/creator/home"
+        }
+        return await self.get(uri, is_creator=True, headers=headers)
+
+    async def get_user_by_keyword(self, keyword: str,
+                                  page: int = 1,
+                                  page_size: int = 20, ):
+        uri = "/api/sns/web/v1/search/usersearch"
+        data = {
+            "search_user_request": {
+                "keyword": keyword, "search_id": get_search_id(),
+                "page": page, "page_size": page_size,
+                "biz_type": "web_search_user",
+                "request_id": f"{int(round(time.time()))}-{int(round(time.time() * 1000))}",
+            }
+        }
+        return await self.post(uri, data)
+
+    async def get_user_info(self, user_id: str, typed: bool = False):
+        uri = "/api/sns/web/v1/user/otherinfo"
+        params = {"target_user_id": user_id}
+        return await self.get(uri, params, model=UserInfo if typed else None)
+
+    async def get_home_feed_category(self):
+        uri = "/api/sns/web/v1/homefeed/category"
+        return (await self.get(uri))["categories"]
+
+    async def get_home_feed(self, feed_type: FeedType, typed: bool = False):
+        uri = "/api/sns/web/v1/homefeed"
+        data = {
+            "cursor_score": "",
+            "num": 40,
+            "refresh_type": 1,
+            "note_index": 0,
+            "unread_begin_note_id": "",
+            "unread_end_note_id": "",
+            "unread_note_count": 0,
+            "category": feed_type.value,
+            "search_key": "",
+            "need_num": 40,
+            "image_scenes": ["FD_PRV_WEBP", "FD_WM_WEBP"]
+        }
+        return await self.post(uri, data, model=FeedPage if typed else None)
+
+    async def get_search_suggestion(self, keyword: str):
+        uri = "/api/sns/web/v1/sug/recommend"
+        params = {"keyword": keyword}
+        return [sug["text"] for sug in (await self.get(uri, params))["sug_items"]]
+
+    async def get_note_by_keyword(
+            self,
+            keyword: str,
+            page: int = 1,
+            page_size: int = 20,
+            sort: SearchSortType = SearchSortType.GENERAL,
+            note_type: SearchNoteType = SearchNoteType.ALL,
+            typed: bool = False,
+    ):
+        """same as XhsClient.get_note_by_keyword"""
+        uri = "/api/sns/web/v1/search/notes"
+        data = {
+            "keyword": keyword,
+            "page": page,
+            "page_size": page_size,
+            "search_id": get_search_id(),
+            "sort": sort.value,
+            "note_type": note_type.value,
+        }
+        return await self.post(uri, data, model=FeedPage if typed else None)
+
+    async def get_user_notes(self, user_id: str, cursor: str = "", typed: bool = False):
+        """same as XhsClient.get_user_notes"""
+        uri = "/api/sns/web/v1/user_posted"
+        params = {"num": 30, "cursor": cursor, "user_id": user_id, "image_scenes": "FD_WM_WEBP"}
+        return await self.get(uri, params, model=UserNotesPage if typed else None)
+
+    def iter_user_notes(self, user_id: str, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate user notes just have simple info, see get_user_notes, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this note_id, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_user_notes(user_id, next_cursor),
+            "notes", cursor, limit, until, id_key="note_id"
+        )
+
+    async def get_user_all_notes(self, user_id: str, crawl_interval: int = 1):
+        """same as XhsClient.get_user_all_notes"""
+        has_more = True
+        cursor = ""
+        result = []
+        while has_more:
+            res = await self.get_user_notes(user_id, cursor)
+            has_more = res["has_more"]
+            cursor = res["cursor"]
+
+            for item in res["notes"]:
+                try:
+                    note = await self.get_note_by_id(item["note_id"], item["xsec_token"])
+                except DataFetchError as e:
+                    if is_note_unavailable(e):
+                        continue
+                    else:
+                        raise
+                result.append(note_from_card(note))
+                await asyncio.sleep(crawl_interval)
+        return result
+
+    async def get_note_comments(self, note_id: str, cursor: str = "", xsec_token: str = "", typed: bool = False):
+        """same as XhsClient.get_note_comments"""
+        uri = "/api/sns/web/v2/comment/page"
+        params = {"note_id": note_id, "cursor": cursor, "image_formats": "jpg,webp,avif", 'xsec_token': xsec_token}
+        return await self.get(uri, params, model=CommentPage if typed else None)
+
+    def iter_note_comments(self, note_id: str, xsec_token: str = "", cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate note comments, see get_note_comments, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_note_comments(note_id, next_cursor, xsec_token),
+            "comments", cursor, limit, until, id_key="id", time_key="create_time"
+        )
+
+    async def get_note_sub_comments(
+            self, note_id: str, root_comment_id: str, num: int = 30, cursor: str = "",
+            typed: bool = False
+    ):
+        """same as XhsClient.get_note_sub_comments"""
+        uri = "/api/sns/web/v2/comment/sub/page"
+        params = {
+            "note_id": note_id,
+            "root_comment_id": root_comment_id,
+            "num": num,
+            "cursor": cursor,
+        }
+        return await self.get(uri, params, model=CommentPage if typed else None)
+
+    def iter_note_sub_comments(self, note_id: str, root_comment_id: str, num: int = 30, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate note sub comments, see get_note_sub_comments, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_note_sub_comments(note_id, root_comment_id, num, next_cursor),
+            "comments", cursor, limit, until, id_key="id", time_key="create_time"
+        )
+
+    async def get_note_all_comments(self, note_id: str, crawl_interval: int = 1, xsec_token: str = "",
+                                    max_workers: int = 1, rate: float = None, as_tree: bool = False):
+        """same as XhsClient.get_note_all_comments, sub comments are expanded by
+        at most max_workers concurrent tasks
+        """
+        bucket = TokenBucket(rate) if rate else None
+        semaphore = asyncio.Semaphore(max_workers)
+        concurrent = max_workers > 1
+
+        async def expand_sub_comments(comment):
+            sub_comments = list(comment["sub_comments"])
+            sub_comments_has_more = comment["sub_comment_has_more"] and len(
+                sub_comments) < int(comment["sub_comment_count"])
+            sub_comment_cursor = comment["sub_comment_cursor"]
+            while sub_comments_has_more:
+                page_num = 30
+                async with semaphore:
+                    sub_comments_res = await throttle_async(bucket, self.get_note_sub_comments,
+                                                            note_id, comment["id"], num=page_num,
+                                                            cursor=sub_comment_cursor)
+                sub_comments_page = sub_comments_res["comments"]
+                sub_comments_has_more = sub_comments_res["has_more"] and len(sub_comments_page) == page_num
+                sub_comment_cursor = sub_comments_res["cursor"]
+                sub_comments.extend(sub_comments_page)
+                if not concurrent:
+                    await asyncio.sleep(crawl_interval)
+            return sub_comments
+
+        threads = []
+        try:
+            comments_has_more = True
+            comments_cursor = ""
+            while comments_has_more:
+                comments_res = await throttle_async(bucket, self.get_note_comments,
+                                                    note_id, comments_cursor, xsec_token)
+                comments_has_more = comments_res.get("has_more", False)
+                comments_cursor = comments_res.get("cursor", "")
+                for comment in comments_res["comments"]:
+                    if concurrent:
+                        threads.append((comment, asyncio.ensure_future(expand_sub_comments(comment))))
+                    else:
+                        threads.append((comment, await expand_sub_comments(comment)))
+                if not concurrent:
+                    await asyncio.sleep(crawl_interval)
+            threads = [(comment, await sub_comments if asyncio.isfuture(sub_comments) else sub_comments)
+                       for comment, sub_comments in threads]
+        finally:
+            for _, sub_comments in threads:
+                if asyncio.isfuture(sub_comments):
+                    sub_comments.cancel()
+        return comment_threads_to_result(threads, as_tree)
+
+    async def comment_note(self, note_id: str, content: str):
+        uri = "/api/sns/web/v1/comment/post"
+        data = {"note_id": note_id, "content": content, "at_users": []}
+        return await self.post(uri, data)
+
+    async def delete_note_comment(self, note_id: str, comment_id: str):
+        uri = "/api/sns/web/v1/comment/delete"
+        data = {"note_id": note_id, "comment_id": comment_id}
+        return await self.post(uri, data)
+
+    async def comment_user(self, note_id: str, comment_id: str, content: str):
+        uri = "/api/sns/web/v1/comment/post"
+        data = {
+            "note_id": note_id,
+            "content": content,
+            "target_comment_id": comment_id,
+            "at_users": [],
+        }
+        return await self.post(uri, data)
+
+    async def follow_user(self, user_id: str):
+        uri = "/api/sns/web/v1/user/follow"
+        data = {"target_user_id": user_id}
+        return await self.post(uri, data)
+
+    async def unfollow_user(self, user_id: str):
+        uri = "/api/sns/web/v1/user/unfollow"
+        data = {"target_user_id": user_id}
+        return await self.post(uri, data)
+
+    async def collect_note(self, note_id: str):
+        uri = "/api/sns/web/v1/note/collect"
+        data = {"note_id": note_id}
+        return await self.post(uri, data)
+
+    async def uncollect_note(self, note_id: str):
+        uri = "/api/sns/web/v1/note/uncollect"
+        data = {"note_ids": note_id}
+        return await self.post(uri, data)
+
+    async def like_note(self, note_id: str):
+        uri = "/api/sns/web/v1/note/like"
+        data = {"note_oid": note_id}
+        return await self.post(uri, data)
+
+    async def dislike_note(self, note_id: str):
+        uri = "/api/sns/web/v1/note/dislike"
+        data = {"note_oid": note_id}
+        return await self.post(uri, data)
+
+    async def like_comment(self, note_id: str, comment_id: str):
+        uri = "/api/sns/web/v1/comment/like"
+        data = {"note_id": note_id, "comment_id": comment_id}
+        return await self.post(uri, data)
+
+    async def dislike_comment(self, note_id: str, comment_id: str):
+        uri = "/api/sns/web/v1/comment/dislike"
+        data = {"note_id": note_id, "comment_id": comment_id}
+        return await self.post(uri, data)
+
+    async def get_qrcode(self):
+        uri = "/api/sns/web/v1/login/qrcode/create"
+        data = {}
+        return await self.post(uri, data)
+
+    async def check_qrcode(self, qr_id: str, code: str):
+        uri = "/api/sns/web/v1/login/qrcode/status"
+        params = {"qr_id": qr_id, "code": code}
+        return await self.get(uri, params)
+
+    async def activate(self):
+        uri = "/api/sns/web/v1/login/activate"
+        return await self.post(uri, data={})
+
+    async def send_code(self, phone: str, zone: str = 86):
+        uri = "/api/sns/web/v2/login/send_code"
+        params = {"phone": phone, "zone": zone, "type": "login"}
+        return await self.get(uri, params)
+
+    async def check_code(self, phone: str, code: str, zone: str = 86):
+        uri = "/api/sns/web/v1/login/check_code"
+        params = {"phone": phone, "zone": zone, "code": code}
+        return await self.get(uri, params)
+
+    async def login_code(self, phone: str, mobile_token: str, zone: str = 86):
+        uri = "/api/sns/web/v1/login/code"
+        data = {"mobile_token": mobile_token, "zone": zone, "phone": phone}
+        return await self.post(uri, data)
+
+    async def get_qrcode_from_creator(self):
+        uri = "/api/cas/customer/web/qr-code"
+        data = {"service": "https://creator.xiaohongshu.com"}
+        return await self.post(uri, data, is_customer=True)
+
+    async def check_qrcode_from_creator(self, qr_code_id: str):
+        uri = "/api/cas/customer/web/qr-code"
+        params = {
+            "service": "https://creator.xiaohongshu.com",
+            "qr_code_id": qr_code_id,
+        }
+        return await self.get(uri, params, is_customer=True)
+
+    async def customer_login(self, ticket: str):
+        uri = "/sso/customer_login"
+        data = {
+            "ticket": ticket,
+            "login_service": "https://creator.xiaohongshu.com",
+            "subsystem_alias": "creator",
+            "set_global_domain": True
+        }
+        return await self.post(uri, data, is_creator=True)
+
+    async def login_from_creator(self):
+        uri = "/api/galaxy/user/cas/login"
+        headers = {
+            "referer": "https://creator.xiaohongshu.com/login"
+        }
+        return await self.post(uri, None, is_creator=True, headers=headers)
+
+    async def get_user_collect_notes(self, user_id: str, num: int = 30, cursor: str = ""):
+        uri = "/api/sns/web/v2/note/collect/page"
+        params = {"user_id": user_id, "num": num, "cursor": cursor}
+        return await self.get(uri, params)
+
+    def iter_user_collect_notes(self, user_id: str, num: int = 30, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate user collect notes, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this note_id, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_user_collect_notes(user_id, num, next_cursor),
+            "notes", cursor, limit, until, id_key="note_id"
+        )
+
+    async def get_user_like_notes(self, user_id: str, num: int = 30, cursor: str = ""):
+        uri = "/api/sns/web/v1/note/like/page"
+        params = {"user_id": user_id, "num": num, "cursor": cursor}
+        return await self.get(uri, params)
+
+    def iter_user_like_notes(self, user_id: str, num: int = 30, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate user like notes, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this note_id, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_user_like_notes(user_id, num, next_cursor),
+            "notes", cursor, limit, until, id_key="note_id"
+        )
+
+    async def get_emojis(self):
+        uri = "/api/im/redmoji/detail"
+        return (await self.get(uri))["emoji"]["tabs"][0]["collection"]
+
+    async def get_mention_notifications(self, num: int = 20, cursor: str = ""):
+        uri = "/api/sns/web/v1/you/mentions"
+        params = {"num": num, "cursor": cursor}
+        return await self.get(uri, params)
+
+    def iter_mention_notifications(self, num: int = 20, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate mention notifications, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_mention_notifications(num, next_cursor),
+            "message_list", cursor, limit, until, id_key="id", time_key="time"
+        )
+
+    async def get_like_notifications(self, num: int = 20, cursor: str = ""):
+        uri = "/api/sns/web/v1/you/likes"
+        params = {"num": num, "cursor": cursor}
+        return await self.get(uri, params)
+
+    def iter_like_notifications(self, num: int = 20, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate like notifications, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_like_notifications(num, next_cursor),
+            "message_list", cursor, limit, until, id_key="id", time_key="time"
+        )
+
+    async def get_follow_notifications(self, num: int = 20, cursor: str = ""):
+        uri = "/api/sns/web/v1/you/connections"
+        params = {"num": num, "cursor": cursor}
+        return await self.get(uri, params)
+
+    def iter_follow_notifications(self, num: int = 20, cursor: str = "", limit: int = None, until=None) -> AsyncCursorIterator:
+        """iterate follow notifications, pages are fetched lazily while iterating, use `async for`
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: AsyncCursorIterator
+        """
+        return AsyncCursorIterator(
+            lambda next_cursor: self.get_follow_notifications(num, next_cursor),
+            "message_list", cursor, limit, until, id_key="id", time_key="time"
+        )
+
+    async def get_notes_summary(self):
+        uri = "/api/galaxy/creator/data/note_detail_new"
+        headers = {
+            "Referer": "https://creator.xiaohongshu.com/creator/notes?source=official"
+        }
+        return await self.get(uri, headers=headers, is_creator=True)
+
+    async def get_creator_note_list(self, tab: int = 0, page: int = 0):
+        uri = "/api/galaxy/creator/note/user/posted"
+        params = {"tab": tab, "page": page}
+        headers = {
+            "Referer": "https://creator.xiaohongshu.com/new/note-manager"
+        }
+        return await self.get(uri, params, headers=headers, is_creator=True)
+
+    async def get_notes_statistics(self, page: int = 1, page_size: int = 48, sort_by="time", note_type=0, time=30,
+                                   is_recent=True):
+        """same as XhsClient.get_notes_statistics"""
+        uri = "/api/galaxy/creator/data/note_stats/new"
+        params = {
+            "page": page,
+            "page_size": page_size,
+            "sort_by": sort_by,
+            "note_type": note_type,
+            "time": time,
+            "is_recent": is_recent
+        }
+        headers = {
+            "Referer": "https://creator.xiaohongshu.com/creator/notes?source=official"
+        }
+        return await self.get(uri, params, is_creator=True, headers=headers)
+
+    async def get_upload_files_permit(self, file_type: str, count: int = 1) -> tuple:
+        """same as XhsClient.get_upload_files_permit"""
+        return (await self.get_upload_files_permits(file_type, count))[0]
+
+    async def get_upload_files_permits(self, file_type: str, count: int = 1) -> list:
+        """same as XhsClient.get_upload_files_permits"""
+        uri = "/api/media/v1/upload/web/permit"
+        params = {
+            "biz_name": "spectrum",
+            "scene": file_type,
+            "file_count": count,
+            "version": "1",
+            "source": "web",
+        }
+        res = await self.get(uri, params)
+        permits = [(file_id, permit["token"]) for permit in res["uploadTempPermits"] for file_id in permit["fileIds"]]
+        if len(permits) < count:
+            raise DataFetchError(f"{count} upload permits are requested, but got {len(permits)}")
+        return permits[:count]
+
+    async def get_upload_id(self, file_id, token):
+        headers = {"X-Cos-Security-Token": token}
+        res = await self.request("POST", f"https://ros-upload.xiaohongshu.com/{file_id}?uploads", headers=headers)
+        return parse_xml(res.text)["UploadId"]
+
+    async def create_complete_multipart_upload(self, file_id: str, token: str, upload_id: str, parts: list):
+        root = etree.Element("CompleteMultipartUpload")
+        for part in parts:
+            part_elem = etree.Element("Part")
+            part_number_elem = etree.Element("PartNumber")
+            part_number_elem.text = str(part['PartNumber'])
+            part_elem.append(part_number_elem)
+
+            etag_elem = etree.Element("ETag")
+            etag_elem.text = part['ETag'].replace('"', '&quot;')
+            part_elem.append(etag_elem)
+            root.append(part_elem)
+        xml_string = "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>" + \
+            etree.tostring(root, encoding='UTF-8').decode("UTF-8").replace("&amp;", "&")
+        headers = {"X-Cos-Security-Token": token, "Content-Type": "application/xml"}
+        url = f"https://ros-upload.xiaohongshu.com/{file_id}?uploadId={upload_id}"
+        return await self.request("POST", url, content=xml_string, headers=headers)
+
+    async def _upload_part(self, url: str, headers: dict, upload_id: str, part_number: int, data: bytes,
+                           retries: int) -> str:
+        """same as XhsClient._upload_part"""
+        attempt = 0
+        while True:
+            try:
+                res = await self.request("PUT", url, params={"partNumber": part_number, "uploadId": upload_id},
+                                         content=data, headers=headers)
+                if not isinstance(res, httpx.Response) or not res.is_success or "ETag" not in res.headers:
+                    raise DataFetchError(f"part {part_number} is not accepted: {getattr(res, 'text', res)}")
+                return res.headers["ETag"]
+            except (httpx.HTTPError, RequestException):
+                if attempt >= retries:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+
+    async def upload_file_with_slice(self, file_id: str, token: str, file_path: str,
+                                     part_size: int = DEFAULT_PART_SIZE, max_workers: int = 4, retries: int = 3,
+                                     manifest_path: str = None, progress=None):
+        """same as XhsClient.upload_file_with_slice"""
+        headers = {"X-Cos-Security-Token": token}
+        url = "https://ros-upload.xiaohongshu.com/" + file_id
+        manifest = UploadManifest(manifest_path, file_id, os.path.getsize(file_path), part_size)
+        if manifest.upload_id is None:
+            manifest.upload_id = await self.get_upload_id(file_id, token)
+            manifest.save()
+        pending = manifest.pending()
+        uploaded = manifest.size - sum(end - start for _, start, end in pending)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def upload_part(part_number, start, end):
+            nonlocal uploaded
+            async with semaphore:
+                data = await asyncio.to_thread(reader.read, start, end)
+                etag = await self._upload_part(url, headers, manifest.upload_id, part_number, data, retries)
+            await asyncio.to_thread(manifest.add, part_number, etag)
+            uploaded += end - start
+            if progress is not None:
+                progress(uploaded, manifest.size)
+
+        with PartReader(file_path) as reader:
+            results = await asyncio.gather(*(upload_part(*part) for part in pending), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        res = await self.create_complete_multipart_upload(file_id, token, manifest.upload_id, manifest.completed())
+        manifest.remove()
+        return res
+
+    async def upload_file(
+            self,
+            file_id: str,
+            token: str,
+            file_path: str,
+            content_type: str = "image/jpeg",
+            progress=None,
+    ):
+        """same as XhsClient.upload_file"""
+        # 5M 为一个 part
+        max_file_size = DEFAULT_PART_SIZE
+        url = "https://ros-upload.xiaohongshu.com/" + file_id
+        if os.path.getsize(file_path) > max_file_size and content_type == "video/mp4":
+            # 启用分片上传，支持大文件
+            return await self.upload_file_with_slice(file_id, token, file_path, progress=progress)
+        else:
+            headers = {"X-Cos-Security-Token": token, "Content-Type": content_type,
+                       "Content-Length": str(os.path.getsize(file_path))}
+            return await self.request("PUT", url, content=aiter_file(file_path), headers=headers)
+
+    async def get_suggest_topic(self, keyword=""):
+        """same as XhsClient.get_suggest_topic"""
+        uri = "/web_api/sns/v1/search/topic"
+        data = {
+            "keyword": keyword,
+            "suggest_topic_request": {"title": "", "desc": ""},
+            "page": {"page_size": 20, "page": 1},
+        }
+        return (await self.post(uri, data))["topic_info_dtos"]
+
+    async def get_suggest_ats(self, keyword=""):
+        """same as XhsClient.get_suggest_ats"""
+        uri = "/web_api/sns/v1/search/user_info"
+        data = {
+            "keyword": keyword,
+            "search_id": str(time.time() * 1000),
+            "page": {"page_size": 20, "page": 1},
+        }
+        return (await self.post(uri, data))["user_info_dtos"]
+
+    async def create_note(self, title, desc, note_type, ats: list = None, topics: list = None,
+                          image_info: dict = None,
+                          video_info: dict = None,
+                          post_time: str = None, is_private: bool = False):
+        if post_time:
+            post_date_time = datetime.strptime(post_time, "%Y-%m-%d %H:%M:%S")
+            post_time = round(int(post_date_time.timestamp()) * 1000)
+        uri = "/web_api/sns/v2/note"
+        business_binds = {
+            "version": 1,
+            "noteId": 0,
+            "noteOrderBind": {},
+            "notePostTiming": {
+                "postTime": post_time
+            },
+            "noteCollectionBind": {
+                "id": ""
+            }
+        }
+
+        data = {
+            "common": {
+                "type": note_type,
+                "title": title,
+                "note_id": "",
+                "desc": desc,
+                "source": '{"type":"web","ids":"","extraInfo":"{\\"subType\\":\\"official\\"}"}',
+                "business_binds": json.dumps(business_binds, separators=(",", ":")),
+                "ats": ats,
+                "hash_tag": topics,
+                "post_loc": {},
+                "privacy_info": {"op_type": 1, "type": int(is_private)},
+            },
+            "image_info": image_info,
+            "video_info": video_info,
+        }
+        headers = {
+            "Origin": "https://creator.xiaohongshu.com",
+            "Referer": "https://creator.xiaohongshu.com/"
+        }
+        return await self.post(uri, data, headers=headers)
+
+    async def create_image_note(
+            self,
+            title,
+            desc,
+            files: list,
+            post_time: str = None,
+            ats: list = None,
+            topics: list = None,
+            is_private: bool = False,
+            max_workers: int = 9,
+    ):
+        """same as XhsClient.create_image_note"""
+        if ats is None:
+            ats = []
+        if topics is None:
+            topics = []
+
+        if not files:
+            raise ValueError("an image note needs at least one image")
+        permits = await self.get_upload_files_permits("image", len(files))
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def upload(permit, file):
+            async with semaphore:
+                return await self.upload_file(*permit, file)
+
+        await asyncio.gather(*(upload(permit, file) for permit, file in zip(permits, files)))
+        images = [
+            {
+                "file_id": image_id,
+                "metadata": {"source": -1},
+                "stickers": {"version": 2, "floating": []},
+                "extra_info_json": '{"mimeType":"image/jpeg"}',
+            }
+            for image_id, _ in permits
+        ]
+        return await self.create_note(title, desc, NoteType.NORMAL.value, ats=ats, topics=topics,
+                                      image_info={"images": images}, is_private=is_private,
+                                      post_time=post_time)
+
+    async def get_video_first_frame_image_id(self, video_id: str):
+        headers = {
+            "content-type": "application/json;charset=UTF-8",
+            "referer": "https://creator.xiaohongshu.com/",
+            "x-sign": "X2d2ea70d804b4f98d20cc70f5643bc26",
+        }
+
+        json_data = {"videoId": video_id}
+
+        response = await self.__client.post(
+            "https://www.xiaohongshu.com/fe_api/burdock/v2/note/query_transcode",
+            headers=headers,
+            json=json_data,
+        )
+
+        res = response.json()
+        if res["data"]["hasFirstFrame"]:
+            image_id = res["data"]["firstFrameFileId"]
+            return image_id
+        return None
+
+    async def create_video_note(
+            self,
+            title,
+            video_path: str,
+            desc: str,
+            cover_path: str = None,
+            ats: list = None,
+            post_time: str = None,
+            topics: list = None,
+            is_private: bool = False,
+            wait_time: int = 3,
+    ):
+        """same as XhsClient.create_video_note"""
+        if ats is None:
+            ats = []
+        if topics is None:
+            topics = []
+
+        file_id, token = await self.get_upload_files_permit("video")
+        res = await self.upload_file(
+            file_id,
+            token,
+            video_path,
+            content_type="video/mp4",
+        )
+        video_id, is_upload = res.headers["X-Ros-Video-Id"], False
+
+        image_id = None
+        if cover_path is None:
+            for _ in range(10):
+                await asyncio.sleep(wait_time)
+                image_id = await self.get_video_first_frame_image_id(video_id)
+                if image_id:
+                    break
+
+        if cover_path:
+            is_upload = True
+            image_id, token = await self.get_upload_files_permit("image")
+            await self.upload_file(image_id, token, cover_path)
+
+        cover_info = {
+            "file_id": image_id,
+            "frame": {"ts": 0, "is_user_select": False, "is_upload": is_upload},
+        }
+
+        video_info = {
+            "file_id": file_id,
+            "timelines": [],
+            "cover": cover_info,
+            "chapters": [],
+            "chapter_sync_text": False,
+            "entrance": "web",
+        }
+        return await self.create_note(title, desc, NoteType.VIDEO.value, ats=ats, topics=topics,
+                                      video_info=video_info, post_time=post_time, is_private=is_private)
@@ -1,21 +1,40 @@
+import asyncio
 import json
 import os
 import re
+import shutil
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
 from typing import NamedTuple
+from urllib.parse import urlparse
 
 import requests
 from lxml import etree
 
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
 from xhs.exception import (DataFetchError, ErrorEnum, IPBlockError,
                            NeedVerifyError, SignError)
 
-from .help import (cookie_jar_to_cookie_str, download_file,
-                   get_imgs_url_from_note, get_search_id, get_valid_path_name,
+from . import fastjson
+from .adapters import PooledHTTPAdapter
+from .download import MediaDownloader
+from .help import (get_imgs_url_from_note, get_search_id, get_valid_path_name,
                    get_video_url_from_note, parse_xml, sign,
-                   update_session_cookies_from_cookie)
+                   transform_json_keys, update_session_cookies_from_cookie)
+from .mediastore import note_media
+from .metrics import TimingStats
+from .models import (CommentPage, FeedPage, FeedResponse, UserInfo,
+                     UserNotesPage, decode_response)
+from .pagination import CursorIterator
+from .ratelimit import TokenBucket, throttle
+from .upload import DEFAULT_PART_SIZE, PartReader, UploadManifest
 
 
 class FeedType(Enum):
@@ -90,15 +109,176 @@ class Note(NamedTuple):
     last_update_time: int
 
 
+class Http2Client:
+    """blocking client speaking HTTP/2, requests of all threads are sent by one
+    httpx.AsyncClient running in a daemon thread and multiplexed over its connections
+
+    the sync HTTP/2 connection of httpcore updates h2 state without a lock,
+    so header frames get corrupted when it is shared by threads
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="xhs-http2", daemon=True)
+        self._thread.start()
+
+    def request(self, method, url, **kwargs):
+        future = asyncio.run_coroutine_threadsafe(self._client.request(method, url, **kwargs), self._loop)
+        # callers handle the same errors as from the requests session
+        try:
+            return future.result()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def create_http2_client(timeout=10, proxies=None, **kwargs) -> Http2Client:
+    """create Http2Client, proxies is requests style dict"""
+    if httpx is None:
+        raise ImportError("http2 requires httpx, please run `pip install xhs[http2]`")
+    mounts = None
+    if proxies:
+        mounts = {f"{scheme}://": httpx.AsyncHTTPTransport(proxy=proxy, http2=True, **kwargs)
+                  for scheme, proxy in proxies.items()}
+    return Http2Client(httpx.AsyncClient(timeout=timeout, mounts=mounts,
+                                         transport=httpx.AsyncHTTPTransport(http2=True, **kwargs)))
+
+
+def is_replayable(body) -> bool:
+    """whether a request body can be sent again by a retry, streams and files can't"""
+    return body is None or isinstance(body, (bytes, str, dict, list, tuple))
+
+
+def note_from_card(note: dict) -> Note:
+    """convert note_card returned by get_note_by_id to Note"""
+    interact_info = note["interact_info"]
+    return Note(
+        note_id=note["note_id"],
+        title=note["title"],
+        desc=note["desc"],
+        type=note["type"],
+        user=note["user"],
+        img_urls=get_imgs_url_from_note(note),
+        video_url=get_video_url_from_note(note),
+        tag_list=note["tag_list"],
+        at_user_list=note["at_user_list"],
+        collected_count=interact_info["collected_count"],
+        comment_count=interact_info["comment_count"],
+        liked_count=interact_info["liked_count"],
+        share_count=interact_info["share_count"],
+        time=note["time"],
+        last_update_time=note["last_update_time"],
+    )
+
+
+def is_note_unavailable(e: DataFetchError) -> bool:
+    """abnormal or secret notes can't be fetched, crawl helpers skip them"""
+    return ErrorEnum.NOTE_ABNORMAL.value.msg in e.__repr__() or ErrorEnum.NOTE_SECRETE_FAULT.value.msg in e.__repr__()
+
+
+def comment_threads_to_result(threads: list, as_tree: bool = False) -> list:
+    """convert [(root_comment, all_sub_comments)] to result of get_note_all_comments"""
+    if as_tree:
+        return [{**comment, "sub_comments": sub_comments} for comment, sub_comments in threads]
+    result = []
+    for comment, sub_comments in threads:
+        result.append(comment)
+        result.extend(sub_comments)
+    return result
+
+
+def decode_typed_response(response, content: bytes, model):
+    """decode response into model, return (success, data), failed responses
+    are left to handle_response_data
+    """
+    if response.status_code == 471 or response.status_code == 461:
+        return False, None
+    return decode_response(content, model)
+
+
+def build_uri(uri: str, params=None) -> str:
+    """append params to uri as query string, the result is the string to be signed"""
+    if isinstance(params, dict):
+        return f"{uri}?" f"{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    return uri
+
+
+def handle_response_data(response, data: dict):
+    """map xhs api response data to return value or exception,
+    shared by sync and async client
+
+    :param response: requests.Response or httpx.Response
+    :param data: response json data
+    """
+    if response.status_code == 471 or response.status_code == 461:
+        # someday someone maybe will bypass captcha
+        verify_type = response.headers['Verifytype']
+        verify_uuid = response.headers['Verifyuuid']
+        raise NeedVerifyError(
+            f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}",
+            response=response, verify_type=verify_type, verify_uuid=verify_uuid)
+    elif data.get("success"):
+        return data.get("data", data.get("success"))
+    elif data.get("code") == ErrorEnum.IP_BLOCK.value.code:
+        raise IPBlockError(ErrorEnum.IP_BLOCK.value.msg, response=response)
+    elif data.get("code") == ErrorEnum.SIGN_FAULT.value.code:
+        raise SignError(ErrorEnum.SIGN_FAULT.value.msg, response=response)
+    else:
+        raise DataFetchError(data, response=response)
+
+
 class XhsClient:
+    """xiaohongshu web api client
+
+    one XhsClient can be shared by a thread pool: signature headers are sent per request
+    instead of being written into session headers, and cookies updated by responses of
+    other threads are read under the cookie jar's lock, so all threads share one session
+    and its connection pool, the sign function must be thread safe too
+    """
+
     def __init__(
-            self, cookie=None, user_agent=None, timeout=10, proxies=None, sign=None
+            self, cookie=None, user_agent=None, timeout=10, proxies=None, sign=None, rate_limiter=None,
+            pool_connections=10, pool_maxsize=10, max_retries=0, keepalive_timeout=None, http2=False,
+            sign_cache=None, downloader=None
     ):
-        """constructor"""
+        """constructor
+
+        :param rate_limiter: xhs.ratelimit.AdaptiveRateLimiter shared by all requests, defaults to None
+        :param pool_connections: number of host connection pools to cache, defaults to 10
+        :param pool_maxsize: max keep-alive connections per host, set it to the thread count
+            when the client is shared by a thread pool, defaults to 10
+        :param max_retries: retry times when connecting failed, defaults to 0
+        :param keepalive_timeout: seconds a connection may stay idle before it is dropped
+            instead of reused, defaults to None which reuses it until the server closes it
+        :param http2: send requests of edith api host by httpx with HTTP/2, many requests are
+            multiplexed over one connection, requires `pip install xhs[http2]`, defaults to False
+        :param sign_cache: xhs.signcache.SignCache reusing signatures of the same uri, body and a1
+            instead of calling sign again, defaults to None
+        :param downloader: xhs.download.MediaDownloader of save_files_from_note_id, defaults to None
+            which creates one at the first download
+        """
         self.proxies = proxies
+        self.rate_limiter = rate_limiter
         self.__session: requests.Session = requests.session()
+        self.__adapter = PooledHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                           max_retries=max_retries, keepalive_timeout=keepalive_timeout)
+        self.__session.mount("https://", self.__adapter)
+        self.__session.mount("http://", self.__adapter)
+        self.http2_client = create_http2_client(timeout, proxies) if http2 else None
         self.timeout = timeout
         self.external_sign = sign
+        self.sign_cache = sign_cache
+        self.timings = TimingStats()
+        self._downloader = downloader
+        self._downloader_lock = threading.Lock()
         self._host = "https://edith.xiaohongshu.com"
         self._creator_host = "https://creator.xiaohongshu.com"
         self._customer_host = "https://customer.xiaohongshu.com"
@@ -118,7 +298,7 @@ class XhsClient:
 
     @property
     def cookie(self):
-        return cookie_jar_to_cookie_str(self.__session.cookies)
+        return ";".join([f"{key}={value}" for key, value in self.cookie_dict.items()])
 
     @cookie.setter
     def cookie(self, cookie: str):
@@ -126,87 +306,187 @@ class XhsClient:
 
     @property
     def cookie_dict(self):
-        return requests.utils.dict_from_cookiejar(self.session.cookies)
+        cookies = self.__session.cookies
+        # responses of other threads may set cookies while iterating the jar
+        with cookies._cookies_lock:
+            return requests.utils.dict_from_cookiejar(cookies)
 
     @property
     def session(self):
         return self.__session
 
-    def _pre_headers(self, url: str, data=None, quick_sign: bool = False):
+    def close(self):
+        """close the connection pools, and the event loop thread of the HTTP/2 client"""
+        if self.http2_client is not None:
+            self.http2_client.close()
+            self.http2_client = None
+        self.__session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def downloader(self) -> MediaDownloader:
+        """downloader shared by all downloads, so cdn connections and latencies are reused"""
+        with self._downloader_lock:
+            if self._downloader is None:
+                self._downloader = MediaDownloader(proxies=self.proxies)
+            return self._downloader
+
+    def stats(self) -> dict:
+        """connection pool statistics, hits are requests sent on a reused keep-alive connection,
+        and timings of signing and http requests
+
+        :return: {"hits": 0, "misses": 0, "new_connections": 0, "hosts": {"edith.xiaohongshu.com": {...}},
+            "timings": {"sign": {"count": 0, "seconds": 0.0, "max": 0.0}, "http": {...}}}
+        :rtype: dict
+        """
+        return {**self.__adapter.stats.snapshot(), "timings": self.timings.snapshot()}
+
+    def _endpoint(self, is_creator: bool = False, is_customer: bool = False):
+        if is_customer:
+            return self._customer_host
+        elif is_creator:
+            return self._creator_host
+        return self._host
+
+    def _pre_headers(self, url: str, data=None, quick_sign: bool = False, body: bytes = None) -> dict:
+        """signature headers of this request, they are sent per request instead of
+        being written into session headers, so concurrent requests never mix signatures
+        """
+        with self.timings.time("sign"):
+            return self._sign_headers(url, data, quick_sign, body)
+
+    def _sign_headers(self, url: str, data=None, quick_sign: bool = False, body: bytes = None) -> dict:
+        cookie_dict = self.cookie_dict
         if quick_sign:
-            signs = sign(url, data, a1=self.cookie_dict.get("a1"))
-            self.__session.headers.update({"x-s": signs["x-s"]})
-            self.__session.headers.update({"x-t": signs["x-t"]})
-            self.__session.headers.update({"x-s-common": signs["x-s-common"]})
-        else:
-            self.__session.headers.update(
-                self.external_sign(
-                    url,
-                    data,
-                    a1=self.cookie_dict.get("a1"),
-                    web_session=self.cookie_dict.get("web_session", ""),
-                )
+            # sign the body which will be sent instead of serializing data again
+            signs = sign(url, data if body is None else body, a1=cookie_dict.get("a1"))
+            return {
+                "x-s": signs["x-s"],
+                "x-t": signs["x-t"],
+                "x-s-common": signs["x-s-common"],
+            }
+        if self.sign_cache is not None:
+            key = self.sign_cache.key(url, data if body is None else body, cookie_dict.get("a1"))
+            signs = self.sign_cache.get(key)
+            if signs is not None:
+                return signs
+        signs = dict(
+            self.external_sign(
+                url,
+                data,
+                a1=cookie_dict.get("a1"),
+                web_session=cookie_dict.get("web_session", ""),
             )
-
-    def request(self, method, url, **kwargs):
-        response = self.__session.request(
-            method, url, timeout=self.timeout, proxies=self.proxies, **kwargs
         )
-        if not len(response.text):
+        if self.sign_cache is not None:
+            self.sign_cache.put(key, signs)
+        return signs
+
+    def request(self, method, url, build_headers=None, **kwargs):
+        """send request and map response to data or exception, when rate_limiter is set,
+        the request waits for its host's rate limit, and is retried after a backoff when
+        the ip is blocked, captcha slows down the host too but raises NeedVerifyError at once
+
+        :param build_headers: callable returning the headers of every attempt, so a retry
+            after a backoff is signed again instead of sending a stale x-t
+        """
+        if not self.rate_limiter:
+            if build_headers is not None:
+                kwargs["headers"] = build_headers()
+            return self._request(method, url, **kwargs)
+        host = urlparse(url).hostname
+        # a stream or file body is consumed by the first attempt
+        retries = self.rate_limiter.max_retries if is_replayable(kwargs.get("data")) else 0
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(host)
+            if build_headers is not None:
+                kwargs["headers"] = build_headers()
+            try:
+                res = self._request(method, url, **kwargs)
+            except IPBlockError:
+                delay = self.rate_limiter.on_blocked(host, attempt)
+                if attempt >= retries:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except NeedVerifyError:
+                self.rate_limiter.on_blocked(host, attempt)
+                raise
+            self.rate_limiter.on_success(host)
+            return res
+
+    def _request(self, method, url, model=None, **kwargs):
+        with self.timings.time("http"):
+            if self.http2_client is not None and url.startswith(self._host):
+                response = self._request_http2(method, url, **kwargs)
+            else:
+                response = self.__session.request(
+                    method, url, timeout=self.timeout, proxies=self.proxies, **kwargs
+                )
+        content = response.content
+        if not content:
             return response
+        if model is not None:
+            try:
+                success, data = decode_typed_response(response, content, model)
+            except ValueError:
+                return response
+            if success:
+                return data
         try:
-            data = response.json()
-        except json.decoder.JSONDecodeError:
+            data = fastjson.loads(content)
+        except fastjson.DecodeError:
             return response
-        if response.status_code == 471 or response.status_code == 461:
-            # someday someone maybe will bypass captcha
-            verify_type = response.headers['Verifytype']
-            verify_uuid = response.headers['Verifyuuid']
-            raise NeedVerifyError(
-                f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}",
-                response=response, verify_type=verify_type, verify_uuid=verify_uuid)
-        elif data.get("success"):
-            return data.get("data", data.get("success"))
-        elif data.get("code") == ErrorEnum.IP_BLOCK.value.code:
-            raise IPBlockError(ErrorEnum.IP_BLOCK.value.msg, response=response)
-        elif data.get("code") == ErrorEnum.SIGN_FAULT.value.code:
-            raise SignError(ErrorEnum.SIGN_FAULT.value.msg, response=response)
-        else:
-            raise DataFetchError(data, response=response)
+        return handle_response_data(response, data)
+
+    def _request_http2(self, method, url, data=None, headers=None, **kwargs):
+        # cookies live in the requests session, so both transports see the same login state
+        headers = {**self.__session.headers, **(headers or {}), "cookie": self.cookie}
+        response = self.http2_client.request(method, url, content=data, headers=headers, **kwargs)
+        for cookie in response.cookies.jar:
+            self.__session.cookies.set_cookie(cookie)
+        return response
 
     def get(self, uri: str, params=None, is_creator: bool = False, is_customer: bool = False, **kwargs):
-        final_uri = uri
-        if isinstance(params, dict):
-            final_uri = f"{uri}?" f"{'&'.join([f'{k}={v}' for k, v in params.items()])}"
-        self._pre_headers(final_uri, quick_sign=is_creator or is_customer)
-        endpoint = self._host
-        if is_customer:
-            endpoint = self._customer_host
-        elif is_creator:
-            endpoint = self._creator_host
+        final_uri = build_uri(uri, params)
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        def build_headers():
+            return {**self._pre_headers(final_uri, quick_sign=is_creator or is_customer), **extra_headers}
+
+        endpoint = self._endpoint(is_creator, is_customer)
         return self.request(method="GET", url=f"{endpoint}{final_uri}",
-                            **kwargs)
+                            build_headers=build_headers, **kwargs)
 
     def post(self, uri: str, data: dict | None, is_creator: bool = False, is_customer: bool = False, **kwargs):
-        json_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
-        self._pre_headers(uri, data, quick_sign=is_creator or is_customer)
-        endpoint = self._host
-        if is_customer:
-            endpoint = self._customer_host
-        elif is_creator:
-            endpoint = self._creator_host
+        body = fastjson.dumps(data) if isinstance(data, dict) else None
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        def build_headers():
+            return {**self._pre_headers(uri, data, quick_sign=is_creator or is_customer, body=body), **extra_headers}
+
+        endpoint = self._endpoint(is_creator, is_customer)
         if data:
             return self.request(
-                method="POST", url=f"{endpoint}{uri}", data=json_str.encode(),
-                **kwargs
+                method="POST", url=f"{endpoint}{uri}", data=body,
+                build_headers=build_headers, **kwargs
             )
         else:
-            return self.request(method="POST", url=f"{endpoint}{uri}", **kwargs)
+            return self.request(method="POST", url=f"{endpoint}{uri}", build_headers=build_headers, **kwargs)
 
-    def get_note_by_id(self, note_id: str, xsec_token: str, xsec_source: str = "pc_feed"):
+    def get_note_by_id(self, note_id: str, xsec_token: str, xsec_source: str = "pc_feed", typed: bool = False):
         """
         :param note_id: note_id you want to fetch
         :type note_id: str
+        :param typed: return models.NoteCard instead of dict, defaults to False
+        :type typed: bool, optional
         :rtype: dict
         """
 
@@ -218,7 +498,9 @@ class XhsClient:
             "xsec_token": xsec_token
         }
         uri = "/api/sns/web/v1/feed"
-        res = self.post(uri, data)
+        res = self.post(uri, data, model=FeedResponse if typed else None)
+        if typed:
+            return res.items[0].note_card
         return res["items"][0]["note_card"]
 
     def get_note_by_id_from_html(self, note_id: str, xsec_token: str, xsec_source: str = "pc_feed"):
@@ -228,30 +510,6 @@ class XhsClient:
         :param note_id: note_id you want to fetch
         :type note_id: str
         """
-
-        def camel_to_underscore(key):
-            return re.sub(r"(?<!^)(?=[A-Z])", "_", key).lower()
-
-        def transform_json_keys(json_data):
-            data_dict = json.loads(json_data)
-            dict_new = {}
-            for key, value in data_dict.items():
-                new_key = camel_to_underscore(key)
-                if not value:
-                    dict_new[new_key] = value
-                elif isinstance(value, dict):
-                    dict_new[new_key] = transform_json_keys(json.dumps(value))
-                elif isinstance(value, list):
-                    dict_new[new_key] = [
-                        transform_json_keys(json.dumps(item))
-                        if (item and isinstance(item, dict))
-                        else item
-                        for item in value
-                    ]
-                else:
-                    dict_new[new_key] = value
-            return dict_new
-
         url = f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source={xsec_source}"
         res = self.session.get(url, headers={"user-agent": self.user_agent, "referer": "https://www.xiaohongshu.com/"})
         html = res.text
@@ -306,15 +564,18 @@ class XhsClient:
         }
         return self.post(uri, data)
 
-    def save_files_from_note_id(self, note_id: str, dir_path: str):
-        """this function will fetch note and save file in dir_path/note_title
+    def save_files_from_note_id(self, note_id: str, dir_path: str, xsec_token: str = "", store=None):
+        """this function will fetch note and save file in dir_path/note_title,
+        images are downloaded concurrently from the fastest cdn mirrors by self.downloader
 
         :param note_id: note_id that you want to fetch
         :type note_id: str
         :param dir_path: in fact, files will be stored in your dir_path/note_title directory
         :type dir_path: str
+        :param store: xhs.mediastore.MediaStore, files are fetched into the store only when it
+            doesn't have them yet, and hard linked (or copied) into dir_path, defaults to None
         """
-        note = self.get_note_by_id(note_id)
+        note = self.get_note_by_id(note_id, xsec_token)
 
         title = get_valid_path_name(note["title"])
 
@@ -325,15 +586,21 @@ class XhsClient:
         if not os.path.exists(new_dir_path):
             os.mkdir(new_dir_path)
 
+        media = note_media(note)
         if note["type"] == NoteType.VIDEO.value:
-            video_url = get_video_url_from_note(note)
-            video_filename = os.path.join(new_dir_path, f"{title}.mp4")
-            download_file(video_url, video_filename)
+            filenames = [os.path.join(new_dir_path, f"{title}.mp4")]
         else:
-            img_urls = get_imgs_url_from_note(note)
-            for index, img_url in enumerate(img_urls):
-                img_file_name = os.path.join(new_dir_path, f"{title}{index}.png")
-                download_file(img_url, img_file_name)
+            filenames = [os.path.join(new_dir_path, f"{title}{index}.png") for index in range(len(media))]
+        if store is None:
+            self.downloader.download_all([(urls, filename) for (_, urls, _), filename in zip(media, filenames)])
+            return
+        for path, filename in zip(store.fetch_note(note), filenames):
+            if os.path.exists(filename):
+                continue
+            try:
+                os.link(path, filename)
+            except OSError:
+                shutil.copyfile(path, filename)
 
     def get_self_info(self):
         uri = "/api/sns/web/v1/user/selfinfo"
@@ -364,21 +631,23 @@ class XhsClient:
         }
         return self.post(uri, data)
 
-    def get_user_info(self, user_id: str):
+    def get_user_info(self, user_id: str, typed: bool = False):
         """
         :param user_id: user_id you want fetch
         :type user_id: str
+        :param typed: return models.UserInfo instead of dict, defaults to False
+        :type typed: bool, optional
         :rtype: dict
         """
         uri = "/api/sns/web/v1/user/otherinfo"
         params = {"target_user_id": user_id}
-        return self.get(uri, params)
+        return self.get(uri, params, model=UserInfo if typed else None)
 
     def get_home_feed_category(self):
         uri = "/api/sns/web/v1/homefeed/category"
         return self.get(uri)["categories"]
 
-    def get_home_feed(self, feed_type: FeedType):
+    def get_home_feed(self, feed_type: FeedType, typed: bool = False):
         uri = "/api/sns/web/v1/homefeed"
         data = {
             "cursor_score": "",
@@ -398,7 +667,7 @@ class XhsClient:
         #  "unread_begin_note_id": "64fa75a9000000001f0076bf", "unread_end_note_id": "64f179d9000000001e03fe81",
         #  "unread_note_count": 53, "category": "homefeed_recommend", "search_key": "", "need_num": 6,
         #  "image_scenes": ["FD_PRV_WEBP", "FD_WM_WEBP"]}
-        return self.post(uri, data)
+        return self.post(uri, data, model=FeedPage if typed else None)
 
     def get_search_suggestion(self, keyword: str):
         uri = "/api/sns/web/v1/sug/recommend"
@@ -412,6 +681,7 @@ class XhsClient:
             page_size: int = 20,
             sort: SearchSortType = SearchSortType.GENERAL,
             note_type: SearchNoteType = SearchNoteType.ALL,
+            typed: bool = False,
     ):
         """search note by keyword
 
@@ -425,6 +695,8 @@ class XhsClient:
         :type sort: SearchSortType, optional
         :param note_type: note type, defaults to SearchNoteType.ALL.
         :type note_type: SearchNoteType, optional
+        :param typed: return models.FeedPage instead of dict, defaults to False
+        :type typed: bool, optional
         :return: {has_more: true, items: []}
         :rtype: dict
         """
@@ -437,32 +709,59 @@ class XhsClient:
             "sort": sort.value,
             "note_type": note_type.value,
         }
-        return self.post(uri, data)
+        return self.post(uri, data, model=FeedPage if typed else None)
 
-    def get_user_notes(self, user_id: str, cursor: str = ""):
+    def get_user_notes(self, user_id: str, cursor: str = "", typed: bool = False):
         """get user notes just have simple info
 
         :param user_id: user_id you want to fetch
         :type user_id: str
         :param cursor: return info has this argument, defaults to ""
         :type cursor: str, optional
+        :param typed: return models.UserNotesPage instead of dict, defaults to False
+        :type typed: bool, optional
         :return: {cursor:"", has_more:true,notes:[{cover:{},display_title:"",interact_info:{},note_id:"",type:"video"}]}
         :rtype: dict
         """
         uri = "/api/sns/web/v1/user_posted"
         params = {"num": 30, "cursor": cursor, "user_id": user_id, "image_scenes": "FD_WM_WEBP"}
-        return self.get(uri, params)
+        return self.get(uri, params, model=UserNotesPage if typed else None)
+
+    def iter_user_notes(self, user_id: str, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate user notes just have simple info, see get_user_notes, pages are fetched lazily while iterating
 
-    def get_user_all_notes(self, user_id: str, crawl_interval: int = 1):
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this note_id, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_user_notes(user_id, next_cursor),
+            "notes", cursor, limit, until, id_key="note_id"
+        )
+
+    def get_user_all_notes(self, user_id: str, crawl_interval: int = 1, max_workers: int = 1, rate: float = None):
         """get user all notes with more info, abnormal notes will be ignored
 
+        when max_workers is greater than 1, note details are fetched by a thread pool
+        while the next page of user notes is fetched, crawl_interval is not used,
+        limit the speed with rate instead
+
         :param user_id: user_id you want to fetch
         :type user_id: str
         :param crawl_interval: sleep seconds, defaults to 1
         :type crawl_interval: int, optional
-        :return: note info
+        :param max_workers: concurrent requests, defaults to 1
+        :type max_workers: int, optional
+        :param rate: max requests per second shared by all workers, defaults to no limit
+        :type rate: float, optional
+        :return: note info, in the same order as user notes
         :rtype: list[Note]
         """
+        if max_workers > 1:
+            return self._get_user_all_notes_concurrently(user_id, max_workers, rate)
         has_more = True
         cursor = ""
         result = []
@@ -475,47 +774,73 @@ class XhsClient:
                 try:
                     note = self.get_note_by_id(item["note_id"], item["xsec_token"])
                 except DataFetchError as e:
-                    if ErrorEnum.NOTE_ABNORMAL.value.msg in e.__repr__() or ErrorEnum.NOTE_SECRETE_FAULT.value.msg in e.__repr__():
+                    if is_note_unavailable(e):
                         continue
                     else:
                         raise
-                interact_info = note["interact_info"]
-                note_info = Note(
-                    note_id=note["note_id"],
-                    title=note["title"],
-                    desc=note["desc"],
-                    type=note["type"],
-                    user=note["user"],
-                    img_urls=get_imgs_url_from_note(note),
-                    video_url=get_video_url_from_note(note),
-                    tag_list=note["tag_list"],
-                    at_user_list=note["at_user_list"],
-                    collected_count=interact_info["collected_count"],
-                    comment_count=interact_info["comment_count"],
-                    liked_count=interact_info["liked_count"],
-                    share_count=interact_info["share_count"],
-                    time=note["time"],
-                    last_update_time=note["last_update_time"],
-                )
-                result.append(note_info)
+                result.append(note_from_card(note))
                 time.sleep(crawl_interval)
         return result
 
-    def get_note_comments(self, note_id: str, cursor: str = "", xsec_token: str = ""):
+    def _get_user_all_notes_concurrently(self, user_id: str, max_workers: int, rate: float = None):
+        bucket = TokenBucket(rate) if rate else None
+
+        def fetch_note(item):
+            try:
+                return note_from_card(throttle(bucket, self.get_note_by_id, item["note_id"], item["xsec_token"]))
+            except DataFetchError as e:
+                if is_note_unavailable(e):
+                    return None
+                raise
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            note_futures = []
+            page_future = executor.submit(throttle, bucket, self.get_user_notes, user_id, "")
+            while page_future:
+                res = page_future.result()
+                # submit the next page before details, so it is fetched while details are fetching
+                page_future = executor.submit(throttle, bucket, self.get_user_notes, user_id, res["cursor"]) \
+                    if res["has_more"] else None
+                note_futures.extend(executor.submit(fetch_note, item) for item in res["notes"])
+            notes = [future.result() for future in note_futures]
+        finally:
+            executor.shutdown(cancel_futures=True)
+        return [note for note in notes if note is not None]
+
+    def get_note_comments(self, note_id: str, cursor: str = "", xsec_token: str = "", typed: bool = False):
         """get note comments
 
         :param note_id: note id you want to fetch
         :type note_id: str
         :param cursor: last you get cursor, defaults to ""
         :type cursor: str, optional
+        :param typed: return models.CommentPage instead of dict, defaults to False
+        :type typed: bool, optional
         :rtype: dict
         """
         uri = "/api/sns/web/v2/comment/page"
         params = {"note_id": note_id, "cursor": cursor, "image_formats": "jpg,webp,avif", 'xsec_token': xsec_token}
-        return self.get(uri, params)
+        return self.get(uri, params, model=CommentPage if typed else None)
+
+    def iter_note_comments(self, note_id: str, xsec_token: str = "", cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate note comments, see get_note_comments, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_note_comments(note_id, next_cursor, xsec_token),
+            "comments", cursor, limit, until, id_key="id", time_key="create_time"
+        )
 
     def get_note_sub_comments(
-            self, note_id: str, root_comment_id: str, num: int = 30, cursor: str = ""
+            self, note_id: str, root_comment_id: str, num: int = 30, cursor: str = "",
+            typed: bool = False
     ):
         """get note sub comments
 
@@ -527,6 +852,8 @@ class XhsClient:
         :type num: int
         :param cursor: last you get cursor, defaults to ""
         :type cursor: str optional
+        :param typed: return models.CommentPage instead of dict, defaults to False
+        :type typed: bool, optional
         :rtype: dict
         """
         uri = "/api/sns/web/v2/comment/sub/page"
@@ -536,43 +863,83 @@ class XhsClient:
             "num": num,
             "cursor": cursor,
         }
-        return self.get(uri, params)
+        return self.get(uri, params, model=CommentPage if typed else None)
+
+    def iter_note_sub_comments(self, note_id: str, root_comment_id: str, num: int = 30, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate note sub comments, see get_note_sub_comments, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_note_sub_comments(note_id, root_comment_id, num, next_cursor),
+            "comments", cursor, limit, until, id_key="id", time_key="create_time"
+        )
 
-    def get_note_all_comments(self, note_id: str, crawl_interval: int = 1, xsec_token: str = ""):
+    def get_note_all_comments(self, note_id: str, crawl_interval: int = 1, xsec_token: str = "",
+                              max_workers: int = 1, rate: float = None, as_tree: bool = False):
         """get note all comments include sub comments
 
+        when max_workers is greater than 1, sub comments of different root comments are fetched
+        by a thread pool while comment pages are fetched, crawl_interval is not used,
+        limit the speed with rate instead, the result order is always the same as serial fetching
+
         :param crawl_interval: crawl interval for fetch
         :param note_id: note id you want to fetch
         :type note_id: str
+        :param max_workers: concurrent requests, defaults to 1
+        :type max_workers: int, optional
+        :param rate: max requests per second shared by all workers, defaults to no limit
+        :type rate: float, optional
+        :param as_tree: return root comments whose sub_comments contains all sub comments,
+            defaults to False, which returns [root_comment, *sub_comments, root_comment, ...]
+        :type as_tree: bool, optional
         """
-        result = []
-        comments_has_more = True
-        comments_cursor = ""
-        while comments_has_more:
-            comments_res = self.get_note_comments(note_id, comments_cursor, xsec_token)
-            comments_has_more = comments_res.get("has_more", False)
-            comments_cursor = comments_res.get("cursor", "")
-            comments = comments_res["comments"]
-            for comment in comments:
-                result.append(comment)
-                cur_sub_comment_count = int(comment["sub_comment_count"])
-                cur_sub_comments = comment["sub_comments"]
-                result.extend(cur_sub_comments)
-                sub_comments_has_more = comment["sub_comment_has_more"] and len(
-                    cur_sub_comments) < cur_sub_comment_count
-                sub_comment_cursor = comment["sub_comment_cursor"]
-                while sub_comments_has_more:
-                    page_num = 30
-                    sub_comments_res = self.get_note_sub_comments(
-                        note_id, comment["id"], num=page_num, cursor=sub_comment_cursor
-                    )
-                    sub_comments = sub_comments_res["comments"]
-                    sub_comments_has_more = sub_comments_res["has_more"] and len(sub_comments) == page_num
-                    sub_comment_cursor = sub_comments_res["cursor"]
-                    result.extend(sub_comments)
+        bucket = TokenBucket(rate) if rate else None
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+
+        def expand_sub_comments(comment):
+            sub_comments = list(comment["sub_comments"])
+            sub_comments_has_more = comment["sub_comment_has_more"] and len(
+                sub_comments) < int(comment["sub_comment_count"])
+            sub_comment_cursor = comment["sub_comment_cursor"]
+            while sub_comments_has_more:
+                page_num = 30
+                sub_comments_res = throttle(bucket, self.get_note_sub_comments,
+                                            note_id, comment["id"], num=page_num, cursor=sub_comment_cursor)
+                sub_comments_page = sub_comments_res["comments"]
+                sub_comments_has_more = sub_comments_res["has_more"] and len(sub_comments_page) == page_num
+                sub_comment_cursor = sub_comments_res["cursor"]
+                sub_comments.extend(sub_comments_page)
+                if not executor:
                     time.sleep(crawl_interval)
-            time.sleep(crawl_interval)
-        return result
+            return sub_comments
+
+        threads = []
+        try:
+            comments_has_more = True
+            comments_cursor = ""
+            while comments_has_more:
+                comments_res = throttle(bucket, self.get_note_comments, note_id, comments_cursor, xsec_token)
+                comments_has_more = comments_res.get("has_more", False)
+                comments_cursor = comments_res.get("cursor", "")
+                for comment in comments_res["comments"]:
+                    if executor:
+                        threads.append((comment, executor.submit(expand_sub_comments, comment)))
+                    else:
+                        threads.append((comment, expand_sub_comments(comment)))
+                if not executor:
+                    time.sleep(crawl_interval)
+            threads = [(comment, sub_comments.result() if isinstance(sub_comments, Future) else sub_comments)
+                       for comment, sub_comments in threads]
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+        return comment_threads_to_result(threads, as_tree)
 
     def comment_note(self, note_id: str, content: str):
         """comment a note
@@ -714,11 +1081,41 @@ class XhsClient:
         params = {"user_id": user_id, "num": num, "cursor": cursor}
         return self.get(uri, params)
 
+    def iter_user_collect_notes(self, user_id: str, num: int = 30, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate user collect notes, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this note_id, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_user_collect_notes(user_id, num, next_cursor),
+            "notes", cursor, limit, until, id_key="note_id"
+        )
+
     def get_user_like_notes(self, user_id: str, num: int = 30, cursor: str = ""):
         uri = "/api/sns/web/v1/note/like/page"
         params = {"user_id": user_id, "num": num, "cursor": cursor}
         return self.get(uri, params)
 
+    def iter_user_like_notes(self, user_id: str, num: int = 30, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate user like notes, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this note_id, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_user_like_notes(user_id, num, next_cursor),
+            "notes", cursor, limit, until, id_key="note_id"
+        )
+
     def get_emojis(self):
         uri = "/api/im/redmoji/detail"
         return self.get(uri)["emoji"]["tabs"][0]["collection"]
@@ -728,16 +1125,61 @@ class XhsClient:
         params = {"num": num, "cursor": cursor}
         return self.get(uri, params)
 
+    def iter_mention_notifications(self, num: int = 20, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate mention notifications, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_mention_notifications(num, next_cursor),
+            "message_list", cursor, limit, until, id_key="id", time_key="time"
+        )
+
     def get_like_notifications(self, num: int = 20, cursor: str = ""):
         uri = "/api/sns/web/v1/you/likes"
         params = {"num": num, "cursor": cursor}
         return self.get(uri, params)
 
+    def iter_like_notifications(self, num: int = 20, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate like notifications, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_like_notifications(num, next_cursor),
+            "message_list", cursor, limit, until, id_key="id", time_key="time"
+        )
+
     def get_follow_notifications(self, num: int = 20, cursor: str = ""):
         uri = "/api/sns/web/v1/you/connections"
         params = {"num": num, "cursor": cursor}
         return self.get(uri, params)
 
+    def iter_follow_notifications(self, num: int = 20, cursor: str = "", limit: int = None, until=None) -> CursorIterator:
+        """iterate follow notifications, pages are fetched lazily while iterating
+
+        :param cursor: start cursor, save iterator.next_cursor to resume later, defaults to ""
+        :type cursor: str, optional
+        :param limit: max items to yield, defaults to no limit
+        :type limit: int, optional
+        :param until: stop before the item with this id or timestamp, defaults to None
+        :rtype: CursorIterator
+        """
+        return CursorIterator(
+            lambda next_cursor: self.get_follow_notifications(num, next_cursor),
+            "message_list", cursor, limit, until, id_key="id", time_key="time"
+        )
+
     def get_notes_summary(self):
         uri = "/api/galaxy/creator/data/note_detail_new"
         headers = {
@@ -785,6 +1227,15 @@ class XhsClient:
         :param count: 文件数量
         :return:
         """
+        return self.get_upload_files_permits(file_type, count)[0]
+
+    def get_upload_files_permits(self, file_type: str, count: int = 1) -> list:
+        """获取多个文件上传的 id，一次请求即可
+
+        :param file_type: 文件类型，["images", "video"]
+        :param count: 文件数量
+        :return: [(file_id, token), ...]
+        """
         uri = "/api/media/v1/upload/web/permit"
         params = {
             "biz_name": "spectrum",
@@ -794,10 +1245,10 @@ class XhsClient:
             "source": "web",
         }
         res = self.get(uri, params)
-        temp_permit = res["uploadTempPermits"][0]
-        file_id = temp_permit["fileIds"][0]
-        token = temp_permit["token"]
-        return file_id, token
+        permits = [(file_id, permit["token"]) for permit in res["uploadTempPermits"] for file_id in permit["fileIds"]]
+        if len(permits) < count:
+            raise DataFetchError(f"{count} upload permits are requested, but got {len(permits)}")
+        return permits[:count]
 
     def get_upload_id(self, file_id, token):
         headers = {"X-Cos-Security-Token": token}
@@ -819,54 +1270,69 @@ class XhsClient:
         xml_string = ("<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>" + etree.tostring(root,
                                                                                                        encoding='UTF-8').decode(
             "UTF-8").replace("&amp;", "&"))
-        print(xml_string)
-        print(file_id)
-        print(token)
-        print(upload_id)
         headers = {"X-Cos-Security-Token": token, "Content-Type": "application/xml"}
         url = f"https://ros-upload.xiaohongshu.com/{file_id}?uploadId={upload_id}"
         return self.request("POST", url, data=xml_string, headers=headers)
 
-    def upload_file_with_slice(self, file_id: str, token: str,
-                               file_path: str):
+    def _upload_part(self, url: str, headers: dict, upload_id: str, part_number: int, data: bytes,
+                     retries: int) -> str:
+        """put one part, it is retried alone when failed, return its etag"""
+        attempt = 0
+        while True:
+            try:
+                res = self.request("PUT", url, params={"partNumber": part_number, "uploadId": upload_id},
+                                   data=data, headers=headers)
+                if not isinstance(res, requests.Response) or not res.ok or "ETag" not in res.headers:
+                    raise DataFetchError(f"part {part_number} is not accepted: {getattr(res, 'text', res)}",
+                                         response=res if isinstance(res, requests.Response) else None)
+                return res.headers["ETag"]
+            except requests.RequestException:
+                if attempt >= retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+
+    def upload_file_with_slice(self, file_id: str, token: str, file_path: str,
+                               part_size: int = DEFAULT_PART_SIZE, max_workers: int = 4, retries: int = 3,
+                               manifest_path: str = None, progress=None):
+        """upload file by parts in parallel, parts are read at their offsets through mmap,
+        and a failed part is retried alone
+
+        :param part_size: bytes of a part, defaults to 5MB
+        :param max_workers: parts uploaded at once, defaults to 4
+        :param retries: times a failed part is retried, defaults to 3
+        :param manifest_path: json file recording file_id, upload_id and uploaded parts, an upload
+            interrupted before resumes from it and only sends the missing parts, it is removed when
+            the upload completed, defaults to None
+        :param progress: progress(uploaded_bytes, total_bytes) called after every part, defaults to None
+        """
         headers = {"X-Cos-Security-Token": token}
         url = "https://ros-upload.xiaohongshu.com/" + file_id
-        upload_id = self.get_upload_id(file_id, token)
-        parts = []
-        part_num = 1
-        
-        # 获取文件总大小
-        total_size = os.path.getsize(file_path)
-        uploaded_size = 0
-        chunk_size = 1024 * 1024 * 5  # 5MB per chunk
-        
-        print(f"\n开始上传文件: {os.path.basename(file_path)}")
-        print(f"文件大小: {total_size / 1024 / 1024:.2f}MB")
-        
-        with open(file_path, "rb") as f:
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                    
-                params = {
-                    "partNumber": part_num,
-                    "uploadId": upload_id
-                }
-                res = self.request("PUT", url, params=params, data=data, headers=headers)
-                parts.append({
-                    "PartNumber": part_num,
-                    "ETag": res.headers["Etag"]
-                })
-                
-                uploaded_size += len(data)
-                progress = (uploaded_size / total_size) * 100
-                print(f"\r上传进度: {progress:.1f}% ({uploaded_size}/{total_size} bytes)", end="", flush=True)
-                
-                part_num += 1
-                
-        print("\n分片上传完成，正在合并文件...")
-        return self.create_complete_multipart_upload(file_id, token, upload_id, parts)
+        manifest = UploadManifest(manifest_path, file_id, os.path.getsize(file_path), part_size)
+        if manifest.upload_id is None:
+            manifest.upload_id = self.get_upload_id(file_id, token)
+            manifest.save()
+        pending = manifest.pending()
+        uploaded = manifest.size - sum(end - start for _, start, end in pending)
+        lock = threading.Lock()
+
+        def upload_part(part_number, start, end):
+            nonlocal uploaded
+            etag = self._upload_part(url, headers, manifest.upload_id, part_number, reader.read(start, end), retries)
+            manifest.add(part_number, etag)
+            with lock:
+                uploaded += end - start
+                if progress is not None:
+                    progress(uploaded, manifest.size)
+
+        with PartReader(file_path) as reader, ThreadPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(upload_part, *part) for part in pending]
+            errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            raise errors[0]
+        res = self.create_complete_multipart_upload(file_id, token, manifest.upload_id, manifest.completed())
+        manifest.remove()
+        return res
 
     def upload_file(
             self,
@@ -874,6 +1340,7 @@ class XhsClient:
             token: str,
             file_path: str,
             content_type: str = "image/jpeg",
+            progress=None,
     ):
         """ 将文件上传至指定文件 id 处
 
@@ -881,14 +1348,15 @@ class XhsClient:
         :param token: 上传授权验证 token
         :param file_path: 文件路径，暂只支持本地文件路径
         :param content_type:  【"video/mp4","image/jpeg","image/png"】
+        :param progress: 可选，分片上传时每个分片完成后调用 progress(已上传字节数, 总字节数)
         :return:
         """
         # 5M 为一个 part
-        max_file_size = 5 * 1024 * 1024
+        max_file_size = DEFAULT_PART_SIZE
         url = "https://ros-upload.xiaohongshu.com/" + file_id
         if os.path.getsize(file_path) > max_file_size and content_type == "video/mp4":
             # 启用分片上传，支持大文件
-            return self.upload_file_with_slice(file_id, token, file_path)
+            return self.upload_file_with_slice(file_id, token, file_path, progress=progress)
         else:
             headers = {"X-Cos-Security-Token": token, "Content-Type": content_type}
             with open(file_path, "rb") as f:
@@ -973,8 +1441,9 @@ class XhsClient:
             ats: list = None,
             topics: list = None,
             is_private: bool = False,
+            max_workers: int = 9,
     ):
-        """发布图文笔记
+        """发布图文笔记，一次请求获取所有图片的上传 id，图片并发上传
 
         :param title: 笔记标题
         :param desc: 笔记详情
@@ -983,6 +1452,7 @@ class XhsClient:
         :param ats: 可选，@用户信息
         :param topics: 可选，话题信息
         :param is_private: 可选，是否私密发布
+        :param max_workers: 可选，同时上传的图片数量
         :return:
         """
         if ats is None:
@@ -990,18 +1460,21 @@ class XhsClient:
         if topics is None:
             topics = []
 
-        images = []
-        for file in files:
-            image_id, token = self.get_upload_files_permit("image")
-            self.upload_file(image_id, token, file)
-            images.append(
-                {
-                    "file_id": image_id,
-                    "metadata": {"source": -1},
-                    "stickers": {"version": 2, "floating": []},
-                    "extra_info_json": '{"mimeType":"image/jpeg"}',
-                }
-            )
+        if not files:
+            raise ValueError("an image note needs at least one image")
+        permits = self.get_upload_files_permits("image", len(files))
+        with ThreadPoolExecutor(max_workers) as executor:
+            # list() raises the first failed upload, images keep the order of files
+            list(executor.map(lambda permit, file: self.upload_file(*permit, file), permits, files))
+        images = [
+            {
+                "file_id": image_id,
+                "metadata": {"source": -1},
+                "stickers": {"version": 2, "floating": []},
+                "extra_info_json": '{"mimeType":"image/jpeg"}',
+            }
+            for image_id, _ in permits
+        ]
         return self.create_note(title, desc, NoteType.NORMAL.value, ats=ats, topics=topics,
                                 image_info={"images": images}, is_private=is_private,
                                 post_time=post_time)
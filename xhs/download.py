@@ -0,0 +1,389 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+
+from .adapters import PooledHTTPAdapter
+from .exception import DownloadError
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+_MD5_ETAG = re.compile(r'"?([0-9a-f]{32})"?$', re.I)
+
+
+class CdnLatency:
+    """moving average of seconds until response headers per cdn host
+
+    failed requests count as penalty seconds, so broken mirrors sink to the end
+
+    :param alpha: weight of the newest sample
+    :param penalty: seconds added as a sample when a request failed
+    """
+
+    def __init__(self, alpha: float = 0.3, penalty: float = 10.0):
+        self.alpha = alpha
+        self.penalty = penalty
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def add(self, url: str, seconds: float):
+        host = urlparse(url).netloc
+        with self._lock:
+            last = self._latency.get(host)
+            self._latency[host] = seconds if last is None else last + self.alpha * (seconds - last)
+
+    def fail(self, url: str):
+        self.add(url, self.penalty)
+
+    def rank(self, urls) -> list:
+        """urls of the fastest hosts first, hosts never measured come first so every mirror gets measured"""
+        latency = self._latency
+        return sorted(urls, key=lambda url: latency.get(urlparse(url).netloc, 0.0))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._latency)
+
+
+def _validator(etag, last_modified):
+    """If-Range value proving a range belongs to the same version of a file, a strong
+    etag or else last-modified, None when ranges of the file can't be trusted
+    """
+    if etag and not etag.startswith("W/"):
+        return etag
+    return last_modified
+
+
+class _PartFile:
+    """<filename>.part being downloaded, and <filename>.part.json with its etag, last-modified,
+    size and the bytes written of every segment, so a later download continues where this one
+    stopped, as long as the server still has the same version of the file
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.path = filename + ".part"
+        self.state_path = self.path + ".json"
+        self.etag = None
+        self.last_modified = None
+        self.size = None
+        self.segments = []  # [start, end, written], end is None when size is unknown
+        self._lock = threading.Lock()
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if os.path.exists(self.path):
+                self.etag, self.size, self.segments = state["etag"], state["size"], state["segments"]
+                self.last_modified = state.get("last_modified")
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def pending(self) -> list:
+        return [segment for segment in self.segments if segment[1] is None or segment[0] + segment[2] < segment[1]]
+
+    @property
+    def validator(self):
+        return _validator(self.etag, self.last_modified)
+
+    def range_headers(self, segment=None) -> dict:
+        """headers requesting the rest of segment, defaults to an unfinished one, preferring
+        one with bytes written, no headers when nothing was written yet or the file has no validator
+        """
+        pending = self.pending()
+        if segment is None:
+            if not pending or not any(written for _, _, written in self.segments) or not self.validator:
+                return {}
+            segment = next((other for other in pending if other[2]), pending[0])
+        start, end, written = segment
+        headers = {"Range": f"bytes={start + written}-{'' if end is None else end - 1}"}
+        if self.validator:
+            headers["If-Range"] = self.validator
+        return headers
+
+    def same_version(self, res) -> bool:
+        """whether res is a response of the version of the file being downloaded"""
+        if self.validator is None:
+            return False
+        if self.validator == self.etag:
+            return res.headers.get("ETag") == self.etag
+        return res.headers.get("Last-Modified") == self.last_modified
+
+    def start(self, res, size, count: int):
+        """start again from the 200 response res with count segments"""
+        self.etag, self.last_modified, self.size = res.headers.get("ETag"), res.headers.get("Last-Modified"), size
+        if size is None:
+            self.segments = [[0, None, 0]]
+        else:
+            step = max(-(-size // count), 1)
+            self.segments = [[start, min(start + step, size), 0] for start in range(0, size, step)] or [[0, 0, 0]]
+        with open(self.path, "wb") as f:
+            f.truncate(size or 0)
+        self.save()
+
+    def resumed(self, res):
+        """the segment continued by a 206 response, None when it is a range of another
+        version of the file, then the part is dropped
+        """
+        match = _CONTENT_RANGE.match(res.headers.get("Content-Range", ""))
+        if match and self.same_version(res) and match.group(2) == str(self.size):
+            for segment in self.pending():
+                if segment[0] + segment[2] == int(match.group(1)):
+                    return segment
+        self.clear()
+        return None
+
+    def save(self):
+        with self._lock:
+            with open(self.state_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"etag": self.etag, "last_modified": self.last_modified, "size": self.size,
+                           "segments": self.segments}, f)
+            os.replace(self.state_path + ".tmp", self.state_path)
+
+    def clear(self):
+        self.etag, self.last_modified, self.size, self.segments = None, None, None, []
+        for path in (self.path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _md5(self) -> str:
+        md5 = hashlib.md5()
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def finish(self):
+        """check the assembled part against the size and the md5 etag announced, and rename it,
+        a part failing the check is dropped
+        """
+        written = sum(segment[2] for segment in self.segments)
+        error = None
+        if self.size is not None and (written != self.size or os.path.getsize(self.path) != self.size):
+            error = f"{self.path} has {os.path.getsize(self.path)} bytes, {self.size} bytes are announced"
+        else:
+            md5 = _MD5_ETAG.match(self.etag or "")
+            if md5 and md5.group(1).lower() != self._md5():
+                error = f"md5 of {self.path} doesn't match etag {self.etag}"
+        if error:
+            self.clear()
+            raise DownloadError(error)
+        os.replace(self.path, self.filename)
+        os.remove(self.state_path)
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result()[1].close()
+
+
+class MediaDownloader:
+    """downloader of note images and videos over a shared keep-alive connection pool
+
+    every asset is given as the urls of all its cdn mirrors, the mirror with the lowest
+    learned latency is requested first, when it has not answered in hedge_after seconds
+    the next one races it (at most `race` at once), the first response wins and the
+    others are closed, mirrors failing before or while streaming the body are failed over
+
+    files are written to <filename>.part and renamed when all bytes announced by the server
+    arrived, a download failed by every mirror resumes by http Range requests the next time,
+    as long as the size and strong etag (or last-modified) of the file are unchanged, a file
+    is checked against its size and md5 etag before it is renamed, large files may be split into
+    segments downloaded in parallel, for example:
+
+        downloader = MediaDownloader(max_workers=8)
+        downloader.download_all([(get_img_urls_by_trace_id(trace_id), "0.png") for trace_id in trace_ids])
+
+    :param max_workers: assets downloaded at once by download_all
+    :param race: mirrors requested at once for one asset
+    :param hedge_after: seconds to wait for the headers of a mirror before racing the next one
+    :param timeout: requests timeout of connecting and reading
+    :param chunk_size: bytes read from a response at once
+    :param buffer_size: bytes buffered before they are written to a file
+    :param segments: parallel range requests of one file, only used when the server accepts ranges
+    :param min_segment_size: files are not split into segments smaller than this
+    :param proxies: requests style proxies of cdn requests
+    """
+
+    def __init__(self, max_workers: int = 8, race: int = 2, hedge_after: float = 0.5, timeout=(5, 30),
+                 chunk_size: int = 256 * 1024, buffer_size: int = 1024 * 1024, segments: int = 1,
+                 min_segment_size: int = 4 * 1024 * 1024, proxies=None):
+        self.race = race
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.segments = segments
+        self.min_segment_size = min_segment_size
+        self.latency = CdnLatency()
+        self.session = requests.Session()
+        self.session.proxies = proxies or {}
+        # sizes announced by Content-Length and Content-Range are the sizes of the file
+        self.session.headers["Accept-Encoding"] = "identity"
+        adapter = PooledHTTPAdapter(pool_maxsize=max_workers * race)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # responses are opened by their own pool, so assets never wait for threads held by other assets
+        self._open_executor = ThreadPoolExecutor(max_workers * race, thread_name_prefix="xhs-cdn")
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="xhs-download")
+
+    def _open(self, url: str, headers: dict = None):
+        started = time.monotonic()
+        try:
+            res = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+            res.raise_for_status()
+        except requests.RequestException:
+            self.latency.fail(url)
+            raise
+        self.latency.add(url, time.monotonic() - started)
+        return url, res
+
+    def _race(self, urls: list, headers: dict = None):
+        """(url, response) of the mirror answering first"""
+        candidates = self.latency.rank(urls)
+        pending = set()
+        raced = {}
+        error = None
+        while candidates or pending:
+            if candidates and len(pending) < self.race:
+                url = candidates.pop(0)
+                future = self._open_executor.submit(self._open, url, headers)
+                raced[future] = (url, time.monotonic())
+                pending.add(future)
+            hedge = candidates and len(pending) < self.race
+            done, pending = wait(pending, timeout=self.hedge_after if hedge else None, return_when=FIRST_COMPLETED)
+            winner = None
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif winner is None:
+                    winner = future.result()
+                else:
+                    _close_response(future)
+            if winner is not None:
+                for future in pending:
+                    # the loser is slower than it has waited, even before it answers
+                    url, requested = raced[future]
+                    self.latency.add(url, time.monotonic() - requested)
+                    future.add_done_callback(_close_response)
+                return winner
+        raise error
+
+    def _fetch(self, url: str, part: _PartFile, segment: list, res=None):
+        """write the rest of segment from res, or from a new range request"""
+        if res is None:
+            res = self.session.get(url, headers=part.range_headers(segment), stream=True, timeout=self.timeout)
+            res.raise_for_status()
+            if res.status_code != 206 or not part.same_version(res):
+                res.close()
+                raise DownloadError(f"{url} doesn't answer ranges of {part.path}")
+        start, end, written = segment
+        offset = start + written
+        saved = offset
+        with res, open(part.path, "r+b", buffering=self.buffer_size) as f:
+            f.seek(offset)
+            try:
+                for chunk in res.iter_content(chunk_size=self.chunk_size):
+                    if end is not None:
+                        chunk = chunk[:end - offset]
+                    f.write(chunk)
+                    offset += len(chunk)
+                    if offset - saved >= 16 * self.buffer_size:
+                        f.flush()
+                        segment[2], saved = offset - start, offset
+                        part.save()
+                    if end is not None and offset >= end:
+                        break
+            finally:
+                # written bytes are only counted after they left the buffer
+                f.flush()
+                segment[2] = offset - start
+        if end is not None and offset < end:
+            raise DownloadError(f"{url} closed at {offset} of {end} bytes")
+
+    def _download_part(self, url: str, res, part: _PartFile, segments: int) -> bool:
+        """download the pending segments of part, False when the part was dropped because
+        the server has another version of the file
+        """
+        if res.status_code == 206:
+            segment = part.resumed(res)
+            if segment is None:
+                return False
+        else:
+            size = res.headers.get("Content-Length")
+            size = int(size) if size else None
+            # segments of a file without validator could come from different versions
+            validator = _validator(res.headers.get("ETag"), res.headers.get("Last-Modified"))
+            if res.headers.get("Accept-Ranges") != "bytes" or size is None or not validator:
+                segments = 1
+            part.start(res, size, max(min(segments, (size or 0) // self.min_segment_size), 1))
+            segment = part.segments[0]
+        futures = [self._open_executor.submit(self._fetch, url, part, other)
+                   for other in part.pending() if other is not segment]
+        try:
+            self._fetch(url, part, segment, res)
+        finally:
+            wait(futures)
+            if part.segments:
+                part.save()
+        for future in futures:
+            future.result()
+        return True
+
+    def download(self, urls, filename: str, segments: int = None) -> str:
+        """download one asset from any of its mirror urls to filename
+
+        :param urls: url or urls of cdn mirrors serving the same file
+        :param segments: parallel range requests of the file, defaults to self.segments
+        :return: filename
+        """
+        urls = [urls] if isinstance(urls, str) else list(urls)
+        if not urls:
+            raise ValueError(f"no url to download {filename}")
+        part = _PartFile(filename)
+        if part.segments and not part.pending():
+            part.finish()
+            return filename
+        while True:
+            headers = part.range_headers()
+            url, res = self._race(urls, headers)
+            try:
+                if self._download_part(url, res, part, segments or self.segments):
+                    part.finish()
+                    return filename
+                res.close()
+                if not headers:
+                    raise DownloadError(f"{url} answered a range without being asked")
+            except requests.RequestException:
+                res.close()
+                self.latency.fail(url)
+                urls.remove(url)
+                if not urls:
+                    raise
+
+    def download_all(self, items, return_exceptions: bool = False) -> list:
+        """download assets concurrently
+
+        :param items: [(urls, filename), ...]
+        :param return_exceptions: return the exception of a failed asset in its place instead of raising it
+        :return: filenames in the order of items
+        """
+        futures = [self._executor.submit(self.download, urls, filename) for urls, filename in items]
+        if return_exceptions:
+            return [future.exception() or future.result() for future in futures]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._open_executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
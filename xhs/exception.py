@@ -36,3 +36,7 @@ class NeedVerifyError(RequestException):
         self.verify_type = kwargs.pop("verify_type", None)
         self.verify_uuid = kwargs.pop("verify_uuid", None)
         super().__init__(*args, **kwargs)
+
+
+class DownloadError(RequestException):
+    """downloaded bytes don't match size or etag announced by the server"""
@@ -0,0 +1,40 @@
+"""json helpers of request bodies and responses
+
+request bodies are always encoded by the standard library, because the bytes are
+signed and must match what browsers send, responses are decoded by orjson or msgspec
+when one of them is installed, which is several times faster than json.loads
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+if orjson is not None:
+    backend = "orjson"
+    _loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+elif msgspec is not None:  # pragma: no cover
+    backend = "msgspec"
+    _loads = msgspec.json.Decoder().decode
+    DecodeError = (msgspec.DecodeError, ValueError)
+else:  # pragma: no cover
+    backend = "json"
+    _loads = json.loads
+    DecodeError = json.JSONDecodeError
+
+
+def dumps(data) -> bytes:
+    """canonical compact json bytes, equal to what sign() signs"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(content):
+    """decode json from bytes or str, raise DecodeError when content is not json"""
+    return _loads(content)
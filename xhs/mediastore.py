@@ -0,0 +1,186 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from .download import MediaDownloader
+from .help import (get_img_urls_by_trace_id, get_trace_id,
+                   get_video_urls_from_note)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_assets (
+    note_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (note_id, position)
+);
+CREATE INDEX IF NOT EXISTS note_assets_key ON note_assets (key);
+"""
+
+# sqlite accepts at least 999 parameters per statement
+_BATCH = 500
+
+
+def note_media(note: dict) -> list:
+    """[(key, urls, ext), ...] of the video or the images of a note, videos are keyed by
+    origin_video_key and images by trace_id, which are the same on every cdn and crawl
+    """
+    if note.get("type") == "video" and note.get("video"):
+        return [(note["video"]["consumer"]["origin_video_key"], get_video_urls_from_note(note), ".mp4")]
+    trace_ids = [get_trace_id(img["info_list"][0]["url"]) for img in note.get("image_list") or []]
+    return [(trace_id, get_img_urls_by_trace_id(trace_id), ".png") for trace_id in trace_ids]
+
+
+class MediaStore:
+    """content addressed store of note videos and images, keyed by origin_video_key and trace_id
+
+    a file is stored at root/ab/cd/abcd...<ext> named by the sha1 of its key, and indexed
+    in root/index.sqlite3, an asset shared by many notes or crawls is downloaded once,
+    and assets already stored are skipped by one index query per batch, for example:
+
+        store = MediaStore("media")
+        for note in notes:
+            paths = store.fetch_note(note)
+
+    :param root: directory of the store
+    :param downloader: xhs.download.MediaDownloader of missing assets, defaults to a new one
+    """
+
+    def __init__(self, root: str, downloader: MediaDownloader = None):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.downloader = downloader or MediaDownloader()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._fetching = {}
+        with self._lock, self._db:
+            # commits of every note stay cheap while crawling, only the last ones may be lost on power failure
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def relpath_of(key: str, ext: str = "") -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(digest[:2], digest[2:4], digest + ext)
+
+    def _stored(self, keys) -> dict:
+        """{key: path} of keys in the index whose file exists"""
+        keys = list(dict.fromkeys(keys))
+        rows = []
+        with self._lock:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i:i + _BATCH]
+                rows += self._db.execute(
+                    f"SELECT key, path FROM assets WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+        paths = {key: os.path.join(self.root, path) for key, path in rows}
+        return {key: path for key, path in paths.items() if os.path.exists(path)}
+
+    def get(self, key: str):
+        """path of a stored asset, None when it is not stored"""
+        return self._stored([key]).get(key)
+
+    def _index(self, items):
+        rows = [(key, self.relpath_of(key, ext), os.path.getsize(path), time.time()) for key, ext, path in items]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO assets (key, path, size, created) VALUES (?, ?, ?, ?)", rows)
+
+    def fetch_all(self, items) -> list:
+        """paths of assets, only the ones missing from the store are downloaded
+
+        :param items: [(key, urls, ext), ...], like the return value of note_media
+        :return: paths in the order of items, the first failed download is raised after
+            the others are stored
+        """
+        items = list(items)
+        paths = self._stored(key for key, _, _ in items)
+        owned, waiting = {}, {}
+        with self._lock:
+            for key, urls, ext in items:
+                if key in paths or key in owned or key in waiting:
+                    continue
+                if key in self._fetching:
+                    # fetched by another thread right now
+                    waiting[key] = self._fetching[key]
+                else:
+                    owned[key] = (urls, ext)
+                    self._fetching[key] = Future()
+        results, error, failure = {}, None, None
+        try:
+            downloads = []
+            for key, (urls, ext) in owned.items():
+                path = os.path.join(self.root, self.relpath_of(key, ext))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # a file renamed into place before the index was written is complete
+                if not os.path.exists(path):
+                    downloads.append((key, urls, path))
+            results = dict(zip((key for key, _, _ in downloads),
+                               self.downloader.download_all([(urls, path) for _, urls, path in downloads],
+                                                            return_exceptions=True)))
+            stored = []
+            for key, (urls, ext) in owned.items():
+                result = results.get(key, os.path.join(self.root, self.relpath_of(key, ext)))
+                if isinstance(result, BaseException):
+                    error = error or result
+                else:
+                    stored.append((key, ext, result))
+                    paths[key] = result
+            self._index(stored)
+        except BaseException as e:
+            failure = e
+            raise
+        finally:
+            # threads waiting for these keys are woken up, whatever happened
+            with self._lock:
+                for key in owned:
+                    future = self._fetching.pop(key)
+                    if key in paths:
+                        future.set_result(paths[key])
+                    else:
+                        future.set_exception(results.get(key, failure))
+        for key, future in waiting.items():
+            try:
+                paths[key] = future.result()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return [paths[key] for key, _, _ in items]
+
+    def fetch_note(self, note: dict) -> list:
+        """paths of the video or images of note, which is linked to its assets in the index"""
+        media = note_media(note)
+        paths = self.fetch_all(media)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM note_assets WHERE note_id = ?", (note["note_id"],))
+            self._db.executemany("INSERT INTO note_assets (note_id, position, key) VALUES (?, ?, ?)",
+                                 [(note["note_id"], position, key) for position, (key, _, _) in enumerate(media)])
+        return paths
+
+    def note_paths(self, note_id: str) -> list:
+        """paths of the assets of a note fetched by fetch_note, in the order of the note"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT assets.path FROM note_assets JOIN assets ON assets.key = note_assets.key "
+                "WHERE note_assets.note_id = ? ORDER BY note_assets.position", (note_id,)
+            ).fetchall()
+        return [os.path.join(self.root, path) for path, in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,33 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TimingStats:
+    """thread safe count, total and max seconds of named phases of requests,
+    XhsClient records "sign" (building signature headers) and "http" (sending
+    request and reading response), so slowness can be attributed to the signer or the api
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            phase = self._phases.setdefault(name, {"count": 0, "seconds": 0.0, "max": 0.0})
+            phase["count"] += 1
+            phase["seconds"] += seconds
+            phase["max"] = max(phase["max"], seconds)
+
+    @contextmanager
+    def time(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(phase) for name, phase in self._phases.items()}
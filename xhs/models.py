@@ -0,0 +1,247 @@
+"""typed response models
+
+models are slotted dataclasses which only declare the fields commonly read, when msgspec
+is installed responses are decoded straight from bytes into models and undeclared fields
+are skipped without building dicts, otherwise responses are decoded to dicts first and
+converted, for example:
+
+    note = xhs_client.get_note_by_id(note_id, xsec_token, typed=True)
+    print(note.title, note.interact_info.liked_count)
+"""
+import dataclasses
+import functools
+import types
+import typing
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Union
+
+from . import fastjson
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+Count = Union[str, int]
+
+
+@dataclass(slots=True)
+class User:
+    user_id: str = ""
+    nickname: str = ""
+    avatar: str = ""
+    xsec_token: str = ""
+
+
+@dataclass(slots=True)
+class InteractInfo:
+    liked: bool = False
+    liked_count: Count = ""
+    collected: bool = False
+    collected_count: Count = ""
+    comment_count: Count = ""
+    share_count: Count = ""
+
+
+@dataclass(slots=True)
+class ImageScene:
+    image_scene: str = ""
+    url: str = ""
+
+
+@dataclass(slots=True)
+class Image:
+    url_default: str = ""
+    url_pre: str = ""
+    trace_id: str = ""
+    width: int = 0
+    height: int = 0
+    info_list: List[ImageScene] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class VideoConsumer:
+    origin_video_key: str = ""
+
+
+@dataclass(slots=True)
+class Video:
+    consumer: Optional[VideoConsumer] = None
+
+
+@dataclass(slots=True)
+class Tag:
+    id: str = ""
+    name: str = ""
+    type: str = ""
+
+
+@dataclass(slots=True)
+class NoteCard:
+    """note detail returned by get_note_by_id"""
+    note_id: str = ""
+    type: str = ""
+    title: str = ""
+    desc: str = ""
+    user: Optional[User] = None
+    interact_info: Optional[InteractInfo] = None
+    image_list: List[Image] = field(default_factory=list)
+    video: Optional[Video] = None
+    tag_list: List[Tag] = field(default_factory=list)
+    at_user_list: List[User] = field(default_factory=list)
+    ip_location: str = ""
+    time: int = 0
+    last_update_time: int = 0
+
+
+@dataclass(slots=True)
+class FeedNoteItem:
+    id: str = ""
+    model_type: str = ""
+    note_card: Optional[NoteCard] = None
+
+
+@dataclass(slots=True)
+class FeedResponse:
+    items: List[FeedNoteItem] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class SimpleNote:
+    """note summary in home feed, search result and user notes"""
+    note_id: str = ""
+    xsec_token: str = ""
+    type: str = ""
+    display_title: str = ""
+    user: Optional[User] = None
+    interact_info: Optional[InteractInfo] = None
+    cover: Optional[Image] = None
+
+
+@dataclass(slots=True)
+class FeedItem:
+    id: str = ""
+    model_type: str = ""
+    xsec_token: str = ""
+    note_card: Optional[SimpleNote] = None
+
+
+@dataclass(slots=True)
+class FeedPage:
+    """page of get_home_feed and get_note_by_keyword"""
+    has_more: bool = False
+    cursor_score: str = ""
+    items: List[FeedItem] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class UserNotesPage:
+    """page of get_user_notes"""
+    cursor: str = ""
+    has_more: bool = False
+    notes: List[SimpleNote] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class TargetComment:
+    id: str = ""
+    user_info: Optional[User] = None
+
+
+@dataclass(slots=True)
+class Comment:
+    id: str = ""
+    note_id: str = ""
+    content: str = ""
+    create_time: int = 0
+    ip_location: str = ""
+    like_count: Count = ""
+    liked: bool = False
+    user_info: Optional[User] = None
+    target_comment: Optional[TargetComment] = None
+    sub_comment_count: Count = ""
+    sub_comment_cursor: str = ""
+    sub_comment_has_more: bool = False
+    sub_comments: List["Comment"] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class CommentPage:
+    """page of get_note_comments and get_note_sub_comments"""
+    cursor: str = ""
+    has_more: bool = False
+    comments: List[Comment] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class UserBasicInfo:
+    nickname: str = ""
+    red_id: str = ""
+    desc: str = ""
+    gender: int = 0
+    ip_location: str = ""
+    images: str = ""
+    imageb: str = ""
+
+
+@dataclass(slots=True)
+class UserInteraction:
+    type: str = ""
+    name: str = ""
+    count: Count = ""
+
+
+@dataclass(slots=True)
+class UserInfo:
+    """user info returned by get_user_info"""
+    basic_info: Optional[UserBasicInfo] = None
+    interactions: List[UserInteraction] = field(default_factory=list)
+
+
+@functools.lru_cache(maxsize=None)
+def _envelope(model):
+    # code and msg are loosely typed, error responses are mapped by handle_response_data
+    return dataclasses.make_dataclass("Envelope", [
+        ("success", bool, False),
+        ("code", Any, None),
+        ("msg", Any, None),
+        ("data", Optional[model], None),
+    ], slots=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _type_hints(model) -> dict:
+    return typing.get_type_hints(model)
+
+
+def from_dict(model, data):
+    """convert decoded json to model, unknown fields are ignored and missing fields use defaults"""
+    if data is None:
+        return None
+    origin = typing.get_origin(model)
+    if dataclasses.is_dataclass(model):
+        if not isinstance(data, dict):
+            return data
+        hints = _type_hints(model)
+        return model(**{name: from_dict(hint, data[name]) for name, hint in hints.items() if name in data})
+    if origin in (list, List):
+        (item_model,) = typing.get_args(model)
+        return [from_dict(item_model, item) for item in data]
+    if origin in (Union, types.UnionType):
+        for arg in typing.get_args(model):
+            if dataclasses.is_dataclass(arg) or typing.get_origin(arg) in (list, List):
+                return from_dict(arg, data)
+    return data
+
+
+def decode_response(content: bytes, model):
+    """decode api response, return (success, data as model)"""
+    if msgspec is not None:
+        try:
+            envelope = msgspec.json.decode(content, type=_envelope(model))
+            return envelope.success, envelope.data
+        except msgspec.ValidationError:
+            # unexpected field type, fall back to the lenient converter
+            pass
+    res = fastjson.loads(content)
+    return bool(res.get("success")), from_dict(model, res.get("data"))
@@ -0,0 +1,101 @@
+from collections import deque
+
+
+def _to_seconds(timestamp) -> float:
+    """xhs api mixes second and millisecond timestamps"""
+    timestamp = float(timestamp)
+    return timestamp / 1000 if timestamp > 1e11 else timestamp
+
+
+class _CursorPager:
+    def __init__(self, fetch_page, items_key: str, cursor: str = "", limit: int = None, until=None,
+                 id_key: str = "id", time_key: str = None):
+        if until is not None and not isinstance(until, str) and time_key is None:
+            raise ValueError(f"items of {items_key} have no timestamp, until must be an id")
+        self.fetch_page = fetch_page
+        self.items_key = items_key
+        self.limit = limit
+        self.until = until
+        self.id_key = id_key
+        self.time_key = time_key
+        # cursor of the page which the last item comes from, resume from it may yield some items again
+        self.cursor = cursor
+        # cursor of the next page, resume from it after the current page is consumed
+        self.next_cursor = cursor
+        self.has_more = True
+        self.count = 0
+        self._page = deque()
+
+    def _load(self, res: dict):
+        items = res.get(self.items_key) or []
+        self.cursor = self.next_cursor
+        self.next_cursor = res.get("cursor", "")
+        self.has_more = bool(res.get("has_more")) and bool(items)
+        self._page = deque(items)
+
+    def _reached_until(self, item: dict) -> bool:
+        if self.until is None:
+            return False
+        if isinstance(self.until, str):
+            return item.get(self.id_key) == self.until
+        item_time = item.get(self.time_key)
+        return item_time is not None and _to_seconds(item_time) < _to_seconds(self.until)
+
+    def _take(self):
+        item = self._page.popleft()
+        if self._reached_until(item):
+            self.has_more = False
+            self._page.clear()
+            return None
+        self.count += 1
+        return item
+
+    def _exhausted(self) -> bool:
+        return self.limit is not None and self.count >= self.limit
+
+
+class CursorIterator(_CursorPager):
+    """iterate items of a cursor paginated api, the next page is fetched only when
+    the items of current page are consumed
+
+    :param fetch_page: fetch_page(cursor) returns a page, like {"cursor": "", "has_more": true, "notes": []}
+    :param items_key: key of items in page
+    :param cursor: start cursor, for example next_cursor saved by last crawl
+    :param limit: stop after yield limit items
+    :param until: stop before the item whose id equals to until (str),
+        or before the first item older than until (timestamp in seconds or milliseconds)
+    """
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._exhausted():
+            raise StopIteration
+        while not self._page:
+            if not self.has_more:
+                raise StopIteration
+            self._load(self.fetch_page(self.next_cursor))
+        item = self._take()
+        if item is None:
+            raise StopIteration
+        return item
+
+
+class AsyncCursorIterator(_CursorPager):
+    """async version of CursorIterator, fetch_page is a coroutine function"""
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._exhausted():
+            raise StopAsyncIteration
+        while not self._page:
+            if not self.has_more:
+                raise StopAsyncIteration
+            self._load(await self.fetch_page(self.next_cursor))
+        item = self._take()
+        if item is None:
+            raise StopAsyncIteration
+        return item
@@ -0,0 +1,143 @@
+import asyncio
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """thread safe token bucket, `rate` tokens are added per second, up to `capacity`
+
+    for example, at most 2 requests per second with bursts of 4:
+
+        bucket = TokenBucket(rate=2, capacity=4)
+        bucket.acquire()
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def set_rate(self, rate: float):
+        """change rate, tokens already in bucket are kept"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """take tokens if available, return 0, otherwise return seconds to wait before retry"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        """block until tokens are taken"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1):
+        """wait until tokens are taken without blocking the event loop"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AdaptiveRateLimiter:
+    """client level rate limiter, every host has its own token bucket
+
+    the rate of a host is multiplied by backoff_factor when it blocks us (IPBlockError or captcha),
+    and multiplied by recover_factor after recover_after successful requests in a row,
+    but never exceeds its initial rate, for example:
+
+        limiter = AdaptiveRateLimiter(rate=2, rates={"creator.xiaohongshu.com": 1})
+        xhs_client = XhsClient(cookie, sign=sign, rate_limiter=limiter)
+
+    :param rate: initial requests per second of every host
+    :param rates: initial requests per second of specific hosts, like {"edith.xiaohongshu.com": 2}
+    :param min_rate: the rate never drops below min_rate
+    :param max_retries: retry times of a request blocked by IPBlockError
+    :param base_delay: seconds to wait before the first retry, doubled for every retry
+    :param max_delay: max seconds to wait before a retry
+    """
+
+    def __init__(self, rate: float = 2, rates: dict = None, min_rate: float = 0.1,
+                 backoff_factor: float = 0.5, recover_factor: float = 1.1, recover_after: int = 20,
+                 max_retries: int = 3, base_delay: float = 1, max_delay: float = 60):
+        self.rate = rate
+        self.rates = rates or {}
+        self.min_rate = min_rate
+        self.backoff_factor = backoff_factor
+        self.recover_factor = recover_factor
+        self.recover_after = recover_after
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {}
+        self._successes = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rates.get(host, self.rate))
+                self._successes[host] = 0
+            return self._buckets[host]
+
+    def current_rate(self, host: str) -> float:
+        return self.bucket(host).rate
+
+    def acquire(self, host: str):
+        self.bucket(host).acquire()
+
+    async def acquire_async(self, host: str):
+        await self.bucket(host).acquire_async()
+
+    def on_success(self, host: str):
+        bucket = self.bucket(host)
+        with self._lock:
+            self._successes[host] += 1
+            if self._successes[host] < self.recover_after:
+                return
+            self._successes[host] = 0
+        initial_rate = self.rates.get(host, self.rate)
+        if bucket.rate < initial_rate:
+            bucket.set_rate(min(initial_rate, bucket.rate * self.recover_factor))
+
+    def on_blocked(self, host: str, attempt: int = 0) -> float:
+        """slow down host, return seconds to wait with jitter before retry"""
+        bucket = self.bucket(host)
+        with self._lock:
+            self._successes[host] = 0
+        bucket.set_rate(max(self.min_rate, bucket.rate * self.backoff_factor))
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def throttle(bucket, func, *args, **kwargs):
+    """call func after a token is taken from bucket, bucket can be None"""
+    if bucket:
+        bucket.acquire()
+    return func(*args, **kwargs)
+
+
+async def throttle_async(bucket, func, *args, **kwargs):
+    """await func after a token is taken from bucket, bucket can be None"""
+    if bucket:
+        await bucket.acquire_async()
+    return await func(*args, **kwargs)
@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from .adapters import PooledHTTPAdapter
+from .exception import SignError
+from .help import sign as local_sign
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+# apis of creator and customer center, the local sign function is accepted by them
+LOCAL_SIGN_PREFIXES = ("/api/galaxy/", "/api/cas/", "/api/media/", "/web_api/")
+
+
+class _RemoteSignerBase:
+    def __init__(self, urls, timeout: float = 3, hedge_after: float = 0.2,
+                 local_fallback_prefixes=LOCAL_SIGN_PREFIXES):
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls:
+            raise ValueError("at least one sign server url is required")
+        self.urls = [url.rstrip("/") for url in urls]
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.local_fallback_prefixes = tuple(local_fallback_prefixes or ())
+        self._counter = itertools.count()
+
+    def _replicas(self) -> list:
+        # start from a different replica every call to spread the load
+        start = next(self._counter) % len(self.urls)
+        return self.urls[start:] + self.urls[:start]
+
+    @staticmethod
+    def _payload(uri, data, a1, web_session) -> dict:
+        return {"uri": uri, "data": data, "a1": a1, "web_session": web_session}
+
+    @staticmethod
+    def _parse(signs: dict) -> dict:
+        return {**signs, "x-s": signs["x-s"], "x-t": str(signs["x-t"])}
+
+    def _fallback(self, uri, data, a1, error):
+        if uri.startswith(self.local_fallback_prefixes):
+            signs = local_sign(uri, data, a1=a1)
+            return {"x-s": signs["x-s"], "x-t": signs["x-t"], "x-s-common": signs["x-s-common"]}
+        raise SignError(f"all sign servers failed: {error!r}") from error
+
+
+class RemoteSigner(_RemoteSignerBase):
+    """sign function of XhsClient calling sign servers like xhs-api over pooled keep-alive connections
+
+    a call is sent to one replica, when it has not answered in hedge_after seconds (or failed),
+    the next replica is asked too and the first answer wins, when all replicas fail
+    in timeout seconds, apis of creator and customer center are signed locally by
+    xhs.help.sign, others raise SignError, for example:
+
+        signer = RemoteSigner(["http://10.0.0.1:5005", "http://10.0.0.2:5005"])
+        xhs_client = XhsClient(cookie, sign=signer)
+
+    :param urls: base url of sign servers, "/sign" is appended
+    :param timeout: seconds a signature may take, including hedged requests
+    :param hedge_after: seconds to wait before asking the next replica
+    :param pool_maxsize: keep-alive connections kept per replica
+    :param local_fallback_prefixes: uri prefixes which may be signed locally when replicas fail
+    """
+
+    def __init__(self, urls, timeout: float = 3, hedge_after: float = 0.2, pool_maxsize: int = 10,
+                 local_fallback_prefixes=LOCAL_SIGN_PREFIXES):
+        super().__init__(urls, timeout, hedge_after, local_fallback_prefixes)
+        self.session = requests.Session()
+        adapter = PooledHTTPAdapter(pool_connections=len(self.urls), pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_maxsize * len(self.urls),
+                                            thread_name_prefix="xhs-sign")
+
+    def _post(self, url, payload, deadline) -> dict:
+        # a hedge still running after the deadline gives its thread and connection back soon
+        timeout = max(deadline - time.monotonic(), 0.001)
+        res = self.session.post(f"{url}/sign", json=payload, timeout=timeout)
+        res.raise_for_status()
+        return self._parse(res.json())
+
+    def _hedged(self, payload) -> dict:
+        deadline = time.monotonic() + self.timeout
+        replicas = self._replicas()
+        pending = set()
+        error = None
+        try:
+            while replicas or pending:
+                if replicas:
+                    pending.add(self._executor.submit(self._post, replicas.pop(0), payload, deadline))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=min(self.hedge_after, remaining) if replicas else remaining,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+        finally:
+            for future in pending:
+                future.cancel()
+        raise error or requests.Timeout(f"sign servers did not answer in {self.timeout}s")
+
+    def __call__(self, uri, data=None, a1="", web_session=""):
+        try:
+            return self._hedged(self._payload(uri, data, a1, web_session))
+        except (requests.RequestException, ValueError, KeyError) as e:
+            return self._fallback(uri, data, a1, e)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+class AsyncRemoteSigner(_RemoteSignerBase):
+    """async version of RemoteSigner for AsyncXhsClient, requires `pip install xhs[async]`
+
+        signer = AsyncRemoteSigner(["http://10.0.0.1:5005", "http://10.0.0.2:5005"])
+        xhs_client = AsyncXhsClient(cookie, sign=signer)
+
+    :param max_connections: max connections to all replicas
+    :param transport: custom httpx.AsyncBaseTransport, mostly used for testing
+    """
+
+    def __init__(self, urls, timeout: float = 3, hedge_after: float = 0.2, max_connections: int = 100,
+                 local_fallback_prefixes=LOCAL_SIGN_PREFIXES, transport=None):
+        if httpx is None:
+            raise ImportError("AsyncRemoteSigner requires httpx, please run `pip install xhs[async]`")
+        super().__init__(urls, timeout, hedge_after, local_fallback_prefixes)
+        self.client = httpx.AsyncClient(timeout=timeout, transport=transport,
+                                        limits=httpx.Limits(max_connections=max_connections))
+
+    async def _post(self, url, payload) -> dict:
+        res = await self.client.post(f"{url}/sign", json=payload)
+        res.raise_for_status()
+        return self._parse(res.json())
+
+    async def _hedged(self, payload) -> dict:
+        deadline = time.monotonic() + self.timeout
+        replicas = self._replicas()
+        pending = set()
+        error = None
+        try:
+            while replicas or pending:
+                if replicas:
+                    pending.add(asyncio.ensure_future(self._post(replicas.pop(0), payload)))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=min(self.hedge_after, remaining) if replicas else remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error or httpx.TimeoutException(f"sign servers did not answer in {self.timeout}s")
+
+    async def __call__(self, uri, data=None, a1="", web_session=""):
+        try:
+            return await self._hedged(self._payload(uri, data, a1, web_session))
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            return self._fallback(uri, data, a1, e)
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import Future
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+
+
+class BatchSigner:
+    """sign function for XhsClient which coalesces concurrent sign calls into batches
+
+    the first call of a batch waits up to `window` seconds (or until max_batch calls
+    arrived) for other threads, then signs all of them by one sign_batch call, calls
+    with different a1 or web_session are never mixed, for example with the
+    /sign/batch endpoint of example/basic_sign_server.py:
+
+        def sign_batch(items, a1="", web_session=""):
+            res = requests.post("http://localhost:5005/sign/batch", json={
+                "items": [{"uri": uri, "data": data} for uri, data in items],
+                "a1": a1, "web_session": web_session})
+            return res.json()["signs"]
+
+        xhs_client = XhsClient(cookie, sign=BatchSigner(sign_batch))
+
+    :param sign_batch: sign_batch(items, a1, web_session) signs a list of (uri, data)
+        and returns the list of signature dicts in the same order
+    :param window: seconds to wait for more calls before signing a batch
+    :param max_batch: max calls signed by one sign_batch call
+    """
+
+    def __init__(self, sign_batch, window: float = 0.005, max_batch: int = 32):
+        self.sign_batch = sign_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, uri, data=None, a1="", web_session=""):
+        key = (a1, web_session)
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.items.append((uri, data, future))
+            if len(batch.items) >= self.max_batch:
+                del self._pending[key]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            self._flush(batch, a1, web_session)
+        return future.result()
+
+    def _flush(self, batch: _Batch, a1, web_session):
+        try:
+            signs = self.sign_batch([(uri, data) for uri, data, _ in batch.items], a1, web_session)
+            if len(signs) != len(batch.items):
+                raise ValueError(f"sign_batch returned {len(signs)} signatures for {len(batch.items)} items")
+        except Exception as e:
+            for _, _, future in batch.items:
+                future.set_exception(e)
+            return
+        for (_, _, future), signature in zip(batch.items, signs):
+            future.set_result(signature)
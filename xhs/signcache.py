@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+from . import fastjson
+
+
+class SignCache:
+    """thread safe LRU cache of signature headers keyed on (uri, canonical body, a1)
+
+    signatures are only accepted for a while after their x-t, so an entry expires
+    ttl seconds after its x-t (or after it was stored when there is no x-t),
+    retries and duplicate fetches of the same page reuse the signature instead of
+    calling the sign function again, for example:
+
+        xhs_client = XhsClient(cookie, sign=sign, sign_cache=SignCache(ttl=60))
+
+    :param ttl: seconds a signature is reused, keep it below the validity window of x-t
+    :param maxsize: max signatures kept, the least recently used one is evicted first
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(uri: str, data=None, a1: str = "") -> tuple:
+        """data is dict, or the compact json str or bytes which will be sent"""
+        if isinstance(data, dict):
+            data = fastjson.dumps(data)
+        elif isinstance(data, str):
+            data = data.encode("utf-8")
+        elif not isinstance(data, bytes):
+            data = b""
+        return uri, data, a1 or ""
+
+    def _expires_at(self, signs: dict) -> float:
+        try:
+            signed_at = int(signs.get("x-t"))
+        except (TypeError, ValueError):
+            signed_at = time.time()
+        if signed_at > 1e11:
+            signed_at /= 1000
+        return signed_at + self.ttl
+
+    def get(self, key: tuple):
+        """return cached signature headers, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, signs = entry
+                if time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(signs)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, signs: dict):
+        with self._lock:
+            self._entries[key] = (self._expires_at(signs), dict(signs))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,84 @@
+import base64
+import json
+import threading
+import time
+
+from .help import _X_S_COMMON_TABLE, common_fields, mrc, x_s_of
+
+_X6, _X7, _X9 = "@x6@", "@x7@", "@x9@"
+
+
+def _b64(data: bytes) -> bytes:
+    return base64.b64encode(data).translate(_X_S_COMMON_TABLE)
+
+
+class _Template:
+    """x-s-common json of one (a1, b1) split around x6, x7 and x9
+
+    the json is prefix + x6 and x7 + middle + x9 and suffix, the static prefix and middle
+    are base64 encoded once, the middle once per alignment of the bytes before it
+    """
+
+    def __init__(self, a1, b1):
+        text = json.dumps(common_fields(a1, b1, _X6, _X7, _X9), separators=(',', ':')).encode()
+        prefix, rest = text.split(f'"{_X6}"'.encode())
+        self.between, rest = rest.split(f'"{_X7}"'.encode())
+        middle, self.suffix = rest.split(f'"{_X9}"'.encode())
+        aligned = len(prefix) - len(prefix) % 3
+        self.prefix_b64, self.prefix_rest = _b64(prefix[:aligned]), prefix[aligned:]
+        self.middles = []
+        for head in (0, 2, 1):  # bytes of middle which fill the last group of the variable part
+            end = head + (len(middle) - head) // 3 * 3
+            self.middles.append((middle[:head], _b64(middle[head:end]), middle[end:]))
+
+    def encode(self, x_t: str, x_s: str, x9: int) -> str:
+        # x6 and x7 are digits and base64, which are never escaped in json
+        variable = b'%s"%s"%s"%s"' % (self.prefix_rest, x_t.encode(), self.between, x_s.encode())
+        head, middle_b64, tail = self.middles[len(variable) % 3]
+        return b"".join((
+            self.prefix_b64,
+            _b64(variable + head),
+            middle_b64,
+            _b64(tail + str(x9).encode() + self.suffix),
+        )).decode()
+
+
+class Signer:
+    """sign function with the same output as xhs.help.sign, which encodes the static fields
+    of x-s-common only once per (a1, b1), so a long b1 is not encoded by every request
+
+        signer = Signer(b1=b1)
+        xhs_client = XhsClient(cookie, sign=signer)
+        signs = signer(uri, data, a1=a1)
+
+    :param b1: localStorage b1 of browser, used when b1 is not passed per call
+    :param maxsize: max (a1, b1) templates kept
+    """
+
+    def __init__(self, b1="", maxsize: int = 128):
+        self.b1 = b1
+        self.maxsize = maxsize
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def _template(self, a1, b1) -> _Template:
+        template = self._templates.get((a1, b1))
+        if template is None:
+            template = _Template(a1, b1)
+            with self._lock:
+                if len(self._templates) >= self.maxsize:
+                    self._templates.pop(next(iter(self._templates)))
+                self._templates[(a1, b1)] = template
+        return template
+
+    def __call__(self, uri, data=None, ctime=None, a1="", b1=None, **kwargs):
+        """sign like xhs.help.sign, extra kwargs like web_session of XhsClient are ignored"""
+        b1 = self.b1 if b1 is None else b1
+        v = int(round(time.time() * 1000) if not ctime else ctime)
+        x_s = x_s_of(uri, data, v)
+        x_t = str(v)
+        return {
+            "x-s": x_s,
+            "x-t": x_t,
+            "x-s-common": self._template(a1, b1).encode(x_t, x_s, mrc(x_t + x_s)),
+        }
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import mmap
+import os
+import threading
+
+# parts of ros-upload multipart uploads, the last part may be smaller
+DEFAULT_PART_SIZE = 5 * 1024 * 1024
+# bytes read or written by a worker thread at once for the async client
+CHUNK_SIZE = 1024 * 1024
+
+
+def part_ranges(size: int, part_size: int) -> list:
+    """[(part_number, start, end), ...] of a file, part numbers start from 1"""
+    return [(number, start, min(start + part_size, size))
+            for number, start in enumerate(range(0, size, part_size), 1)]
+
+
+async def aiter_file(file_path: str, chunk_size: int = CHUNK_SIZE):
+    """async iterator over the chunks of a file read in worker threads, so a large body
+    is streamed without blocking the event loop or being loaded into memory at once
+    """
+    f = await asyncio.to_thread(open, file_path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+class PartReader:
+    """reads parts of a file at their offsets through mmap, so threads uploading
+    parts never share a file position and only the parts in flight are in memory
+    """
+
+    def __init__(self, file_path: str):
+        self._file = open(file_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # empty files can't be mapped
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def read(self, start: int, end: int) -> bytes:
+        return self._mmap[start:end]
+
+    def close(self):
+        if self._mmap:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class UploadManifest:
+    """json file recording a multipart upload: file_id, upload_id, size, part_size and the
+    etags of uploaded parts, an interrupted upload of the same file_id and file resumes
+    from it and sends only the missing parts
+
+    :param path: json file path, None keeps the manifest in memory only
+    """
+
+    def __init__(self, path, file_id: str, size: int, part_size: int):
+        self.path = path
+        self.file_id = file_id
+        self.size = size
+        self.part_size = part_size
+        self.upload_id = None
+        self.parts = {}
+        self._lock = threading.Lock()
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (state.get("file_id"), state.get("size"), state.get("part_size")) == (file_id, size, part_size):
+            self.upload_id = state.get("upload_id")
+            self.parts = {int(number): etag for number, etag in (state.get("parts") or {}).items()}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            state = {"file_id": self.file_id, "upload_id": self.upload_id, "size": self.size,
+                     "part_size": self.part_size, "parts": self.parts}
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(self.path + ".tmp", self.path)
+
+    def add(self, part_number: int, etag: str):
+        with self._lock:
+            self.parts[part_number] = etag
+        self.save()
+
+    def pending(self) -> list:
+        """(part_number, start, end) of parts not uploaded yet"""
+        return [part for part in part_ranges(self.size, self.part_size) if part[0] not in self.parts]
+
+    def completed(self) -> list:
+        """parts argument of create_complete_multipart_upload"""
+        return [{"PartNumber": number, "ETag": self.parts[number]} for number in sorted(self.parts)]
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -8,20 +8,23 @@ except ImportError:
     from xhs import XhsClient
     DataFetchError = Exception
 
-from xhs.help import sign as xhs_sign
+from xhs.signer import Signer
 from .models import Content, Account
 
 logger = logging.getLogger(__name__)
 
 
+BROWSER_B1 = "I38rHdgsjopgIvesdVwgIC+oIELmBZ5e3VwXLgFTIxS3bqwErFeexd0ekncAzMFYnqthIhJeSBMDKutRI3KsYorWHPtGrbV0P9WfIi/eWc6eYqtyQApPI37ekmR6QL+5Ii6sdneeSfqYHqwl2qt5B0DBIx++GDi/sVtkIxdsxuwr4qtiIhuaIE3e3LV0I3VTIC7e0utl2ADmsLveDSKsSPw5IEvsiVtJOqw8BuwfPpdeTFWOIx4TIiu6ZPwbPutXIvlaLbgs3qtxIxes1VwHIkumIkIyejgsY/WTge7eSqte/D7sDcpipedeYrDtIC6eDVw2IENsSqtlnlSuNjVtIvoekqt3cZ7sVo4gIESyIhEgQ9quIxhnqz8gIkIfoqwkICZWG73sdlOeVPw3IvAe0fged0iNIi5s3Ibf2utAIiKsidvekZNeTPt4nAOeWPwEIvSgz0eefqwhpnOsfPwrI3lrIxE5Luwwaqw+rekhZANe1MNe0Pw9ICNsVLoeSbIFIkosSr7sVnFiIkgsVVtMIiudqqw+tqtWI30e3PwIIhoe3ut1IiOsjut3wutnsPwXICclI3Ir27lk2I5e1utCIES/IEJs0PtnpYIAO0JeYfD1IErPOPtKoqw3I3OexqtWQL5eizdsVMmmIhgsVdJs3PtPLVwaIvgefVwfIkgs60WoICKedo/efqt9I3OsVqw62dMBIhIGIveskLoeVdveDS6edVtBIkF1I3Q6rVtQIvchIE5s3FqAwLgeDuwzIkL8Lqw+tLNeYY/sTutsnPtrI3qFIhkdOqtvZqwMIiNsVmJeTqwtzPtZIh8OeVtPICc4pnTrIivsDFee0BdsVutqqPwmIkrxIvvsiVw5IiesjchlIvRNHsYAIvmTIv/eVqw2GqtC+qtXI3WnIENsYedekVwE/nZTICDn4ut1mut8IxhlIibxI3pbIv/edBNsdnkGBVwFIEFJ2Pwjeuw2Ii6eTASRIiZucFgs0utdzVtnal+brc=="  # ← 粘贴这里
+# b1 固定不变，只编码一次，每次签名只编码 x6、x7、x9
+_browser_signer = Signer(b1=BROWSER_B1)
+
+
 def sign_wrapper(uri, data=None, ctime=None, a1="", b1="", **kwargs):
     """
     Wrapper for xhs.help.sign to handle extra parameters from XhsClient.
     XhsClient may pass additional parameters like web_session, which we ignore.
     """
-    BROWSER_B1 = "I38rHdgsjopgIvesdVwgIC+oIELmBZ5e3VwXLgFTIxS3bqwErFeexd0ekncAzMFYnqthIhJeSBMDKutRI3KsYorWHPtGrbV0P9WfIi/eWc6eYqtyQApPI37ekmR6QL+5Ii6sdneeSfqYHqwl2qt5B0DBIx++GDi/sVtkIxdsxuwr4qtiIhuaIE3e3LV0I3VTIC7e0utl2ADmsLveDSKsSPw5IEvsiVtJOqw8BuwfPpdeTFWOIx4TIiu6ZPwbPutXIvlaLbgs3qtxIxes1VwHIkumIkIyejgsY/WTge7eSqte/D7sDcpipedeYrDtIC6eDVw2IENsSqtlnlSuNjVtIvoekqt3cZ7sVo4gIESyIhEgQ9quIxhnqz8gIkIfoqwkICZWG73sdlOeVPw3IvAe0fged0iNIi5s3Ibf2utAIiKsidvekZNeTPt4nAOeWPwEIvSgz0eefqwhpnOsfPwrI3lrIxE5Luwwaqw+rekhZANe1MNe0Pw9ICNsVLoeSbIFIkosSr7sVnFiIkgsVVtMIiudqqw+tqtWI30e3PwIIhoe3ut1IiOsjut3wutnsPwXICclI3Ir27lk2I5e1utCIES/IEJs0PtnpYIAO0JeYfD1IErPOPtKoqw3I3OexqtWQL5eizdsVMmmIhgsVdJs3PtPLVwaIvgefVwfIkgs60WoICKedo/efqt9I3OsVqw62dMBIhIGIveskLoeVdveDS6edVtBIkF1I3Q6rVtQIvchIE5s3FqAwLgeDuwzIkL8Lqw+tLNeYY/sTutsnPtrI3qFIhkdOqtvZqwMIiNsVmJeTqwtzPtZIh8OeVtPICc4pnTrIivsDFee0BdsVutqqPwmIkrxIvvsiVw5IiesjchlIvRNHsYAIvmTIv/eVqw2GqtC+qtXI3WnIENsYedekVwE/nZTICDn4ut1mut8IxhlIibxI3pbIv/edBNsdnkGBVwFIEFJ2Pwjeuw2Ii6eTASRIiZucFgs0utdzVtnal+brc=="  # ← 粘贴这里
-
-    return xhs_sign(uri, data=data, ctime=ctime, a1=a1, b1=BROWSER_B1)
+    return _browser_signer(uri, data=data, ctime=ctime, a1=a1)
 
 
 class ContentCrawler: